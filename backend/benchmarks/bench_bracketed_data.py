@@ -0,0 +1,92 @@
+"""Benchmark of `Dataset.clean_bracketed_data` on a synthetic LSOA-sized dataset.
+
+Compares the compiled, vectorised parser against the previous row-wise implementation,
+which ran `re.findall` twice per cell. Run from the `backend` folder with:
+
+    python -m benchmarks.bench_bracketed_data
+"""
+
+# %%
+import re
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from datasets.dataset import Dataset, DataResolution
+
+N_ROWS = 35000
+COLS = ["belong_strongagree", "belong_agree", "has_someone_close"]
+
+
+def synthetic_bracketed_data(n_rows=N_ROWS, cols=COLS, seed=0):
+    """Returns a df of `n_rows` LSOA-style areas with `NUMBER (PERCENTAGE)` columns."""
+    rng = np.random.default_rng(seed)
+    data = {"LSOA11CD": ["W01{:06d}".format(i) for i in range(n_rows)]}
+    for col in cols:
+        counts = rng.integers(10, 25000, n_rows)
+        percents = rng.uniform(10, 99, n_rows).round(1)
+        data[col] = [
+            "{} ( {})".format(c, p) for c, p in zip(counts.tolist(), percents.tolist())
+        ]
+    return pd.DataFrame(data)
+
+
+def legacy_clean_bracketed_data(df, cols):
+    """The previous row-wise implementation, kept as the benchmark baseline."""
+
+    def extract_data(string):
+        pattern = r"\d+.?\d+"
+        data = re.findall(pattern, string)
+        return data
+
+    for col in cols:
+        name_counts = col + "_count"
+        name_percent = col + "_pct"
+        df[name_counts] = df[col].apply(lambda x: extract_data(x)[0])
+        df[name_percent] = df[col].apply(lambda x: extract_data(x)[1])
+        df.drop(columns=col, inplace=True)
+
+    # The master dataset was only numeric after this cast
+    return df.astype({c: "float64" for c in df.columns if c != "LSOA11CD"})
+
+
+def vectorised_clean_bracketed_data(df, cols):
+    """Runs the current `Dataset.clean_bracketed_data` on df."""
+    dataset = Dataset(
+        data=df,
+        res=DataResolution.LSOA,
+        key_col="LSOA11CD",
+        key_is_code=True,
+        csv_name="benchmark",
+        bracketed_data_cols=cols,
+    )
+    dataset.std_data_ = df
+    return dataset.clean_bracketed_data()
+
+
+def time_it(func, df, repeat=3):
+    """Returns the best time in seconds of `repeat` runs, and the last result."""
+    timings = []
+    for _ in range(repeat):
+        data = df.copy()
+        start = datetime.now()
+        result = func(data, COLS)
+        timings.append((datetime.now() - start).total_seconds())
+    return min(timings), result
+
+
+# %%
+if __name__ == "__main__":
+    data = synthetic_bracketed_data()
+    print("Synthetic dataset: ", data.shape)
+
+    legacy_time, legacy = time_it(legacy_clean_bracketed_data, data)
+    vector_time, vector = time_it(vectorised_clean_bracketed_data, data)
+
+    pd.testing.assert_frame_equal(legacy, vector)
+
+    print("-" * 80)
+    print("Row-wise re.findall:       {:.3f}s".format(legacy_time))
+    print("Vectorised str.extract:    {:.3f}s".format(vector_time))
+    print("Speed-up:                  {:.1f}x".format(legacy_time / vector_time))
+    print("-" * 80)
@@ -0,0 +1,138 @@
+"""Benchmark of the dashboard json writer on a synthetic national-scale payload.
+
+Compares `datasets.json_writer.write_json`, which streams the records of the dfs to
+the file, against the previous `DataDashboard.write`, which converted them to lists of
+dicts and wrote them with `json.dump`. The payload has the shape of `to_frames` for
+all the LSOAs and local authorities of England and Wales. Reports the time and the
+peak memory allocated (measured with `tracemalloc`) by each writer. Run from the
+`backend` folder with:
+
+    python -m benchmarks.bench_json_writer [N_LSOAS]
+"""
+
+# %%
+import os
+import sys
+import json
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from datasets.json_writer import (
+    write_json,
+    StdlibJsonBackend,
+    OrjsonBackend,
+    BUFFER_SIZE,
+)
+
+N_LSOAS = 34753  # LSOAs in England and Wales (2011)
+N_LAS = 339  # Local authorities in England and Wales (2019)
+N_VARIABLES = 20
+
+
+def synthetic_frame(n_areas, n_variables=N_VARIABLES, seed=0):
+    """Returns a df of `n_areas` areas, as returned by `Variables.data_to_frame`."""
+    rng = np.random.default_rng(seed)
+    data = {
+        "area_code": ["E01{:06d}".format(i) for i in range(n_areas)],
+        "area_name": [
+            "Area {} {:03d}".format(i // 100, i % 100) for i in range(n_areas)
+        ],
+    }
+    for i in range(n_variables):
+        data["variable_{}".format(i)] = rng.uniform(0, 100, n_areas).round(3)
+    return pd.DataFrame(data)
+
+
+def synthetic_payload(n_lsoas=N_LSOAS):
+    """Returns an object in the format of `DataDashboard.to_frames`."""
+    return {
+        "variables": [
+            {"name": "variable_{}".format(i), "label": "Variable {}".format(i)}
+            for i in range(N_VARIABLES)
+        ],
+        "LAs": synthetic_frame(N_LAS, seed=1),
+        "LSOAs": synthetic_frame(n_lsoas, seed=2),
+        "updated": "2021-01-01",
+    }
+
+
+def legacy_write(payload, path):
+    """The previous writer, kept as the benchmark baseline."""
+    json_obj = dict(payload)
+    for key in ("LAs", "LSOAs"):
+        json_obj[key] = json_obj[key].to_dict(orient="records")
+    with open(path, "w") as outfile:
+        json.dump(json_obj, outfile)
+
+
+def stream_writer(backend):
+    """Returns a function that writes a payload with `write_json` and backend."""
+
+    def write(payload, path):
+        with open(path, "w", encoding="utf-8", buffering=BUFFER_SIZE) as outfile:
+            write_json(payload, outfile, backend=backend)
+
+    return write
+
+
+def measure(write, payload, path, repeat=3):
+    """Returns the best time in seconds of `repeat` runs, and the peak MB allocated."""
+    timings = []
+    for _ in range(repeat):
+        start = datetime.now()
+        write(payload, path)
+        timings.append((datetime.now() - start).total_seconds())
+
+    tracemalloc.start()
+    write(payload, path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak / 1e6
+
+
+# %%
+if __name__ == "__main__":
+    n_lsoas = int(sys.argv[1]) if len(sys.argv) > 1 else N_LSOAS
+    payload = synthetic_payload(n_lsoas)
+    folder = tempfile.mkdtemp()
+    writers = {
+        "json.dump of records": legacy_write,
+        "Streamed (json)": stream_writer(StdlibJsonBackend()),
+    }
+    try:
+        import orjson  # noqa: F401
+
+        writers["Streamed (orjson)"] = stream_writer(OrjsonBackend())
+    except ImportError:
+        print("orjson is not installed, skipping the orjson backend.")
+
+    print(
+        "Synthetic payload: {:,} LSOAs and {} LAs x {} variables".format(
+            n_lsoas, N_LAS, N_VARIABLES
+        )
+    )
+    print("-" * 80)
+    results = {}
+    for name, write in writers.items():
+        path = os.path.join(folder, "{}.json".format(len(results)))
+        seconds, peak = measure(write, payload, path)
+        results[name] = (seconds, peak, path)
+        print(
+            "{:<24}{:>8.3f}s {:>10.1f} MB peak {:>10.1f} MB file".format(
+                name, seconds, peak, os.path.getsize(path) / 1e6
+            )
+        )
+    print("-" * 80)
+
+    legacy_path = results["json.dump of records"][2]
+    with open(legacy_path, "rb") as legacy, open(
+        results["Streamed (json)"][2], "rb"
+    ) as f:
+        assert legacy.read() == f.read(), "The streamed json is not byte-identical."
+    print("The streamed json is byte-identical to json.dump.")
+    for _, _, path in results.values():
+        os.remove(path)
+    os.rmdir(folder)
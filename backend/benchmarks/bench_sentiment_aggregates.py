@@ -0,0 +1,120 @@
+"""Benchmark of the seven day sentiment query on a synthetic tweets database.
+
+Compares the previous `VADER_QUERY`, which joined and grouped all of the tweets on
+every build, against the range query over the `daily_sentiment` aggregates, and
+reports the cost of the triggers that maintain the aggregates as tweets arrive. The
+database is generated by `tweets.synthetic`.
+Run from the `backend` folder with:
+
+    python -m benchmarks.bench_sentiment_aggregates [N_TWEETS]
+"""
+
+# %%
+import os
+import sys
+import sqlite3
+import tempfile
+import pandas as pd
+from dataclasses import replace
+from datetime import date, datetime
+
+from datasets.live import VADER_QUERY
+from datasets.sentiment import install_sentiment_aggregates
+from tweets.synthetic import SyntheticTweets
+
+N_TWEETS = 2_000_000
+N_ARRIVING = 20_000  # Tweets inserted to time the triggers
+
+# The query before the aggregates were added, kept as the benchmark baseline
+LEGACY_VADER_QUERY = """SELECT AVG(vader_comp_avg),lsoa,lsoa_name from
+(
+SELECT AVG(tweets.vader_comp) as vader_comp_avg, tweets.author_id, matchedplaces.lsoa, matchedplaces.lsoa_name
+FROM tweets
+JOIN places ON tweets.place_id = places.id
+JOIN matchedplaces ON matchedplaces.place_id = places.id
+WHERE strftime("%Y-%m-%d %H:%M:%S", tweets.created_at) > date('now','start of day','-7 days')
+GROUP BY tweets.author_id,matchedplaces.lsoa
+) as lastweek_tweets
+GROUP BY lsoa;
+"""
+
+
+def arriving_tweets(synthetic, places, n_tweets, seed):
+    """Returns rows of n_tweets new tweets, with ids after those of synthetic."""
+    arriving = replace(
+        synthetic,
+        n_tweets=n_tweets,
+        seed=seed,
+        first_id=synthetic.first_id + synthetic.n_tweets + seed * n_tweets,
+    )
+    return [row for rows in arriving.database_rows(places) for row in rows]
+
+
+def time_query(con, query, repeat=3):
+    """Returns the best time in seconds of `repeat` runs, and the last result."""
+    timings = []
+    for _ in range(repeat):
+        start = datetime.now()
+        result = pd.read_sql(query, con=con)
+        timings.append((datetime.now() - start).total_seconds())
+    return min(timings), result
+
+
+def time_inserts(con, rows):
+    """Returns the time in seconds to insert and commit rows into the tweets table."""
+    start = datetime.now()
+    con.executemany("INSERT INTO tweets VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    con.commit()
+    return (datetime.now() - start).total_seconds()
+
+
+# %%
+if __name__ == "__main__":
+    n_tweets = int(sys.argv[1]) if len(sys.argv) > 1 else N_TWEETS
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "phw_tweets.db")
+    print("Writing a synthetic database with {:,} tweets...".format(n_tweets))
+    # The queries read the last seven days, so the tweets end today
+    synthetic = SyntheticTweets(n_tweets, end=date.today().isoformat())
+    places = synthetic.places()
+    con = sqlite3.connect(synthetic.write_database(path))
+
+    plain_insert_time = time_inserts(
+        con, arriving_tweets(synthetic, places, N_ARRIVING, seed=1)
+    )
+    legacy_time, _ = time_query(con, LEGACY_VADER_QUERY)
+
+    start = datetime.now()
+    install_sentiment_aggregates(con)
+    install_time = (datetime.now() - start).total_seconds()
+    trigger_insert_time = time_inserts(
+        con, arriving_tweets(synthetic, places, N_ARRIVING, seed=2)
+    )
+    legacy = pd.read_sql(LEGACY_VADER_QUERY, con=con)
+    aggregate_time, aggregate = time_query(con, VADER_QUERY)
+    con.close()
+
+    pd.testing.assert_frame_equal(legacy, aggregate, check_exact=False, rtol=1e-9)
+
+    print("-" * 80)
+    print("Previous query over the tweets:    {:.3f}s".format(legacy_time))
+    print("Range query over the aggregates:   {:.4f}s".format(aggregate_time))
+    print(
+        "Speed-up:                          {:.0f}x".format(
+            legacy_time / aggregate_time
+        )
+    )
+    print("One-off install and fill:          {:.3f}s".format(install_time))
+    print(
+        "Inserting {:,} tweets:            {:.3f}s without triggers, {:.3f}s with".format(
+            N_ARRIVING, plain_insert_time, trigger_insert_time
+        )
+    )
+    print(
+        "Database size:                     {:.0f} MB".format(
+            os.path.getsize(path) / 1e6
+        )
+    )
+    print("-" * 80)
+    os.remove(path)
+    os.rmdir(folder)
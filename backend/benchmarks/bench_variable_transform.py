@@ -0,0 +1,95 @@
+"""Benchmark of `Variables.transform` on hundreds of synthetic LSOA variables.
+
+Compares the batched transform, which applies the transformations of each data type
+to one area by variable matrix, against transforming each `Variable` on its own, as
+`Variables.data_to_json` did before. The variables are indexed on the LSOAs of the
+static master dataset, which is read (or generated) for their population. That both
+give the same data is tested in `test_generate_json.py`. Run from the `backend`
+folder with:
+
+    python -m benchmarks.bench_variable_transform [N_VARIABLES]
+"""
+
+# %%
+import sys
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from generate_json import Variable, Variables, LSOA_POPULATION
+
+N_VARIABLES = 500
+DATA_TYPES = ["percentage", "count", "per100k", "rank", "density"]
+
+
+def synthetic_variables(index, n_variables=N_VARIABLES, seed=0):
+    """Returns `n_variables` Variables of random data indexed on index."""
+    rng = np.random.default_rng(seed)
+    variables = []
+    for i in range(n_variables):
+        data_type = DATA_TYPES[i % len(DATA_TYPES)]
+        if data_type == "rank":
+            values = rng.permutation(len(index)) + 1.0
+        else:
+            values = rng.uniform(0, 100, len(index)).round(3)
+        variables.append(
+            Variable(
+                data=pd.Series(
+                    values, index=index, name="candidate{}_{}".format(i, data_type)
+                ),
+                label="Candidate {}".format(i),
+                data_class="support",
+                invert=data_type != "density" and bool(rng.integers(2)),
+                data_type=data_type,
+            )
+        )
+    return variables
+
+
+def reset(variables):
+    """Drops the transformed data of the variables."""
+    for variable in variables:
+        variable.data_transformed_ = None
+
+
+def per_variable_transform(variables):
+    """Transforms each variable on its own, returning the transformed data as a df."""
+    transformed = map(lambda v: v.transform(), variables)
+    return pd.concat(map(lambda v: v.transformed_data, transformed), axis=1)
+
+
+def batched_transform(variables):
+    """Runs the current `Variables.transform`, returning the transformed data as a df."""
+    Variables(variables).transform()
+    return pd.concat([v.transformed_data for v in variables], axis=1)
+
+
+def time_it(func, variables, repeat=3):
+    """Returns the best time in seconds of `repeat` runs, and the last result."""
+    timings = []
+    for _ in range(repeat):
+        reset(variables)
+        start = datetime.now()
+        result = func(variables)
+        timings.append((datetime.now() - start).total_seconds())
+    return min(timings), result
+
+
+# %%
+if __name__ == "__main__":
+    n_variables = int(sys.argv[1]) if len(sys.argv) > 1 else N_VARIABLES
+    variables = synthetic_variables(LSOA_POPULATION.load().index, n_variables)
+    print(
+        "Synthetic variables: {} x {} LSOAs".format(
+            n_variables, LSOA_POPULATION.load().shape[0]
+        )
+    )
+
+    per_variable_time, per_variable = time_it(per_variable_transform, variables)
+    batched_time, batched = time_it(batched_transform, variables)
+
+    print("-" * 80)
+    print("One Variable at a time:    {:.3f}s".format(per_variable_time))
+    print("Batched matrix transform:  {:.3f}s".format(batched_time))
+    print("Speed-up:                  {:.1f}x".format(per_variable_time / batched_time))
+    print("-" * 80)
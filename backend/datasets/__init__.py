@@ -7,3 +7,5 @@ SOURCE_DATA_FOLDER = os.path.join(BASE_FOLDER, "data", "static", "source")
 GEO_DATA_FOLDER = os.path.join(BASE_FOLDER, "data", "static", "geoboundaries")
 LIVE_DATA_FOLDER = os.path.join(BASE_FOLDER, "data", "live", "cleaned")
 LIVE_RAW_DATA_FOLDER = os.path.join(BASE_FOLDER, "data", "live", "raw")
+CACHE_FOLDER = os.path.join(BASE_FOLDER, "data", ".cache")
+HISTORY_FOLDER = os.path.join(BASE_FOLDER, "data", "live", "history")
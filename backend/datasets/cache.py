@@ -0,0 +1,378 @@
+"""Handles the on-disk cache of files derived from the source data.
+
+Each cached frame is stored in a columnar (parquet) file in the `CACHE_FOLDER`, next to
+a small json file recording the fingerprint of the source file it was derived from.
+The cached frame is only used while the fingerprint matches, so it is rebuilt
+automatically whenever the source file changes.
+
+Excel sheets are cached the same way by `read_excel`, which should be used instead of
+`pd.read_excel`. Each sheet is converted to a parquet file the first time it is read,
+keyed by the sha256 hash of the workbook, and later reads are served from that file.
+
+Notes
+-----
+Parquet support requires `pyarrow`. If it is not installed the frames are built from
+source every time, and a warning is raised.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import logging
+import datetime
+import numpy as np
+import pandas as pd
+from warnings import warn
+
+import datasets
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Returns the sha256 hex digest of the contents of the file at path."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def file_fingerprint(path):
+    """Returns a dict with the `size`, `mtime` (ns) and `sha256` hash of the file."""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": file_hash(path)}
+
+
+def is_fresh(path, fingerprint):
+    """Returns True if the file at path still matches the stored fingerprint.
+
+    Notes
+    -------
+    The size and modification time are checked first. The file is only hashed if its
+    size matches but its modification time does not, e.g. when a file has been
+    downloaded again without any change to its contents.
+    """
+    if not fingerprint:
+        return False
+    stat = os.stat(path)
+    if stat.st_size != fingerprint.get("size"):
+        return False
+    if stat.st_mtime_ns == fingerprint.get("mtime"):
+        return True
+    return file_hash(path) == fingerprint.get("sha256")
+
+
+def _write_json(path, obj):
+    """Writes obj to path as json."""
+    with open(path, "w") as f:
+        json.dump(obj, f)
+
+
+def _cache_paths(name):
+    """Returns the paths of the data and fingerprint files for a cache entry."""
+    path = os.path.join(datasets.CACHE_FOLDER, name)
+    return path + ".parquet", path + ".json"
+
+
+def _write_atomic(path, write):
+    """Calls write(tmp_path) and moves the result to path, so that readers never
+    see a partially written file."""
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_meta(name):
+    """Returns the metadata dict stored with a cache entry, or None if there is none."""
+    try:
+        with open(_cache_paths(name)[1]) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def read_frame(name, columns=None):
+    """Returns the frame stored in a cache entry, optionally only the given columns.
+
+    Raises
+    ------
+    FileNotFoundError
+        When there is no frame stored for the entry.
+    """
+    return pd.read_parquet(_cache_paths(name)[0], columns=columns)
+
+
+def write_entry(name, frame, meta):
+    """Stores frame and its metadata dict as a cache entry.
+
+    Notes
+    -------
+    Both files are written atomically, and the metadata is written last, so an entry
+    with metadata always has a complete frame. If pyarrow is not installed a warning
+    is raised and nothing is stored.
+    """
+    data_path, meta_path = _cache_paths(name)
+    try:
+        os.makedirs(datasets.CACHE_FOLDER, exist_ok=True)
+        _write_atomic(data_path, frame.to_parquet)
+        _write_atomic(meta_path, lambda p: _write_json(p, meta))
+    except ImportError:
+        warn("pyarrow is required to cache {}, it will not be cached.".format(name))
+
+
+def write_meta(name, meta):
+    """Stores only the metadata dict of a cache entry, e.g. the fingerprint of a file
+    derived from a source outside of the cache. The file is written atomically."""
+    os.makedirs(datasets.CACHE_FOLDER, exist_ok=True)
+    _write_atomic(_cache_paths(name)[1], lambda p: _write_json(p, meta))
+
+
+def frame_hash(df):
+    """Returns a sha256 hex digest of the values, index, column names and dtypes of df."""
+    sha = hashlib.sha256()
+    sha.update(repr(list(df.columns)).encode())
+    sha.update(repr([str(dtype) for dtype in df.dtypes]).encode())
+    sha.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def cached_frame(name, source_path, build):
+    """Returns the frame derived from source_path, from the cache if it is up to date.
+
+    Parameters
+    ----------
+    name : str
+        Unique name of the cache entry.
+    source_path : str
+        Path to the file the frame is derived from.
+    build : Callable[[], pd.DataFrame]
+        Function that builds the frame from source, used when the cache is stale.
+
+    Returns
+    -------
+    pd.DataFrame
+        The cached or newly built frame.
+    """
+    try:
+        if is_fresh(source_path, read_meta(name)):
+            return read_frame(name)
+    except (FileNotFoundError, ImportError):
+        pass
+
+    logger.info("Cache for {} is stale, rebuilding from {}".format(name, source_path))
+    # Fingerprint before building, so a change to the source mid-build is not missed
+    fingerprint = file_fingerprint(source_path)
+    frame = build()
+    write_entry(name, frame, fingerprint)
+
+    return frame
+
+
+# Lanes of an object column, see `_encode_objects`
+OBJECT_KINDS = {
+    "nan": 0,
+    "none": 1,
+    "str": 2,
+    "int": 3,
+    "float": 4,
+    "bool": 5,
+    "time": 6,
+}
+OBJECT_LANES = {"str": "s", "int": "i", "float": "f", "bool": "b", "time": "t"}
+LANE_DEFAULTS = {"str": None, "int": 0, "float": np.nan, "bool": False, "time": None}
+LANE_DTYPES = {"int": "int64", "float": "float64", "bool": "bool"}
+
+
+def _object_kind(value):
+    """Returns the kind of a value in an object column, see `OBJECT_KINDS`."""
+    if value is None:
+        return "none"
+    if isinstance(value, (bool, np.bool_)):
+        return "bool"
+    if isinstance(value, (int, np.integer)):
+        return "int"
+    if isinstance(value, (float, np.floating)):
+        return "nan" if np.isnan(value) else "float"
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, datetime.datetime):
+        return "time"
+    raise TypeError("Values of type {} cannot be cached".format(type(value)))
+
+
+def _encode_objects(key, series):
+    """Encodes an object column, which can mix types, as typed columns ('lanes').
+
+    Notes
+    -------
+    The `key` column holds the kind of each value, see `OBJECT_KINDS`, and there is a
+    lane for each kind of value found, e.g. `key.s` for the strings, with nulls in the
+    rows of other kinds.
+    """
+    kinds = series.map(_object_kind).to_numpy()
+    values = series.to_numpy()
+    lanes = {key: pd.Series(kinds).map(OBJECT_KINDS).astype("int8").to_numpy()}
+    for kind, suffix in OBJECT_LANES.items():
+        rows = kinds == kind
+        if rows.any():
+            lane = np.full(len(values), LANE_DEFAULTS[kind], dtype=object)
+            lane[rows] = values[rows]
+            if kind == "time":
+                lane = pd.to_datetime(lane).to_numpy()
+            elif kind != "str":
+                lane = lane.astype(LANE_DTYPES[kind])
+            lanes["{}.{}".format(key, suffix)] = lane
+    return lanes
+
+
+def _decode_objects(key, frame):
+    """Returns the object column encoded by `_encode_objects` as a np.ndarray."""
+    kinds = frame[key].to_numpy()
+    values = np.empty(len(kinds), dtype=object)
+    values[kinds == OBJECT_KINDS["nan"]] = np.nan
+    values[kinds == OBJECT_KINDS["none"]] = None
+    for kind, suffix in OBJECT_LANES.items():
+        rows = kinds == OBJECT_KINDS[kind]
+        if rows.any():
+            lane = frame["{}.{}".format(key, suffix)][rows]
+            if kind == "time":
+                values[rows] = [value.to_pydatetime() for value in lane]
+            else:
+                values[rows] = lane.tolist()
+    return values
+
+
+def _encode_label(label):
+    """Returns a column label as a json serialisable [type, value] pair."""
+    kind = _object_kind(label)
+    if kind == "time":
+        return [kind, label.isoformat()]
+    if kind == "nan":
+        return [kind, None]
+    return [kind, label.item() if isinstance(label, np.generic) else label]
+
+
+def _decode_label(pair):
+    """Returns the column label encoded by `_encode_label`."""
+    kind, value = pair
+    if kind == "time":
+        return datetime.datetime.fromisoformat(value)
+    if kind == "nan":
+        return np.nan
+    return value
+
+
+def _encode_frame(df):
+    """Encodes df as a frame parquet can store, and the metadata needed to decode it.
+
+    Raises
+    ------
+    TypeError
+        When df cannot be encoded, e.g. it has an index that is not a RangeIndex.
+    """
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        raise TypeError("Only frames with a default index can be cached")
+    lanes, columns = {}, []
+    for i, (label, series) in enumerate(df.items()):
+        key = "c{}".format(i)
+        columns.append({"key": key, "label": _encode_label(label)})
+        if series.dtype == object:
+            columns[-1]["object"] = True
+            lanes.update(_encode_objects(key, series))
+        else:
+            lanes[key] = series.to_numpy()
+    frame = pd.DataFrame(lanes, index=df.index)
+    # Keep the dtypes of the columns that are not objects, e.g. str and datetimes
+    frame = frame.astype(
+        {
+            c["key"]: df.iloc[:, i].dtype
+            for i, c in enumerate(columns)
+            if "object" not in c
+        }
+    )
+    return frame, {"columns": columns}
+
+
+def _decode_frame(frame, meta):
+    """Returns the df encoded by `_encode_frame`."""
+    data = {}
+    for i, column in enumerate(meta["columns"]):
+        key = column["key"]
+        data[i] = _decode_objects(key, frame) if column.get("object") else frame[key]
+    df = pd.DataFrame(data, index=pd.RangeIndex(len(frame)))
+    df.columns = pd.Index(
+        [_decode_label(c["label"]) for c in meta["columns"]], tupleize_cols=False
+    )
+    return df
+
+
+def _identical(left, right):
+    """Returns True if the two frames have the same labels, dtypes and values."""
+    try:
+        pd.testing.assert_frame_equal(left, right, check_exact=True)
+    except AssertionError:
+        return False
+    return list(map(type, left.columns)) == list(map(type, right.columns))
+
+
+def read_excel(path, sheet_name=0, **kwargs):
+    """Reads an Excel sheet like `pd.read_excel`, through a columnar cache.
+
+    Notes
+    -------
+    The sheet is read with `pd.read_excel` the first time, and stored as a parquet
+    cache entry named after the workbook's sha256 hash, the sheet and the read options.
+    Later reads with the same options are served from the entry, until the workbook's
+    contents change. Entries for previous contents of the workbook are removed.
+
+    Sheets that cannot be stored exactly, and reads of several sheets at once, are not
+    cached.
+
+    Parameters
+    ----------
+    path : str
+        Path to the workbook.
+    sheet_name : str or int, optional
+        The name or position of the sheet to read. By default the first.
+    **kwargs
+        Other keyword arguments passed to `pd.read_excel`.
+
+    Returns
+    -------
+    pd.DataFrame
+        The sheet.
+    """
+    if sheet_name is None or isinstance(sheet_name, list):
+        return pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+
+    options = repr([os.path.abspath(path), sheet_name, sorted(kwargs.items())])
+    slot = "xlsx_{}".format(hashlib.sha256(options.encode()).hexdigest()[:16])
+    name = "{}_{}".format(slot, file_hash(path)[:16])
+
+    meta = read_meta(name)
+    if meta is not None:
+        try:
+            return _decode_frame(read_frame(name), meta)
+        except (FileNotFoundError, ImportError):
+            pass
+
+    df = pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+    try:
+        frame, meta = _encode_frame(df)
+        if not _identical(_decode_frame(frame, meta), df):
+            raise TypeError("The sheet changed when it was encoded")
+    except TypeError as e:
+        logger.info("Sheet {} of {} is not cached: {}".format(sheet_name, path, e))
+        return df
+
+    # Only keep the entry for the current contents of the workbook
+    for old_path in glob.glob(os.path.join(datasets.CACHE_FOLDER, slot + "_*")):
+        os.remove(old_path)
+    write_entry(name, frame, meta)
+    return df
@@ -0,0 +1,253 @@
+"""Read-only, pooled access to the sqlite databases read by the live datasets.
+
+The dataclasses defined in this module are:
+    QueryTiming
+    ConnectionPool
+
+The functions defined in this module are:
+    read_only_uri
+    connect_writer
+
+Notes
+-----
+The tweets database is written to by the collector while the dashboard is built. The
+queries of the build only read it, so `ConnectionPool` opens it read-only through a
+`mode=ro` URI, which also means a missing database is an error rather than an empty
+new file. The build never writes to the database, nor changes its journal mode: that
+is left to the collector, which owns it. Once the collector has switched it to WAL
+mode, the readers and the writer do not block each other.
+
+The long-running scheduler queries the same databases every day, so `POOL` keeps
+idle connections open between queries, and with them sqlite's page cache and memory
+map of the file. A connection is replaced when its file has been replaced.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+import pandas as pd
+from urllib.parse import quote
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Pragmas set on each read-only connection
+READ_PRAGMAS = {
+    "mmap_size": 256 * 1024 * 1024,  # bytes of the file read through a memory map
+    "cache_size": -64 * 1024,  # KiB of page cache (negative values are in KiB)
+    "temp_store": "MEMORY",  # sorts and groups of the queries are done in memory
+    "query_only": "ON",
+}
+
+BUSY_TIMEOUT = 30  # Seconds to wait for a lock held by another connection
+
+
+def read_only_uri(path):
+    """Returns the URI that opens the database at path read-only."""
+    return "file:{}?mode=ro".format(quote(os.path.abspath(path)))
+
+
+def connect_writer(path):
+    """Opens a read-write connection to the existing database at path.
+
+    Notes
+    -------
+    Only used by migrations of the database run on behalf of the collector, such as
+    `python -m datasets.sentiment`, never by the build. The journal mode of the
+    database is left as the collector set it.
+
+    Raises
+    ------
+    FileNotFoundError
+        When there is no database at path, rather than creating an empty one.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError("No database at {}".format(path))
+    return sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+
+
+@dataclass(frozen=True)
+class QueryTiming:
+    """The time taken by a query.
+
+    Attributes
+    ----------
+    path: str
+        Path to the database queried.
+    query: str
+        The first line of the query.
+    seconds: float
+        Time taken to run the query and read its rows.
+    rows: int
+        Number of rows returned.
+    reused: bool
+        Whether the query ran on a pooled connection, rather than a new one.
+    """
+
+    path: str
+    query: str
+    seconds: float
+    rows: int
+    reused: bool
+
+
+@dataclass
+class ConnectionPool:
+    """Pool of read-only sqlite connections, kept open between queries.
+
+    Attributes
+    ----------
+    max_idle: int, optional
+        Number of idle connections kept per database. By default 2.
+    pragmas: dict, optional
+        Pragmas set on each new connection. By default `READ_PRAGMAS`.
+    idle: dict
+        Dictionary in format {'path' : [(connection, file id), ...] } of the idle
+        connections.
+    timings: list
+        The `QueryTiming` of each query run, most recent last.
+    lock: threading.Lock
+        Guards `idle` and `timings`, as queries may be run from several threads.
+    """
+
+    max_idle: int = 2
+    pragmas: dict = field(default_factory=lambda: dict(READ_PRAGMAS))
+    idle: dict = field(default_factory=dict, repr=False)
+    timings: list = field(default_factory=list, repr=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    MAX_TIMINGS = 1000  # Number of timings kept
+
+    @staticmethod
+    def _file_id(path):
+        """Returns the device and inode of path, which change when it is replaced."""
+        stat = os.stat(path)
+        return stat.st_dev, stat.st_ino
+
+    def _open(self, path):
+        """Opens and configures a new read-only connection to the database at path."""
+        con = sqlite3.connect(
+            read_only_uri(path),
+            uri=True,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False,  # used by one thread at a time, see `_connection`
+        )
+        for pragma, value in self.pragmas.items():
+            con.execute("PRAGMA {}={}".format(pragma, value))
+        return con
+
+    @contextmanager
+    def _connection(self, path):
+        """Context manager that lends a read-only connection to the database at path.
+
+        Notes
+        -------
+        A statement that is not read to the end holds its snapshot of the database,
+        so a connection returned to the pool with one would only see stale data.
+        Connections are only lent by `read_sql`, which reads every row.
+
+        Yields
+        -------
+        tuple
+            The sqlite3.Connection, and True if it was reused from the pool.
+        """
+        path = os.path.abspath(path)
+        file_id = self._file_id(path)
+        con = None
+        with self.lock:
+            connections = self.idle.setdefault(path, [])
+            while connections and con is None:
+                candidate, candidate_id = connections.pop()
+                if candidate_id == file_id:
+                    con = candidate
+                else:
+                    candidate.close()
+        reused = con is not None
+        if con is None:
+            con = self._open(path)
+
+        try:
+            yield con, reused
+        except Exception:
+            con.close()
+            raise
+        else:
+            if con.in_transaction:
+                con.rollback()
+            with self.lock:
+                connections = self.idle.setdefault(path, [])
+                if len(connections) < self.max_idle:
+                    connections.append((con, file_id))
+                    con = None
+            if con is not None:
+                con.close()
+
+    def read_sql(self, path, query, params=None):
+        """Runs a query on a pooled read-only connection, returning the result as a df.
+
+        Parameters
+        ----------
+        path : str
+            Path to the database.
+        query : str
+            The SQL query.
+        params : optional
+            Parameters of the query, passed to `pd.read_sql`.
+
+        Returns
+        -------
+        pd.DataFrame
+            The rows returned by the query.
+
+        Raises
+        ------
+        FileNotFoundError
+            When there is no database at path.
+        """
+        with self._connection(path) as (con, reused):
+            start = time.perf_counter()
+            df = pd.read_sql(query, con=con, params=params)
+            seconds = time.perf_counter() - start
+
+        timing = QueryTiming(
+            path=path,
+            query=query.strip().splitlines()[0] if query.strip() else "",
+            seconds=seconds,
+            rows=len(df),
+            reused=reused,
+        )
+        with self.lock:
+            self.timings.append(timing)
+            del self.timings[: -self.MAX_TIMINGS]
+        logger.info(
+            "Query {} on {} took {:.3f}s, {} rows ({} connection)".format(
+                timing.query,
+                os.path.basename(path),
+                seconds,
+                timing.rows,
+                "pooled" if reused else "new",
+            )
+        )
+        return df
+
+    def stats(self):
+        """Returns a df of the number, total and mean time of the queries per database."""
+        with self.lock:
+            timings = pd.DataFrame(
+                list(self.timings), columns=QueryTiming.__annotations__
+            )
+        return timings.groupby("path")["seconds"].agg(["count", "sum", "mean"])
+
+    def close(self):
+        """Closes all the idle connections."""
+        with self.lock:
+            for connections in self.idle.values():
+                for con, _ in connections:
+                    con.close()
+            self.idle.clear()
+
+
+POOL = ConnectionPool()
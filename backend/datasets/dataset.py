@@ -4,30 +4,56 @@ create the map.
 The classes defined in this module are:
     DataResolution
     DataFrequency
+    ExecutionMode
+The functions defined in this module are:
+    aligned_join
 The dataclasses defined in this module are:
+    GeoKeyIndex
     Dataset
+    DatasetJoin
+    MasterColumn
     MasterDataset
 """
 
 # Import packages
 import pandas as pd
+import numpy as np
 import geopandas as gpd
 import re
 import os
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from warnings import warn
 from dataclasses import dataclass
 from dataclasses import field
-from typing import List
+from functools import cached_property
+from typing import List, Union, Callable
 from enum import Enum
-from functools import reduce
 from typing import ClassVar, Any
 
 import datasets
+from datasets import cache
+from datasets import dtypes
+from datasets.storage import MasterStorage, FeatherStorage, CsvStorage
+from datasets.sources import SourceSpec, GRID_CACHE, load_sources
 
 LSOA_COUNT = 1909
 LA_COUNT = 22
 
+# Source file the MSOA reference keys are read from, see `Dataset.read_msoa_keys`
+MSOA_KEYS_FILE = "msoa_gp_online.csv"
+
+# Version of the incremental build manifest. Bump it when the way datasets are
+# standardised changes, so that cached merges are not reused.
+MANIFEST_VERSION = 1
+
+# Matches values in the format `NUMBER (PERCENTAGE)`, such as "1,161 ( 43.3)"
+BRACKETED_DATA_PATTERN = re.compile(
+    r"(?P<count>\d[\d,]*(?:\.\d+)?)\s*\(\s*(?P<pct>\d+(?:\.\d+)?)\s*%?\s*\)"
+)
+
 
 class DataResolution(Enum):
     """Defines a geographic resolution.
@@ -64,6 +90,154 @@ class DataFrequency(Enum):
     STATIC = "static"
 
 
+class ExecutionMode(Enum):
+    """Defines how the datasets of a MasterDataset are standardised.
+
+    Example
+    ---------
+    `ExecutionMode.THREAD`
+
+    Parameters
+    ----------
+    Enum : str
+        Define the ExecutionMode as "serial", "thread" or "process"
+    """
+
+    SERIAL = "serial"
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+def aligned_join(frames):
+    """Joins frames that are indexed on the same areas into one df, in a single pass.
+
+    Notes
+    -------
+    Rather than merging the frames pairwise, which copies an ever wider intermediate
+    df for each frame, every frame is aligned to the index of the first frame and
+    the frames are concatenated column-wise at once. Frames that are already in the
+    same order (as standardised datasets are) are used as they are.
+
+    Parameters
+    ----------
+    frames : Sequence[pd.DataFrame]
+        The frames to join, each with one row for every area in the same index.
+
+    Returns
+    -------
+    pd.DataFrame
+        The joined df, indexed as the first frame.
+
+    Raises
+    ------
+    ValueError
+        When there are no frames, when a column name is found in more than one
+        frame, or when the frames are not indexed on the same areas.
+    """
+    frames = list(frames)
+    if not frames:
+        raise ValueError("There are no datasets to join.")
+
+    # Check all the column names up front, rather than suffixing them on merge
+    columns = pd.Index([col for frame in frames for col in frame.columns])
+    duplicated = columns[columns.duplicated()].unique().tolist()
+    if duplicated:
+        raise ValueError(
+            "The columns {} are found in more than one dataset.".format(duplicated)
+        )
+
+    index = frames[0].index
+    if not index.is_unique:
+        raise ValueError("The datasets should have one row for each area.")
+
+    aligned = []
+    for frame in frames:
+        if not frame.index.equals(index):
+            if len(frame.index) != len(index) or not frame.index.isin(index).all():
+                raise ValueError("The datasets are not indexed on the same areas.")
+            frame = frame.reindex(index)
+        aligned.append(frame)
+
+    return pd.concat(aligned, axis=1)
+
+
+@dataclass(frozen=True)
+class GeoKeyIndex:
+    """Maps the area codes and names of a DataResolution to positional ids.
+
+    Positional ids are the row positions of the areas in the reference key table, so
+    any source can be aligned to the reference areas with a vectorised reindex rather
+    than a merge. One instance is built per DataResolution, see `Dataset.key_index`.
+
+    Attributes
+    ----------
+    res : DataResolution
+        The DataResolution of the areas.
+    keys : pd.DataFrame
+        The reference key table, with the code and name columns (in that order).
+    codes : pd.Index
+        Index of the area codes, whose positions are the area ids.
+    names : pd.Index
+        Index of the normalised area names, whose positions are the area ids.
+    """
+
+    res: DataResolution
+    keys: pd.DataFrame
+    codes: pd.Index
+    names: pd.Index
+
+    @classmethod
+    def from_reference(cls, ref, res):
+        """Builds the index from a reference key table with code and name columns."""
+        keys = ref.iloc[:, :2].reset_index(drop=True)
+        codes = pd.Index(keys.iloc[:, 0].astype(str).str.strip())
+        names = pd.Index(cls.normalise_names(keys.iloc[:, 1]))
+        if not codes.is_unique or not names.is_unique:
+            raise ValueError("The {} reference keys are not unique.".format(res.name))
+        return cls(res=res, keys=keys, codes=codes, names=names)
+
+    @staticmethod
+    def normalise_names(names):
+        """Returns names as lower case strings with whitespace stripped and collapsed."""
+        return (
+            pd.Series(names, dtype=object)
+            .astype(str)
+            .str.strip()
+            .str.replace(r"\s+", " ", regex=True)
+            .str.casefold()
+        )
+
+    @property
+    def key_cols(self):
+        """Returns the names of the code and name columns, as a list."""
+        return list(self.keys.columns)
+
+    def __len__(self):
+        return self.keys.shape[0]
+
+    def positions(self, keys, key_is_code=True):
+        """Returns the area id of each of the keys, or -1 where a key does not match.
+
+        Parameters
+        ----------
+        keys : pd.Series
+            Area codes or names to look up.
+        key_is_code : bool, optional
+            If True the keys are matched to the codes, otherwise to the names.
+            By default True
+
+        Returns
+        -------
+        np.ndarray
+            Array of the area ids, the same length as keys.
+        """
+        if key_is_code:
+            return self.codes.get_indexer(
+                pd.Series(keys, dtype=object).astype(str).str.strip()
+            )
+        return self.names.get_indexer(self.normalise_names(keys))
+
+
 @dataclass
 class Dataset:
     """Class to handle transformations to source datasets, returning them
@@ -71,9 +245,11 @@ class Dataset:
 
     Attributes
     ----------
-    data : pd.DataFrame
+    data : pd.DataFrame, SourceSpec or Callable
         The source dataset to standardise. Expected to have a row for each
         geographic area with at least one column defining the area name or code.
+        Either the df itself, or a loader that is only run when the data is needed:
+        a `SourceSpec` (see `datasets.sources`), or a function returning the df.
     res : DataResolution
         The DataResolution type of the data. See the class for options.
     key_col: str
@@ -91,12 +267,14 @@ class Dataset:
         List of columns that have data in the format `NUMBER (PERCENTAGE)`.
     rename: dict, optional
         Dictionary in format {'old_name' : 'new_name' } for columns to be renamed.
+    data_: pd.DataFrame
+        The source dataset, once it has been loaded by `load_data`.
     std_data_: pd.DataFrame
         Standardised data, which will have a name and code column, the columns chosen to
         keep whose contents and column names may be updated based on the args provided.
     """
 
-    data: pd.DataFrame
+    data: Union[pd.DataFrame, SourceSpec, Callable[[], pd.DataFrame]]
     res: DataResolution
     key_col: str
     key_is_code: bool
@@ -104,10 +282,14 @@ class Dataset:
     keep_cols: list = None
     bracketed_data_cols: list = None
     rename: dict = None  # Dictionary of columns that need renaming Cleaning
+    data_: pd.DataFrame = field(init=False, default=None, repr=False)
     std_data_: pd.DataFrame = field(init=False, default=None)
 
-    LA_REF: ClassVar[Any] = None  # geo-dataframe
-    LSOA_REF: ClassVar[Any] = None  # geo-dataframe
+    LA_REF: ClassVar[Any] = None  # reference key table
+    LSOA_REF: ClassVar[Any] = None  # reference key table
+    MSOA_REF: ClassVar[Any] = None  # reference key table, see `read_msoa_keys`
+    KEY_INDEXES: ClassVar[dict] = {}  # GeoKeyIndex for each DataResolution
+    KEYS_LOCK: ClassVar[Any] = threading.RLock()  # guards the reference keys
 
     def standardise(self):
         """Based on attributes, applies the correct functions to standardise the datasets.
@@ -124,7 +306,7 @@ class Dataset:
 
         # Filter the keycodes/names, remove whitespace, reset index
         std_data_ = self.clean_keys(
-            df=self.data,
+            df=self.load_data(),
             res=self.res,
             key_col=self.key_col,
             key_is_code=self.key_is_code,
@@ -153,16 +335,67 @@ class Dataset:
         # write_cleaned_data(df, res=self.res, csv_name=self.csv_name)
         return self
 
+    def load_data(self):
+        """Returns the source dataset as a pd.DataFrame, loading it if needed.
+
+        Notes
+        -------
+        If `data` is a loader it is only run the first time this is called, and the df
+        is kept in `data_`.
+        """
+        if isinstance(self.data, pd.DataFrame):
+            return self.data
+        if self.data_ is None:
+            if isinstance(self.data, SourceSpec):
+                self.data_ = self.data.load()
+            else:
+                self.data_ = self.data()
+        return self.data_
+
     @property
     def standardised_data(self):
         """Returns the std_data_ object pd.DataFrame."""
         return self.std_data_
 
+    def reset(self):
+        """Drops the loaded and standardised data, so the source is read again."""
+        self.data_ = None
+        self.std_data_ = None
+        if isinstance(self.data, SourceSpec):
+            GRID_CACHE.discard(self.data)
+
     @property
     def is_standardised(self):
         """Returns bool of whether the standardised data has been generated."""
         return self.std_data_ is not None
 
+    def fingerprint(self):
+        """Returns a sha256 hex digest of the source data and the standardisation spec.
+
+        Notes
+        -------
+        The spec covers every attribute that changes the standardised data: `res`,
+        `key_col`, `key_is_code`, `keep_cols`, `bracketed_data_cols` and `rename`.
+        If the fingerprint has not changed, neither has the standardised data.
+
+        If `data` is a `SourceSpec` the source is fingerprinted without being read,
+        other loaders are run to hash the df they return.
+        """
+        spec = [
+            self.res.name,
+            self.key_col,
+            self.key_is_code,
+            self.keep_cols,
+            self.bracketed_data_cols,
+            sorted(map(repr, (self.rename or {}).items())),
+        ]
+        sha = hashlib.sha256(repr(spec).encode())
+        if isinstance(self.data, SourceSpec):
+            sha.update(self.data.fingerprint().encode())
+        else:
+            sha.update(cache.frame_hash(self.load_data()).encode())
+        return sha.hexdigest()
+
     def csv_path(self):
         """Generates a name to output to csv.
 
@@ -186,108 +419,107 @@ class Dataset:
         Raises
         ------
         TypeError
-            When DataResolution is not LA or LSOA.
+            When DataResolution is not LA, LSOA or MSOA.
         """
         if self.res == DataResolution.LA:
             return "lad19cd"
         elif self.res == DataResolution.LSOA:
             return "LSOA11CD"
+        elif self.res == DataResolution.MSOA:
+            return "msoa11cd"
         else:
             raise TypeError("Unsupported Resolution")
 
     def __add__(self, other):
-        """Merges two data objects on the appropriate merge key, which is either
-        LSOA11CD or lad19cd.
+        """Plans the join of two standardised datasets on their area keys.
+
+        Notes
+        -------
+        No data is joined or copied here, see `DatasetJoin`.
 
         Parameters
         ----------
-        other : any
-            Data object to merge with a Dataset instance
+        other : Dataset or DatasetJoin
+            Standardised data to join with the Dataset instance.
 
         Returns
         -------
-        pd.DataFrame
-            A merged dataframe of the objects passed as arguments.
+        DatasetJoin
+            The plan to join the datasets, which is run when its data is used.
 
         Raises
         ------
         TypeError
-            When object is not the same type as the Dataset instance.
+            When object is not a Dataset or DatasetJoin.
             When one of the arguments is standardised and the other is not.
             When the objects have different resolutions.
         """
-        if not isinstance(other, Dataset):
-            raise TypeError(
-                "unsupported operand type(s) for +: {} and {}",
-                self.__class__,
-                type(other),
-            )
+        return DatasetJoin.of(self) + other
 
-        if not self.is_standardised or not other.is_standardised:
-            raise TypeError(
-                "Unsupported operand: both dataset needs to be "
-                "standardised before merging!"
-            )
+    @classmethod
+    def read_keys(cls):
+        """Reads and returns the LSOA and LA reference key tables as constants 'LSOA', 'LA'.
 
-        if self.res != other.res:
-            raise TypeError(
-                "Unsupported operand: both dataset needs to be "
-                "at the same resolution!"
-            )
-
-        merge_key = self._merge_key()
-        self.std_data_ = pd.merge(
-            self.std_data_,
-            other.standardised_data,
-            on=merge_key,
-            left_index=True,
-            right_index=True,
-        )
-        return self
-
-    def read_keys(self):
-        """Reads and returns the LSOA and LA geopandas dataframes as constants 'LSOA', 'LA'."""
-
-        # TBD: Standardise for GeoPandas DataFrame
-        # MAKE THIS A CLASS ATTRIBUTE
+        Notes
+        -------
+        Only the code and name columns of the boundary files are kept. These are
+        cached on disk (see `datasets.cache`), so the boundary files are only parsed
+        again when they change.
+        """
 
-        data_folder = datasets.GEO_DATA_FOLDER
-        if Dataset.LA_REF is None:
-            try:
-                LA = gpd.read_file(
+        with Dataset.KEYS_LOCK:
+            data_folder = datasets.GEO_DATA_FOLDER
+            if Dataset.LA_REF is None:
+                # clean_keys will raise an exception if the right number of rows are not
+                # found.
+                Dataset.LA_REF = cls._read_reference_keys(
                     os.path.join(
                         data_folder,
                         "Local_Authority_Districts_(December_2019)_Boundaries_UK_BGC.geojson",
-                    )
+                    ),
+                    res=DataResolution.LA,
+                    key_cols=["lad19cd", "lad19nm"],
                 )
-                LA = self.clean_keys(LA, res=DataResolution.LA, key_col="lad19cd")
-            except Exception as e:
-                # clean_keys will raise an exception if the right number of rows are not
-                # merged.
-                raise e
-            else:
-                Dataset.LA_REF = LA
 
-        if Dataset.LSOA_REF is None:
-            try:
-                LSOA = gpd.read_file(
+            if Dataset.LSOA_REF is None:
+                Dataset.LSOA_REF = cls._read_reference_keys(
                     os.path.join(
                         data_folder,
                         "Lower_Layer_Super_Output_Areas_December_2011_Boundaries_EW_BSC.geojson",
-                    )
+                    ),
+                    res=DataResolution.LSOA,
+                    key_cols=["LSOA11CD", "LSOA11NM"],
                 )
-                LSOA = self.clean_keys(
-                    LSOA, res=DataResolution.LSOA, key_col="LSOA11CD"
-                )
-            except Exception as e:
-                # clean_keys will raise an exception if the right number of rows are not
-                # merged.
-                raise e
-            else:
-                Dataset.LSOA_REF = LSOA
 
         return Dataset.LSOA_REF, Dataset.LA_REF
 
+    @classmethod
+    def _read_reference_keys(cls, path, res, key_cols):
+        """Returns the cleaned code and name columns of a boundary file, from the
+        cache if the file has not changed since it was last read.
+
+        Parameters
+        ----------
+        path : str
+            Path to the boundary file.
+        res : DataResolution
+            The DataResolution of the boundaries.
+        key_cols : list
+            The code and name column names, in that order.
+
+        Returns
+        -------
+        pd.DataFrame
+            The reference key table, filtered to Welsh areas.
+        """
+
+        def build():
+            # The geometry is not needed, so skip parsing it altogether
+            keys = gpd.read_file(path, ignore_geometry=True)
+            return cls.clean_keys(keys[key_cols], res=res, key_col=key_cols[0])
+
+        return cache.cached_frame("keys_{}".format(res.name), path, build)
+
     @staticmethod
     def clean_keys(df, res, key_col, key_is_code=True):
         """Ensures df key column (i.e column used for joining) is correctly formatted
@@ -379,9 +611,16 @@ class Dataset:
         return df_new
 
     def standardise_keys(self):
-        """Given dataframe and chosen cols, will use LA or LSOA geopandas dataframes to create
+        """Given dataframe and chosen cols, will use the LA or LSOA key index to create
         standardised columns for area codes and names
 
+        Notes
+        -------
+        Each row of the data is matched to a reference area in a single, vectorised
+        lookup (see `GeoKeyIndex`). Keys that do not match a reference area, such as
+        totals for Wales, are dropped and logged. The rows are returned in the order
+        of the reference key table.
+
         Returns
         -------
         pd.DataFrame
@@ -391,60 +630,117 @@ class Dataset:
         Raises
         ------
         Exception
-            When the number of rows generated does not match the DataResolution
+            When the data does not have exactly one row for each reference area.
         ValueError
-            When the DataResolution is not LA or LSOA
+            When the DataResolution is not LA, LSOA or MSOA.
         """
 
-        # Patching
         df = self.std_data_
-        res = self.res
-        keep_cols = self.keep_cols
-        key_is_code = self.key_is_code
+        key_index = self.key_index(self.res)
+        code_col, name_col = key_index.key_cols
+        key = code_col if self.key_is_code else name_col
 
-        # Load in the geography data being used as 'ground truth' for the codes and names
-        # MOVE TO VALIDATION
-        if keep_cols is None:
-            keep_cols = []
+        # If keep_cols was left empty then assume all columns are being kept
+        keep_cols = self.keep_cols if self.keep_cols else list(df.columns)
 
-        LSOA, LA = self.read_keys()
+        ids = key_index.positions(df[key], key_is_code=self.key_is_code)
+        matched = ids >= 0
 
-        # If keep_cols was left empty then assume all columns are being kept
-        # VALIDATION
-        if not keep_cols:
-            keep_cols = list(df.columns)
-
-        # Create the area codes and names depending on resolution and what keys are available in the
-        # original data frame.
-        if res == DataResolution.LSOA:
-            df_tidy = LSOA[["LSOA11CD", "LSOA11NM"]].merge(
-                df[keep_cols], on="LSOA11CD", how="inner"
-            )
-            # Check the df has the expected number of rows after merging
-            if df_tidy.shape[0] != LSOA_COUNT:
-                raise Exception(
-                    "An error has occured. "
-                    "The full {} rows were not produced in merge.".format(LSOA_COUNT)
+        if not matched.all():
+            logging.info(
+                "{}: dropped keys not matching a {}: {}".format(
+                    self.csv_name, self.res.name, df.loc[~matched, key].tolist()
                 )
-        elif res == DataResolution.LA:
-            if key_is_code:
-                key = "lad19cd"
-            else:
-                key = "lad19nm"
-            # Change the key column depending on the argument
-            df_tidy = LA[["lad19cd", "lad19nm"]].merge(
-                df[keep_cols], on=key, how="inner"
             )
-            # Check the df has the expected number of rows after merging
-            if df_tidy.shape[0] != LA_COUNT:
-                raise Exception(
-                    "An error has occured. "
-                    "The full {} rows were not produced in merge.".format(LA_COUNT)
+
+        # Find the source row for each reference area, checking for gaps and repeats
+        counts = pd.Series(ids[matched]).value_counts()
+        repeated = key_index.keys.iloc[counts[counts > 1].index]
+        missing = key_index.keys[~key_index.keys.index.isin(counts.index)]
+        if not repeated.empty or not missing.empty:
+            raise Exception(
+                "An error has occured. The full {} rows were not produced in merge. "
+                "Missing areas: {}. Repeated areas: {}.".format(
+                    len(key_index),
+                    missing[name_col].tolist(),
+                    repeated[name_col].tolist(),
                 )
-        else:
-            raise ValueError("Res provided does not match 'LSOA' or 'LA")
+            )
+        rows = np.empty(len(key_index), dtype=int)
+        rows[ids[matched]] = np.flatnonzero(matched)
+
+        # The reference codes and names replace any key columns in the data
+        data = df[keep_cols].drop(columns=[code_col, name_col], errors="ignore")
+        data = data.iloc[rows].reset_index(drop=True)
+
+        return pd.concat([key_index.keys, data], axis=1)
+
+    @classmethod
+    def key_index(cls, res):
+        """Returns the GeoKeyIndex of the DataResolution, building it if needed.
+
+        Raises
+        ------
+        ValueError
+            When the DataResolution is not LA, LSOA or MSOA.
+        """
+        with Dataset.KEYS_LOCK:
+            if res not in Dataset.KEY_INDEXES:
+                if res == DataResolution.MSOA:
+                    ref = cls.read_msoa_keys()
+                else:
+                    LSOA, LA = cls.read_keys()
+                    if res == DataResolution.LSOA:
+                        ref = LSOA
+                    elif res == DataResolution.LA:
+                        ref = LA
+                    else:
+                        raise ValueError("Res provided does not match 'LSOA' or 'LA")
+                Dataset.KEY_INDEXES[res] = GeoKeyIndex.from_reference(ref, res)
+            return Dataset.KEY_INDEXES[res]
+
+    @classmethod
+    def read_msoa_keys(cls):
+        """Reads and returns the MSOA reference key table, unless it has been set.
 
-        return df_tidy
+        Notes
+        -------
+        There is no MSOA boundary file in this repo, so the MSOA codes and names are
+        read from the Welsh MSOAs of `MSOA_KEYS_FILE`, the MSOA GP online source. It
+        only has the MSOAs with a GP practice. Like the LA and LSOA keys, these are
+        cached on disk (see `datasets.cache`).
+        """
+        with Dataset.KEYS_LOCK:
+            if Dataset.MSOA_REF is None:
+                path = os.path.join(datasets.SOURCE_DATA_FOLDER, MSOA_KEYS_FILE)
+
+                def build():
+                    keys = pd.read_csv(path, usecols=["msoa11cd", "msoa11nm"])
+                    return cls.clean_keys(
+                        keys, res=DataResolution.MSOA, key_col="msoa11cd"
+                    )
+
+                Dataset.MSOA_REF = cache.cached_frame("keys_MSOA", path, build)
+        return Dataset.MSOA_REF
+
+    @classmethod
+    def set_msoa_keys(cls, keys):
+        """Sets the MSOA reference key table, which MSOA datasets are standardised to.
+
+        Notes
+        -------
+        By default the MSOA keys are read by `read_msoa_keys`. They are replaced by
+        `RollupMatrix.from_reference` with the MSOAs of the reference LSOAs whose
+        ONS codes are known.
+
+        Parameters
+        ----------
+        keys : pd.DataFrame
+            The MSOA codes and names, in columns `msoa11cd` and `msoa11nm`.
+        """
+        with Dataset.KEYS_LOCK:
+            Dataset.MSOA_REF = keys[["msoa11cd", "msoa11nm"]].reset_index(drop=True)
+            Dataset.KEY_INDEXES.pop(DataResolution.MSOA, None)
 
     def clean_bracketed_data(self):
         """For a df with columns in the format 'NUMBER (PERCENTAGE)' this function extracts the
@@ -455,6 +751,10 @@ class Dataset:
         The two new columns will be named the same as the original column, but with `_count`
         or `_pct` appended.
 
+        All the columns are parsed in a single pass with `BRACKETED_DATA_PATTERN`, and
+        the new columns are returned as float64. Values that do not match the pattern
+        are set to NA, with a warning.
+
         Returns
         -------
         pd.DataFrame
@@ -462,23 +762,31 @@ class Dataset:
         """
 
         df = self.std_data_
-        cols = self.bracketed_data_cols
+        cols = list(self.bracketed_data_cols)
+
+        # Stack every bracketed column into a single Series (column by column), so the
+        # compiled pattern is applied once for all of them
+        values = pd.Series(df[cols].to_numpy(dtype=object).ravel(order="F"))
+        parts = values.astype(str).str.extract(BRACKETED_DATA_PATTERN)
+
+        unmatched = values.notna() & parts["count"].isna()
+        if unmatched.any():
+            warn(
+                "{} values in {} are not in the format 'NUMBER (PERCENTAGE)' "
+                "and will be set to NA.".format(unmatched.sum(), cols)
+            )
 
-        # Define the regex pattern and find capture groups
-        def extract_data(string):
-            pattern = r"\d+.?\d+"
-            data = re.findall(pattern, string)
-            return data
+        # Drop thousands separators so the counts can be cast straight to floats
+        parts["count"] = parts["count"].str.replace(",", "", regex=False)
+        parsed = parts.astype("float64").to_numpy()
+        counts = parsed[:, 0].reshape(len(cols), df.shape[0])
+        percents = parsed[:, 1].reshape(len(cols), df.shape[0])
 
-        for col in cols:
-            # Derive the names for the new columns from exitsing names
-            name_counts = col + "_count"
-            name_percent = col + "_pct"
-            # Apply the extract_data function to each line, and the data to two new
-            # columns
-            df[name_counts] = df[col].apply(lambda x: extract_data(x)[0])
-            df[name_percent] = df[col].apply(lambda x: extract_data(x)[1])
-            df.drop(columns=col, inplace=True)
+        for i, col in enumerate(cols):
+            # Derive the names for the new columns from existing names
+            df[col + "_count"] = counts[i]
+            df[col + "_pct"] = percents[i]
+        df.drop(columns=cols, inplace=True)
 
         return df
 
@@ -504,11 +812,150 @@ class Dataset:
             print("File written to " + self.csv_path())
 
 
+@dataclass(frozen=True, eq=False)
+class DatasetJoin:
+    """An immutable plan to join standardised datasets of the same resolution.
+
+    Notes
+    -------
+    Adding datasets together, as in `a + b + c`, only checks that they can be joined
+    and returns a new plan. The datasets are joined with one `aligned_join` the first
+    time the `standardised_data` of the plan is used.
+
+    Plans are compared by identity, and are not hashable, as the Dataset instances
+    they hold are neither comparable nor hashable.
+
+    Attributes
+    ----------
+    datasets: tuple
+        The standardised Dataset instances to join, in order.
+    res: DataResolution
+        The DataResolution of all the datasets.
+    """
+
+    datasets: tuple
+    res: DataResolution
+
+    __hash__ = None
+
+    @classmethod
+    def of(cls, dataset):
+        """Returns the plan of a single standardised Dataset.
+
+        Raises
+        ------
+        TypeError
+            When the dataset is not standardised.
+        """
+        if not dataset.is_standardised:
+            raise TypeError(
+                "Unsupported operand: both dataset needs to be "
+                "standardised before merging!"
+            )
+        return cls(datasets=(dataset,), res=dataset.res)
+
+    def __add__(self, other):
+        """Returns a new plan with the datasets of other joined after these ones.
+
+        Raises
+        ------
+        TypeError
+            When object is not a Dataset or DatasetJoin.
+            When the Dataset is not standardised.
+            When the objects have different resolutions.
+        ValueError
+            When a column name is found in more than one dataset.
+        """
+        if isinstance(other, Dataset):
+            other = DatasetJoin.of(other)
+        elif not isinstance(other, DatasetJoin):
+            raise TypeError(
+                "unsupported operand type(s) for +: {} and {}".format(
+                    self.__class__, type(other)
+                )
+            )
+
+        if self.res != other.res:
+            raise TypeError(
+                "Unsupported operand: both dataset needs to be "
+                "at the same resolution!"
+            )
+
+        overlap = set(self.value_columns) & set(other.value_columns)
+        if overlap:
+            raise ValueError(
+                "The columns {} are found in more than one dataset.".format(
+                    sorted(overlap)
+                )
+            )
+        return DatasetJoin(datasets=self.datasets + other.datasets, res=self.res)
+
+    def __len__(self):
+        return len(self.datasets)
+
+    @staticmethod
+    def _key_cols(dataset):
+        """Returns the code and name columns of a standardised Dataset."""
+        return list(dataset.standardised_data.columns[:2])
+
+    @property
+    def value_columns(self):
+        """Returns the names of the data columns of all the datasets, as a list."""
+        return [
+            col
+            for d in self.datasets
+            for col in d.standardised_data.columns
+            if col not in self._key_cols(d)
+        ]
+
+    @property
+    def is_standardised(self):
+        """Returns True, as only standardised datasets can be planned."""
+        return True
+
+    @cached_property
+    def standardised_data(self):
+        """Returns the joined datasets as a pd.DataFrame, joining them the first time.
+
+        The df has the code and name columns of the resolution, followed by the data
+        columns of each dataset in order.
+        """
+        frames = [
+            d.standardised_data.set_index(self._key_cols(d)) for d in self.datasets
+        ]
+        return aligned_join(frames).reset_index()
+
+
+@dataclass(frozen=True)
+class MasterColumn:
+    """A reference to a column of a master dataset, which is only read when loaded.
+
+    Attributes
+    ----------
+    master: MasterDataset
+        The master dataset the column is in.
+    column: str
+        The name of the column.
+    """
+
+    master: "MasterDataset"
+    column: str
+
+    @property
+    def name(self):
+        """Returns the name of the column."""
+        return self.column
+
+    def load(self):
+        """Returns the column as a pd.Series, reading or generating the master if needed."""
+        return self.master.master_dataset[self.column]
+
+
 @dataclass
 class MasterDataset:
     """Used to call or generate the merged 'master' dataset used
     to write to json. Can be used to generate the 'live' or 'static'
-    master datasets. Will write out to csv if it does not already exist,
+    master datasets. Will be stored if it does not already exist,
     or if user chooses 'from_csv' to be False.
 
     Notes
@@ -526,7 +973,25 @@ class MasterDataset:
     freq: DataFrequency
         The DataFrequency of the data. Accepts STATIC or LIVE.
     from_csv: bool
-        Whether the master dataset should be built from previously generated csv.
+        Whether the master dataset should be read from the previously stored master,
+        rather than generated from the datasets.
+    storage: MasterStorage, optional
+        The format the master dataset is stored in, see `datasets.storage`. By default
+        FeatherStorage. A csv copy is always exported alongside it.
+    mode: ExecutionMode, optional
+        How the datasets are standardised when the master dataset is generated.
+        By default ExecutionMode.SERIAL, one after another.
+    max_workers: int, optional
+        The number of workers used by the THREAD and PROCESS modes. By default None,
+        which lets `concurrent.futures` choose based on the number of CPUs.
+    incremental: bool, optional
+        If True, only the datasets whose fingerprint has changed since the last build
+        are standardised again, and the columns of the others are taken from the
+        cached merge of the last build. By default False.
+    compact_dtypes: bool, optional
+        If True, the columns of the master dataset are stored in the most compact
+        dtype that keeps their values, see `datasets.dtypes`. Use `datasets.dtypes.widen`
+        to restore them to float64. By default True.
     master_dataset_: pd.DataFrame
         The final merged dataset.
     """
@@ -535,15 +1000,32 @@ class MasterDataset:
     res: DataResolution
     freq: DataFrequency
     from_csv: bool = True
+    storage: MasterStorage = field(default_factory=FeatherStorage)
+    mode: ExecutionMode = ExecutionMode.SERIAL
+    max_workers: int = None
+    incremental: bool = False
+    compact_dtypes: bool = True
     master_dataset_: pd.DataFrame = field(init=False, default=None)
 
+    def _path(self, suffix):
+        """Returns str filepath of the master with the given suffix, based on freq and res"""
+        freq_name = self.freq.name.lower()
+        filename = self.res.name + "_" + freq_name + "_master" + suffix
+        return os.path.join(datasets.BASE_FOLDER, "data", freq_name, filename)
+
+    def __getitem__(self, column):
+        """Returns a MasterColumn reference to a column, without reading the master."""
+        return MasterColumn(master=self, column=column)
+
     @property
     def file_path(self):
-        """Returns str filepath to write csv to, based on freq and res"""
-        freq_name = self.freq.name.lower()
-        filename = self.res.name + "_" + self.freq.name.lower() + "_master.csv"
-        filepath = os.path.join(datasets.BASE_FOLDER, "data", freq_name, filename)
-        return filepath
+        """Returns str filepath the master is stored to, based on freq, res and storage"""
+        return self._path(self.storage.suffix)
+
+    @property
+    def csv_path(self):
+        """Returns str filepath the master is exported to as csv, based on freq and res"""
+        return self._path(CsvStorage.suffix)
 
     @property
     def master_dataset(self):
@@ -554,17 +1036,98 @@ class MasterDataset:
             self._set_master_dataset()
         return self.master_dataset_
 
+    def fingerprint(self):
+        """Returns a sha256 hex digest of the inputs the master dataset is built from.
+
+        Notes
+        -------
+        If `from_csv` is True and the master has been stored, it is read from storage,
+        so the stored csv, which the stored copy is rebuilt from when it changes, and
+        the stored copy are fingerprinted. Otherwise the master is generated, and the
+        fingerprints of its datasets are combined (see `Dataset.fingerprint`).
+        """
+        spec = [self.res.name, self.freq.name, self.compact_dtypes]
+        sha = hashlib.sha256(repr(spec).encode())
+        paths = dict.fromkeys([self.csv_path, self.file_path])
+        stored = [path for path in paths if os.path.isfile(path)]
+        if self.from_csv and stored:
+            for path in stored:
+                sha.update(cache.file_hash(path).encode())
+        else:
+            for dataset in self.datasets:
+                sha.update(dataset.fingerprint().encode())
+        return sha.hexdigest()
+
+    def reset(self):
+        """Drops the master dataset and the data of its datasets, so that the master is
+        read or generated again when it is next used."""
+        self.master_dataset_ = None
+        for dataset in self.datasets:
+            dataset.reset()
+
+    def read_columns(self, columns):
+        """Returns only the given columns of the master dataset.
+
+        Notes
+        -------
+        If the master dataset has not been loaded yet, and `from_csv` is True, only the
+        given columns are read from storage. Otherwise this is the same as selecting
+        the columns from `master_dataset`.
+
+        Parameters
+        ----------
+        columns : list
+            Names of the columns to return.
+
+        Returns
+        -------
+        pd.DataFrame
+            The columns of the master dataset, indexed on area code and name.
+        """
+        if self.master_dataset_ is None and self.from_csv and self._is_stored_fresh():
+            try:
+                return self.storage.read(self.file_path, columns=columns)
+            except FileNotFoundError:
+                pass
+        return self.master_dataset[columns]
+
+    @property
+    def stored_cache_name(self):
+        """Returns the name of the cache entry holding the fingerprint of the csv the
+        stored master was written from."""
+        return "{}_{}_stored".format(self.res.name, self.freq.name.lower())
+
+    def _is_stored_fresh(self):
+        """Returns False if the csv export of the master exists, and has changed since
+        the stored master was written, e.g. when it has been updated by `git pull`."""
+        if self.file_path == self.csv_path or not os.path.isfile(self.csv_path):
+            return True
+        return cache.is_fresh(self.csv_path, cache.read_meta(self.stored_cache_name))
+
+    def _store_from_csv(self):
+        """Reads the master from its csv export, and stores it in the format of
+        `storage`, recording the fingerprint of the csv it was read from."""
+        fingerprint = cache.file_fingerprint(self.csv_path)
+        self.master_dataset_ = self._compact(CsvStorage().read(self.csv_path))
+        self.storage.write(self.master_dataset_, self.file_path)
+        cache.write_meta(self.stored_cache_name, fingerprint)
+
     def _set_master_dataset(self):
         """
-        Either returns previous master dataset from csv as a pd.DataFrame,
+        Either returns previous master dataset from storage as a pd.DataFrame,
         or generates new one if not found or user requested 'from_csv' as False.
 
         Notes
         -------
-        If `from_csv=False` or the master csv cannot be found in the expected location
-        this method will generate it, and then write it to the expected location.
-        This also means that in cases where `from_csv=False` any existing .csv in the same
-        location will be overwritten.
+        If `from_csv=False` or the stored master cannot be found in the expected location
+        this method will generate it, and then store it and export it to csv in the
+        expected locations. This also means that in cases where `from_csv=False` any
+        existing stored master and .csv in the same location will be overwritten.
+
+        If only the csv export of the master is found, or the csv has changed since the
+        stored master was written from it (e.g. the committed csv has been updated), it
+        is read and then stored in the format of `storage`, so that later reads are
+        fast. The csv is the source of truth, the stored copy is not committed.
 
         Also note that the index of the df will be set as the name and code key columns.
 
@@ -574,26 +1137,43 @@ class MasterDataset:
             Returns self.master_dataset_ which is an instance of a pandas DataFrame.
         """
 
-        if self.from_csv:
+        if self.from_csv and not self._is_stored_fresh():
+            logging.info(
+                "{} has changed, storing it again to {}".format(
+                    self.csv_path, self.file_path
+                )
+            )
+            self._store_from_csv()
+        elif self.from_csv:
             try:
-                self.master_dataset_ = pd.read_csv(self.file_path)
+                self.master_dataset_ = self._compact(self.storage.read(self.file_path))
                 logging.info(
                     """Master dataset was read from path: {}. If new variables need to be added
                 then add 'from_csv=False' to create a new version.""".format(
                         self.file_path
                     )
                 )
-                # Set the index in the pandas dataframe
-                self.master_dataset_.set_index(["area_code", "area_name"], inplace=True)
             except FileNotFoundError:
-                self._create_master_dataset()
-                self.write(self.master_dataset_, self.file_path)
+                if self.file_path != self.csv_path and os.path.isfile(self.csv_path):
+                    self._store_from_csv()
+                else:
+                    self._create_master_dataset()
+                    self.store()
         else:
             self._create_master_dataset()
-            self.write(self.master_dataset_, self.file_path)
+            self.store()
 
         return self.master_dataset_
 
+    def store(self):
+        """Writes the master dataset to storage, and exports it to csv."""
+        self.storage.write(self.master_dataset_, self.file_path)
+        if self.file_path != self.csv_path:
+            self.write(self.master_dataset_, self.csv_path)
+            cache.write_meta(
+                self.stored_cache_name, cache.file_fingerprint(self.csv_path)
+            )
+
     def _create_master_dataset(self):
         """Applies transformations to variables and sets the master_dataset_
         attribute as the merged pd.DataFrame. Returns class instance.
@@ -622,9 +1202,15 @@ class MasterDataset:
             if self.res == DataResolution.LA:
                 data = self._create_vol_increase_col(data)
         # Currently no live lsoa level data to manage
-        self.master_dataset_ = data
+        self.master_dataset_ = self._compact(data)
         return self
 
+    def _compact(self, data):
+        """Returns data with compact column dtypes if `compact_dtypes` is True."""
+        if not self.compact_dtypes:
+            return data
+        return dtypes.compact(data, name=os.path.basename(self.file_path))
+
     def _merge_datasets(self):
         """Given the list of datasets, standardises them then merges them into one df.
 
@@ -637,42 +1223,26 @@ class MasterDataset:
         ------
         Exception
             When number of rows generated after merge does not match the DataResolution.
+        ValueError
+            When the same column name is found in more than one dataset.
         """
 
-        # First, standardise all the datasets
-        datasets = map(lambda d: d.standardise(), self.datasets)
-        # we get rid of all empty dataset
-        datasets = filter(lambda d: d is not None, datasets)
-        datasets = map(lambda d: d.standardised_data, datasets)
-
-        if self.res == DataResolution.LSOA:
-            datasets = map(
-                lambda d: d.set_index(["LSOA11CD", "LSOA11NM"]),
-                list(datasets),
-            )
-        elif self.res == DataResolution.LA:
-            datasets = map(
-                lambda d: d.set_index(["lad19cd", "lad19nm"]),
-                list(datasets),
-            )
-
-        # Merge all the datasets into one dataframe called data
-        data = reduce(
-            lambda left, right: pd.merge(
-                left, right, left_index=True, right_index=True
-            ),
-            datasets,
-        )
-        # Make the naming of the index cols consistent
-        data.rename_axis(
-            index={
-                "LSOA11CD": "area_code",
-                "LSOA11NM": "area_name",
-                "lad19cd": "area_code",
-                "lad19nm": "area_name",
-            },
-            inplace=True,
-        )
+        manifest = None
+        if self.incremental:
+            frames, manifest = self._incremental_frames()
+        else:
+            # First, standardise all the datasets, getting rid of all empty datasets
+            datasets = self._standardise_datasets(self.datasets)
+            frames = [
+                self._index_frame(d.standardised_data)
+                for d in datasets
+                if d is not None
+            ]
+
+        # Join all the datasets into one dataframe called data
+        data = aligned_join(frames)
+        if manifest is not None:
+            cache.write_entry(self.merge_cache_name, data, manifest)
 
         if self.res == DataResolution.LA:
             if data.shape[0] != LA_COUNT:
@@ -690,6 +1260,152 @@ class MasterDataset:
                 )
         return data
 
+    def _index_frame(self, df):
+        """Sets the code and name columns of a standardised df as its index, named
+        consistently as `area_code` and `area_name`. Column names are set to str."""
+        if self.res == DataResolution.LSOA:
+            df = df.set_index(["LSOA11CD", "LSOA11NM"])
+        elif self.res == DataResolution.MSOA:
+            df = df.set_index(["msoa11cd", "msoa11nm"])
+        elif self.res == DataResolution.LA:
+            df = df.set_index(["lad19cd", "lad19nm"])
+        df = df.rename_axis(index=["area_code", "area_name"])
+        df.columns = df.columns.astype(str)
+        return df
+
+    @property
+    def merge_cache_name(self):
+        """Returns the name of the cache entry holding the last merge of the datasets."""
+        return "{}_{}_merged".format(self.res.name, self.freq.name.lower())
+
+    def _incremental_frames(self):
+        """Returns the indexed frames of all the datasets, only standardising again the
+        datasets whose fingerprint has changed since the last build.
+
+        Notes
+        -------
+        The last merge of the datasets is cached (see `datasets.cache`) with a
+        manifest that records the fingerprint and the columns of each dataset, keyed
+        on its `csv_name`.
+
+        Returns
+        -------
+        tuple
+            The list of frames, and the updated manifest to cache with their merge,
+            which is None if no dataset has changed.
+
+        Raises
+        ------
+        ValueError
+            When the datasets do not have unique `csv_name` attributes.
+        """
+        names = [d.csv_name for d in self.datasets]
+        if len(set(names)) != len(names):
+            raise ValueError("Incremental builds need datasets with unique csv_names.")
+
+        manifest = cache.read_meta(self.merge_cache_name) or {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            manifest = {}
+        entries = manifest.get("datasets", {})
+        fingerprints = [d.fingerprint() for d in self.datasets]
+
+        changed = [
+            d
+            for d, fp in zip(self.datasets, fingerprints)
+            if entries.get(d.csv_name, {}).get("fingerprint") != fp
+        ]
+
+        try:
+            cached = cache.read_frame(self.merge_cache_name)
+        except (FileNotFoundError, ImportError):
+            cached, changed = None, list(self.datasets)
+        changed_ids = set(map(id, changed))
+
+        logging.info(
+            "Standardising {} of {} datasets for the {} {} master dataset.".format(
+                len(changed), len(self.datasets), self.res.name, self.freq.name
+            )
+        )
+        standardised = dict(zip(map(id, changed), self._standardise_datasets(changed)))
+
+        frames = []
+        new_entries = {}
+        for dataset, fp in zip(self.datasets, fingerprints):
+            if id(dataset) not in changed_ids:
+                columns = entries[dataset.csv_name]["columns"]
+                frame = cached[columns]
+            elif standardised[id(dataset)] is not None:
+                frame = self._index_frame(dataset.standardised_data)
+            else:
+                frame = None
+            new_entries[dataset.csv_name] = {
+                "fingerprint": fp,
+                "columns": list(frame.columns) if frame is not None else [],
+            }
+            if frame is not None:
+                frames.append(frame)
+
+        manifest = {"version": MANIFEST_VERSION, "datasets": new_entries}
+        return frames, manifest if changed else None
+
+    def _standardise_datasets(self, datasets):
+        """Standardises the given datasets using the ExecutionMode set in `mode`.
+
+        Notes
+        -------
+        The reference keys are loaded before any worker starts, so that they are
+        read once and shared by all threads (or read from the on-disk cache by each
+        process). The sources of the datasets are read concurrently with
+        `datasets.sources.load_sources` before they are standardised. In PROCESS mode
+        the standardised data is copied back to the Dataset instances in `datasets`.
+
+        Returns
+        -------
+        list
+            The standardised Dataset instances (or None for empty datasets), in the
+            same order as `datasets`, whatever the ExecutionMode.
+        """
+        if self.mode == ExecutionMode.SERIAL or not datasets:
+            return [d.standardise() for d in datasets]
+
+        Dataset.key_index(self.res)
+        self._load_sources(datasets)
+
+        if self.mode == ExecutionMode.THREAD:
+            executor = ThreadPoolExecutor
+        elif self.mode == ExecutionMode.PROCESS:
+            executor = ProcessPoolExecutor
+        else:
+            raise ValueError("Unsupported ExecutionMode {}".format(self.mode))
+
+        # map returns the results in the order of the inputs, so the merged output
+        # does not depend on which worker finishes first
+        with executor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(Dataset.standardise, datasets))
+
+        if self.mode == ExecutionMode.PROCESS:
+            for dataset, result in zip(datasets, results):
+                dataset.std_data_ = result.std_data_ if result is not None else None
+            results = [d if d.is_standardised else None for d in datasets]
+
+        return results
+
+    def _load_sources(self, datasets):
+        """Reads the SourceSpecs of the datasets that are not loaded yet, concurrently."""
+        pending = [
+            d for d in datasets if isinstance(d.data, SourceSpec) and d.data_ is None
+        ]
+        if not pending:
+            return
+        frames, seconds = load_sources(
+            {i: d.data for i, d in enumerate(pending)}, max_workers=self.max_workers
+        )
+        for i, dataset in enumerate(pending):
+            dataset.data_ = frames[i]
+            logging.info(
+                "Read the source of {} in {:.2f}s".format(dataset.csv_name, seconds[i])
+            )
+
     @staticmethod
     def _create_over_65_col(data):
         """Create a new over_65 column in the master and drop the redundant columns."""
@@ -792,5 +1508,5 @@ class MasterDataset:
 
     @staticmethod
     def write(data, filepath):
-        """Writes data to csv on the given filepath."""
-        data.to_csv(filepath)
+        """Writes data to csv on the given filepath, see `CsvStorage`."""
+        CsvStorage().write(data, filepath)
@@ -0,0 +1,180 @@
+"""Plans compact dtypes for master datasets, to reduce the memory they use.
+
+The dataclasses defined in this module are:
+    DtypePlan
+
+The functions defined in this module are:
+    widen
+    compact
+
+Notes
+-----
+Master datasets are created as float64. The plan only narrows a column when no
+information is lost, so the values can be restored exactly with `widen`:
+    - columns of whole numbers with no missing values become int32.
+    - columns with at most `decimals` decimal places become float32. These are
+      restored by rounding back to `decimals` places once widened to float64.
+    - all other columns stay float64.
+The `area_code` and `area_name` index of the masters is a pd.MultiIndex, which
+already stores each level as a dictionary of unique values and integer codes, the
+same encoding as a categorical column, so it is left as it is.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+
+DECIMALS = 3  # Number of decimal places values are rounded to in the json output
+
+INT32_INFO = np.iinfo(np.int32)
+
+
+@dataclass(frozen=True)
+class DtypePlan:
+    """The compact dtype chosen for each column of a df.
+
+    Attributes
+    ----------
+    dtypes: dict
+        Dictionary in format {'column' : dtype } of the dtype chosen for each column.
+    bytes_before: int
+        Memory used by the df the plan was made for, including its index.
+    bytes_after: int
+        Memory used by the df once the plan has been applied.
+    decimals: int
+        Number of decimal places that float32 columns are restored to by `widen`.
+    """
+
+    dtypes: dict
+    bytes_before: int
+    bytes_after: int
+    decimals: int = DECIMALS
+
+    @classmethod
+    def from_frame(cls, df, decimals=DECIMALS):
+        """Plans the most compact lossless dtype for each numeric column of df.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The df to plan dtypes for. Columns that are not numeric keep their dtype.
+        decimals : int, optional
+            Number of decimal places a column may have to be stored as float32.
+
+        Returns
+        -------
+        DtypePlan
+            The plan for df.
+        """
+        dtypes = {col: cls.column_dtype(series, decimals) for col, series in df.items()}
+        bytes_before = int(df.memory_usage(index=True, deep=True).sum())
+        bytes_after = bytes_before - sum(
+            df[col].memory_usage(index=False, deep=True)
+            - len(df) * np.dtype(dtype).itemsize
+            for col, dtype in dtypes.items()
+            if dtype != df[col].dtype
+        )
+        return cls(
+            dtypes=dtypes,
+            bytes_before=bytes_before,
+            bytes_after=int(bytes_after),
+            decimals=decimals,
+        )
+
+    @staticmethod
+    def column_dtype(series, decimals=DECIMALS):
+        """Returns the most compact dtype that stores series without loss.
+
+        Parameters
+        ----------
+        series : pd.Series
+            The column to choose a dtype for.
+        decimals : int, optional
+            Number of decimal places a column may have to be stored as float32.
+
+        Returns
+        -------
+        np.dtype
+            int32, float32, or the current dtype of the series.
+        """
+        if not pd.api.types.is_numeric_dtype(
+            series.dtype
+        ) or pd.api.types.is_bool_dtype(series.dtype):
+            return series.dtype
+
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        finite = np.isfinite(values)
+        if (
+            finite.all()
+            and (values == np.round(values)).all()
+            and (values >= INT32_INFO.min).all()
+            and (values <= INT32_INFO.max).all()
+        ):
+            return np.dtype("int32")
+
+        restored = np.round(values.astype("float32").astype("float64"), decimals)
+        nans = np.isnan(values)
+        if ((restored == values) | (nans & np.isnan(restored))).all():
+            return np.dtype("float32")
+        return series.dtype
+
+    @property
+    def bytes_saved(self):
+        """Returns the number of bytes saved by applying the plan."""
+        return self.bytes_before - self.bytes_after
+
+    def apply(self, df):
+        """Returns df with its columns cast to the planned dtypes."""
+        changed = {
+            col: dtype for col, dtype in self.dtypes.items() if dtype != df[col].dtype
+        }
+        if not changed:
+            return df
+        return df.astype(changed)
+
+    def report(self):
+        """Returns a one line summary of the dtypes chosen and the memory saved."""
+        counts = pd.Series(
+            [str(dtype) for dtype in self.dtypes.values()]
+        ).value_counts()
+        summary = ", ".join("{} {}".format(n, dtype) for dtype, n in counts.items())
+        return "{} columns ({}), {} bytes reduced to {} ({} saved)".format(
+            len(self.dtypes),
+            summary,
+            self.bytes_before,
+            self.bytes_after,
+            self.bytes_saved,
+        )
+
+
+def widen(data, decimals=DECIMALS):
+    """Restores the float64 values of compact master dataset columns.
+
+    Parameters
+    ----------
+    data : pd.Series or pd.DataFrame
+        Data with columns planned by `DtypePlan`.
+    decimals : int, optional
+        The number of decimal places used to plan float32 columns.
+
+    Returns
+    -------
+    pd.Series or pd.DataFrame
+        Data with every int32 and float32 column cast to float64, equal to the values
+        before the plan was applied.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.apply(widen, decimals=decimals)
+    if data.dtype == np.dtype("float32"):
+        return data.astype("float64").round(decimals)
+    if data.dtype == np.dtype("int32"):
+        return data.astype("float64")
+    return data
+
+
+def compact(df, name="", decimals=DECIMALS):
+    """Applies a `DtypePlan` to df, logging the memory saved, and returns the result."""
+    plan = DtypePlan.from_frame(df, decimals=decimals)
+    logging.info("Planned dtypes for {}: {}".format(name, plan.report()))
+    return plan.apply(df)
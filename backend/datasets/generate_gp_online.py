@@ -20,10 +20,11 @@ import os
 # ------------------
 
 from datasets import SOURCE_DATA_FOLDER
+from datasets.cache import read_excel
 from .dataset import DataResolution
 
 
-GP_DATA = pd.read_excel(
+GP_DATA = read_excel(
     os.path.join(SOURCE_DATA_FOLDER, "local", "Digital Exclusion sources.xlsx"),
     sheet_name="Pts Registered with MHOL",
     use_cols=["A", "C", "E:G"],
@@ -0,0 +1,345 @@
+"""Keeps an append-only history of the live PHW snapshots, partitioned by date.
+
+The dataclasses defined in this module are:
+    HistorySpec
+    HistoryStore
+
+The functions defined in this module are:
+    snapshot_date
+    day_hashes
+    ingest_histories
+
+Notes
+-----
+PHW publish a new workbook every day, which replaces the last one in the raw folder.
+Each workbook is ingested into a `HistoryStore`, so the history is kept after the
+workbook is replaced, and time series can be read without parsing a workbook.
+
+Each store is a folder in `HISTORY_FOLDER`, with a parquet file per month of data,
+e.g. `month=2021-03.parquet`, holding a row per area and day, sorted by area then
+date. A `manifest.json` records the hash of the rows of each day ingested, so
+ingesting a snapshot only writes the months with a day that is new or has been
+revised, and days that are unchanged (e.g. the overlap between consecutive
+snapshots) are skipped. Days are never removed: when a snapshot no longer includes
+a day, the stored rows are kept, and when it revises a day, the revised rows replace
+the stored ones.
+
+Files are written atomically and the manifest is written last, so a reader never
+sees a partially written month. A store should only have one writer at a time.
+
+Stores require `pyarrow`.
+"""
+
+import os
+import json
+import logging
+import hashlib
+import datetime
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+
+import datasets
+from datasets.cache import _write_atomic, _write_json
+from datasets.sources import SourceSpec, GRID_CACHE
+
+logger = logging.getLogger(__name__)
+
+DATE_COL = "date"  # Name of the date column of a history
+
+MANIFEST = "manifest.json"
+
+
+def snapshot_date(path):
+    """Returns the date a workbook was last saved, or else the date of the file.
+
+    Notes
+    -------
+    Used to date snapshots whose rows have no date, e.g. the PHW vaccination uptake.
+    """
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            modified = workbook.properties.modified
+        finally:
+            workbook.close()
+        if modified is not None:
+            return pd.Timestamp(modified).normalize()
+    return pd.Timestamp(datetime.date.fromtimestamp(os.path.getmtime(path)))
+
+
+def day_hashes(snapshot):
+    """Returns the sha256 hex digest of the rows of each day of a snapshot.
+
+    Notes
+    -------
+    Every row is hashed at once, then the row hashes of each day are hashed with the
+    column names and dtypes, so the digest of a day only changes when its rows do.
+
+    Returns
+    -------
+    dict
+        Dictionary in format {'YYYY-MM-DD' : 'hash' }.
+    """
+    header = repr([list(snapshot.columns), [str(t) for t in snapshot.dtypes]])
+    rows = pd.util.hash_pandas_object(snapshot, index=False).to_numpy()
+    days = snapshot[DATE_COL].dt.strftime("%Y-%m-%d").to_numpy()
+    order = np.argsort(days, kind="stable")
+    days, rows = days[order], rows[order]
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    ends = np.r_[starts[1:], len(days)]
+    digests = {}
+    for start, end in zip(starts, ends):
+        sha = hashlib.sha256(header.encode())
+        sha.update(rows[start:end].tobytes())
+        digests[days[start]] = sha.hexdigest()
+    return digests
+
+
+@dataclass(frozen=True)
+class HistorySpec:
+    """Defines a history of a live source, with a row per area and day.
+
+    Attributes
+    ----------
+    name: str
+        Name of the history, used as the name of its folder.
+    source: SourceSpec
+        The source each snapshot is read from.
+    key_col: str
+        Name of the column of the source with the area names or codes.
+    value_cols: tuple
+        Names of the columns of the source that are kept in the history.
+    date_col: str, optional
+        Name of the column of the source with the date of each row. By default
+        None, for sources with a row per area, which are dated by `snapshot_date`.
+    """
+
+    name: str
+    source: SourceSpec
+    key_col: str
+    value_cols: tuple
+    date_col: str = None
+
+    @property
+    def columns(self):
+        """Returns the columns of the history, in order."""
+        return [self.key_col, DATE_COL, *self.value_cols]
+
+    def snapshot(self, date=None):
+        """Reads the source, and returns its rows in the format of the history.
+
+        Notes
+        -------
+        The source file is always parsed again, rather than served from the grid
+        parsed for an earlier build (see `GRID_CACHE`), so the rows ingested are
+        those of the file the snapshot is dated from.
+
+        Parameters
+        ----------
+        date : pd.Timestamp, optional
+            Date given to the rows of a source without a `date_col`. By default the
+            `snapshot_date` of the source file.
+
+        Returns
+        -------
+        pd.DataFrame
+            The `columns` of the history, with a row per area and day. Where the
+            source has more than one row for an area and day the last one is kept.
+        """
+        if self.date_col is None and date is None:
+            date = snapshot_date(self.source.path)
+        GRID_CACHE.discard(self.source)
+        df = self.source.load()
+        if self.date_col is None:
+            dates = date
+        else:
+            dates = df[self.date_col]
+        df = df.assign(**{DATE_COL: pd.to_datetime(dates)})
+        df[DATE_COL] = df[DATE_COL].dt.normalize().astype("datetime64[ns]")
+        df = df.dropna(subset=[self.key_col, DATE_COL])
+        df = df.drop_duplicates([self.key_col, DATE_COL], keep="last")
+        return df[self.columns].sort_values([self.key_col, DATE_COL], ignore_index=True)
+
+
+@dataclass(frozen=True)
+class HistoryStore:
+    """The stored history of a `HistorySpec`.
+
+    Attributes
+    ----------
+    spec: HistorySpec
+        The history that is stored.
+    folder: str, optional
+        The folder of the store. By default `spec.name` in `HISTORY_FOLDER`.
+    """
+
+    spec: HistorySpec
+    folder: str = None
+
+    @property
+    def path(self):
+        """Returns the path of the folder of the store."""
+        if self.folder is not None:
+            return self.folder
+        return os.path.join(datasets.HISTORY_FOLDER, self.spec.name)
+
+    def _month_path(self, month):
+        """Returns the path of the file of a month, given as "YYYY-MM"."""
+        return os.path.join(self.path, "month={}.parquet".format(month))
+
+    def manifest(self):
+        """Returns the manifest, in format {'days': {'YYYY-MM-DD' : 'hash' }}."""
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"days": {}}
+
+    def days(self):
+        """Returns the days in the store, as a sorted pd.DatetimeIndex."""
+        return pd.DatetimeIndex(sorted(self.manifest()["days"]))
+
+    def ingest(self, snapshot=None):
+        """Adds the days of a snapshot that are new or revised to the store.
+
+        Parameters
+        ----------
+        snapshot : pd.DataFrame, optional
+            The snapshot to ingest, in the format given by `HistorySpec.snapshot`.
+            By default the current snapshot of the source is read.
+
+        Returns
+        -------
+        dict
+            Dictionary in format {'added' : n, 'revised' : n, 'unchanged' : n } of
+            the number of days of the snapshot in each case.
+        """
+        if snapshot is None:
+            snapshot = self.spec.snapshot()
+        manifest = self.manifest()
+        stored = manifest["days"]
+
+        counts = {"added": 0, "revised": 0, "unchanged": 0}
+        changed = {}
+        digests = day_hashes(snapshot)
+        for date, rows in snapshot.groupby(DATE_COL, sort=True):
+            day = date.strftime("%Y-%m-%d")
+            digest = digests[day]
+            if stored.get(day) == digest:
+                counts["unchanged"] += 1
+                continue
+            counts["revised" if day in stored else "added"] += 1
+            changed[day] = (digest, rows)
+
+        months = sorted({day[:7] for day in changed})
+        os.makedirs(self.path, exist_ok=True)
+        for month in months:
+            days = {day: rows for day, (_, rows) in changed.items() if day[:7] == month}
+            path = self._month_path(month)
+            frames = list(days.values())
+            if os.path.exists(path):
+                kept = pd.read_parquet(path)
+                revised = kept[DATE_COL].dt.strftime("%Y-%m-%d").isin(list(days))
+                frames.insert(0, kept[~revised])
+            data = pd.concat(frames, ignore_index=True)
+            data = data.sort_values([self.spec.key_col, DATE_COL], ignore_index=True)
+            _write_atomic(path, lambda p: data.to_parquet(p, index=False))
+
+        if changed:
+            stored.update({day: digest for day, (digest, _) in changed.items()})
+            manifest["days"] = dict(sorted(stored.items()))
+            _write_atomic(
+                os.path.join(self.path, MANIFEST), lambda p: _write_json(p, manifest)
+            )
+        logger.info(
+            "Ingested {}: {} days added, {} revised, {} unchanged".format(
+                self.spec.name, counts["added"], counts["revised"], counts["unchanged"]
+            )
+        )
+        return counts
+
+    def read(self, start=None, end=None, areas=None, columns=None):
+        """Reads the rows of a range of days, optionally for some areas only.
+
+        Notes
+        -------
+        Only the months that overlap the range are read, and the areas and days are
+        filtered as the files are read.
+
+        Parameters
+        ----------
+        start : str or datetime-like, optional
+            The first day to read. By default the first day stored.
+        end : str or datetime-like, optional
+            The last day to read (inclusive). By default the last day stored.
+        areas : list, optional
+            The areas to read, as found in the key column. By default all areas.
+        columns : list, optional
+            The value columns to read. By default all of them.
+
+        Returns
+        -------
+        pd.DataFrame
+            The key, date and value columns of the rows, sorted by area then date.
+        """
+        start = None if start is None else pd.Timestamp(start).normalize()
+        end = None if end is None else pd.Timestamp(end).normalize()
+        months = sorted({day[:7] for day in self.manifest()["days"]})
+        if start is not None:
+            months = [m for m in months if m >= start.strftime("%Y-%m")]
+        if end is not None:
+            months = [m for m in months if m <= end.strftime("%Y-%m")]
+
+        filters = []
+        if start is not None:
+            filters.append((DATE_COL, ">=", start))
+        if end is not None:
+            filters.append((DATE_COL, "<=", end))
+        if areas is not None:
+            filters.append((self.spec.key_col, "in", list(areas)))
+        columns = [
+            self.spec.key_col,
+            DATE_COL,
+            *(self.spec.value_cols if columns is None else columns),
+        ]
+
+        frames = [
+            pd.read_parquet(
+                self._month_path(month), columns=columns, filters=filters or None
+            )
+            for month in months
+        ]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        data = pd.concat(frames, ignore_index=True)
+        return data.sort_values([self.spec.key_col, DATE_COL], ignore_index=True)
+
+
+def ingest_histories(specs):
+    """Ingests the current snapshot of each `HistorySpec` into its store.
+
+    Notes
+    -------
+    A snapshot that fails to be read is logged and skipped, so one bad download does
+    not stop the others being ingested.
+
+    Parameters
+    ----------
+    specs : list
+        The `HistorySpec` of each history to update.
+
+    Returns
+    -------
+    dict
+        Dictionary in format {'name' : counts } of the counts given by `ingest`.
+    """
+    results = {}
+    for spec in specs:
+        try:
+            results[spec.name] = HistoryStore(spec).ingest()
+        except (FileNotFoundError, ValueError, KeyError) as e:
+            logger.error("Could not ingest {}: {}".format(spec.name, e))
+    return results
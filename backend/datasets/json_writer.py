@@ -0,0 +1,212 @@
+"""Writes the dashboard json, streaming the records of its dfs to the output file.
+
+The classes defined in this module are:
+    JsonBackend
+    StdlibJsonBackend
+    OrjsonBackend
+
+The functions defined in this module are:
+    write_json
+    dumps
+
+Notes
+-----
+The dashboard json is an object whose values are small objects, and dfs written as
+lists of records, e.g. `DataDashboard.to_json`. Rather than converting each df to a
+list of dicts with `to_dict(orient="records")` and encoding it with `json.dump`,
+`write_json` writes the records of `CHUNK_ROWS` rows at a time from the columns of
+the df, so neither a dict per area nor a float object per value of the whole df is
+held in memory.
+
+`StdlibJsonBackend`, the default, writes the same bytes as `json.dump` of the records.
+`OrjsonBackend` is quicker, and requires `orjson`. It writes compact json, i.e.
+without spaces after separators, and writes missing values as `null` rather than
+`NaN`, so it is not byte-identical.
+"""
+
+import io
+import json
+import numpy as np
+import pandas as pd
+from abc import ABC, abstractmethod
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+CHUNK_ROWS = 10000  # Number of records encoded at a time
+BUFFER_SIZE = 1 << 20  # Bytes buffered before they are written to the file
+
+# Encoding of the values `json.dump` writes for non-finite floats
+NON_FINITE = {"nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}
+
+
+class JsonBackend(ABC):
+    """ABC for an encoder that the dashboard json can be written with.
+
+    Notes
+    -------
+    Records are encoded a column at a time by `column`, and joined with one format
+    str per record. A chunk with a column that `column` cannot encode, or with
+    column names that are not str, is encoded from its records by `dumps`.
+
+    Attributes
+    ----------
+    item_separator: str
+        Separator written between the items of lists and objects.
+    key_separator: str
+        Separator written between the keys and values of objects.
+    """
+
+    item_separator = None
+    key_separator = None
+
+    @abstractmethod
+    def dumps(self, obj):
+        """Returns obj encoded as a json str."""
+
+    @abstractmethod
+    def column(self, series):
+        """Returns the list of encoded values of series, or None for other dtypes."""
+
+    def records(self, df):
+        """Returns the encoded records of the rows of df, without brackets.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            The rows to encode, as `df.to_dict(orient="records")` would. The index
+            is not written.
+
+        Returns
+        -------
+        str
+            The records, separated by `item_separator`.
+        """
+        if df.empty:
+            return ""
+        columns = [self.column(series) for _, series in df.items()]
+        if any(column is None for column in columns) or not all(
+            isinstance(col, str) for col in df.columns
+        ):
+            return self.dumps(df.to_dict(orient="records"))[1:-1]
+
+        # One format str per record, with a %s for each value
+        keys = [
+            self.dumps(col).replace("%", "%%") + self.key_separator
+            for col in df.columns
+        ]
+        record = "{" + self.item_separator.join(key + "%s" for key in keys) + "}"
+        return self.item_separator.join(map(record.__mod__, zip(*columns)))
+
+
+def _str_values(series):
+    """Returns the values of series as a list if they are all str, otherwise None."""
+    if not pd.api.types.is_string_dtype(series.dtype) or series.hasnans:
+        return None
+    values = series.tolist()
+    if all(isinstance(value, str) for value in values):
+        return values
+    return None
+
+
+class StdlibJsonBackend(JsonBackend):
+    """Encodes the json as `json.dump` does with its default options.
+
+    Notes
+    -------
+    Columns of str values and of float64 or int64 values are encoded from their
+    numpy arrays with the encoders used by `json.dump`.
+    """
+
+    item_separator = ", "
+    key_separator = ": "
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    def column(self, series):
+        if series.dtype == np.dtype("float64"):
+            values = series.to_numpy()
+            encoded = list(map(float.__repr__, values.tolist()))
+            if not np.isfinite(values).all():
+                for i in np.flatnonzero(~np.isfinite(values)).tolist():
+                    encoded[i] = NON_FINITE[encoded[i]]
+            return encoded
+        if series.dtype == np.dtype("int64"):
+            return list(map(int.__repr__, series.to_numpy().tolist()))
+        values = _str_values(series)
+        if values is not None:
+            return list(map(encode_basestring_ascii, values))
+        return None
+
+
+class OrjsonBackend(JsonBackend):
+    """Encodes the json with `orjson`, which must be installed.
+
+    Notes
+    -------
+    The output is compact and UTF-8, and missing values are written as `null`.
+    Columns of float64 or int64 values are encoded by `orjson` in one call.
+    """
+
+    item_separator = ","
+    key_separator = ":"
+
+    def dumps(self, obj):
+        import orjson
+
+        return orjson.dumps(obj).decode()
+
+    def column(self, series):
+        import orjson
+
+        if series.dtype in (np.dtype("float64"), np.dtype("int64")):
+            # Numbers hold no commas, so the encoded array splits into its values
+            encoded = orjson.dumps(
+                series.to_numpy(), option=orjson.OPT_SERIALIZE_NUMPY
+            ).decode()
+            return encoded[1:-1].split(",")
+        values = _str_values(series)
+        if values is not None:
+            return list(map(encode_basestring, values))
+        return None
+
+
+def write_json(obj, stream, backend=None, chunk_rows=CHUNK_ROWS):
+    """Writes obj as json to stream, writing its dfs as lists of records.
+
+    Parameters
+    ----------
+    obj : dict
+        The object to write. Values that are a pd.DataFrame are written as the list
+        `df.to_dict(orient="records")`, other values as they are.
+    stream : file-like
+        A text stream opened for writing, e.g. `open(path, "w", encoding="utf-8")`.
+    backend : JsonBackend, optional
+        The encoder used. By default StdlibJsonBackend, which writes the same bytes as
+        `json.dump` of obj with its dfs converted to records.
+    chunk_rows : int, optional
+        Number of records encoded at a time. By default `CHUNK_ROWS`.
+    """
+    backend = backend or StdlibJsonBackend()
+    stream.write("{")
+    for i, (key, value) in enumerate(obj.items()):
+        if i:
+            stream.write(backend.item_separator)
+        stream.write(backend.dumps(key) + backend.key_separator)
+        if not isinstance(value, pd.DataFrame):
+            stream.write(backend.dumps(value))
+            continue
+
+        stream.write("[")
+        for start in range(0, len(value), chunk_rows):
+            if start:
+                stream.write(backend.item_separator)
+            stream.write(backend.records(value.iloc[start : start + chunk_rows]))
+        stream.write("]")
+    stream.write("}")
+
+
+def dumps(obj, backend=None):
+    """Returns obj encoded by `write_json` as a str."""
+    stream = io.StringIO()
+    write_json(obj, stream, backend=backend)
+    return stream.getvalue()
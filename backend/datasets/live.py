@@ -8,64 +8,117 @@ Notes
 This module imports classes from the `dataset` module.
 The `LA_LIVE` master dataset definition has `from_csv=False`. This means that the
 live dataset master will always be regenerated from the source files given here,
-rather than read from the existing master csv.
+rather than read from the existing master csv. It also has `incremental=True`, so
+only the sources that have changed since the last build are standardised again.
 
 To add a new live datasource, follow the existing examples for a `SOURCE_` constant
-that is read from file, passed to a `Dataset` definition, and then the Dataset
+that defines how the file is read (see `datasets.sources`), passed to a `Dataset` definition, and then the Dataset
 definition defined in the `LA_LIVE` datasets list to ensure it is included.
 
 """
 
 import pandas as pd
 import os
+import logging
 from functools import partial
-import sqlite3
 
 from datasets import LIVE_DATA_FOLDER, LIVE_RAW_DATA_FOLDER
 
 from datasets.dataset import DataResolution, DataFrequency, Dataset, MasterDataset
+from datasets.sources import SourceSpec
+from datasets.history import HistorySpec
+from datasets.sentiment import aggregates_installed
+
+logger = logging.getLogger(__name__)
 
 p_live = partial(os.path.join, LIVE_DATA_FOLDER)
 p_raw = partial(os.path.join, LIVE_RAW_DATA_FOLDER)
 
+
 # Get, and do some tidying, of the PHW data
-SOURCE_COVID_COUNT_LA = pd.read_excel(
+def adult_vax_pct(df):
+    """Filters the PHW vaccination data to the uptake of all adults."""
+    return df[df["Risk group"] == "Wales residents aged 18 years and older"]
+
+
+def zoe_support(df):
+    """Transposes the ZOE survey data so there is a row per local authority."""
+    df = df.T
+    df.reset_index(level=0, inplace=True)
+    return df
+
+
+SOURCE_COVID_COUNT_LA = SourceSpec(
     p_raw("Rapid-COVID-19-surveillance-data.xlsx"),
     sheet_name="Tests by specimen date",
     usecols="A, B, E",
+    latest="Specimen date",
 )  # LA, date, cumulative cases per 100,000
-SOURCE_COVID_COUNT_LA["Specimen date"] = pd.to_datetime(
-    SOURCE_COVID_COUNT_LA["Specimen date"]
-)
-latest_date = SOURCE_COVID_COUNT_LA["Specimen date"].max()
-# Filter data by the latest date
-SOURCE_COVID_COUNT_LA = SOURCE_COVID_COUNT_LA[
-    SOURCE_COVID_COUNT_LA["Specimen date"] == latest_date
-]
 
-SOURCE_VAX_PCT_LA = pd.read_excel(
+SOURCE_VAX_PCT_LA = SourceSpec(
     p_raw("COVID19-vaccination-downloadable-data-.xlsx"),
     sheet_name="HealthBoard_LocalAuthority",
     usecols="A, B, E, G",
     skiprows=1,
+    transform=adult_vax_pct,
 )
-SOURCE_VAX_PCT_LA = SOURCE_VAX_PCT_LA[
-    SOURCE_VAX_PCT_LA["Risk group"] == "Wales residents aged 18 years and older"
-]
 
-SOURCE_GROUP_COUNTS_LA = pd.read_csv(p_live("groupCount_LA.csv"))
+# The full history of the PHW sheets, kept by `datasets.history` as each is replaced
+SOURCE_COVID_HISTORY_LA = SourceSpec(
+    p_raw("Rapid-COVID-19-surveillance-data.xlsx"),
+    sheet_name="Tests by specimen date",
+    usecols="A:E",
+)  # LA, date, new cases, cumulative cases, cumulative cases per 100,000
+
+HISTORY_COVID_LA = HistorySpec(
+    name="covid_cases_la",
+    source=SOURCE_COVID_HISTORY_LA,
+    key_col="Local Authority",
+    date_col="Specimen date",
+    value_cols=(
+        "Cases (new)",
+        "Cumulative cases",
+        "Cumulative incidence per 100,000 population",
+    ),
+)
 
-SOURCE_WCVA_ONLINE_LA = pd.read_csv(p_live("la_wcva_2020-05-18.csv"), usecols=[0, 1, 2])
+HISTORY_VAX_PCT_LA = HistorySpec(
+    name="vax_pct_la",
+    source=SOURCE_VAX_PCT_LA,
+    key_col="Area of residence",
+    value_cols=("Uptake(%) - Dose1", "Uptake(%) - Dose2"),
+)  # The uptake has no date, so each snapshot is dated when the workbook was saved
 
-SOURCE_TWEETS_LA = pd.read_csv(p_live("community_tweets.csv"))
+LIVE_HISTORIES = [HISTORY_COVID_LA, HISTORY_VAX_PCT_LA]
 
-SOURCE_ZOE_SUPPORT_LA = pd.read_csv(p_live("help_need20200531.csv"), nrows=3).T
-SOURCE_ZOE_SUPPORT_LA.reset_index(level=0, inplace=True)
+SOURCE_GROUP_COUNTS_LA = SourceSpec(p_live("groupCount_LA.csv"))
+
+SOURCE_WCVA_ONLINE_LA = SourceSpec(p_live("la_wcva_2020-05-18.csv"), usecols=(0, 1, 2))
+
+SOURCE_TWEETS_LA = SourceSpec(p_live("community_tweets.csv"))
+
+SOURCE_ZOE_SUPPORT_LA = SourceSpec(
+    p_live("help_need20200531.csv"), nrows=3, transform=zoe_support
+)
 
 # This query gets the average sentiment for the past seven days, linked to local authority areas.
-# This is then queried from the twitter data collection database.
+# Each author's average is taken first, so that prolific authors are not overweighted.
+# It reads the daily aggregates of the twitter data collection database, see
+# `datasets.sentiment`, which are installed by the collector.
 VADER_QUERY = """SELECT AVG(vader_comp_avg),lsoa,lsoa_name from
 (
+SELECT SUM(vader_sum) / SUM(vader_count) as vader_comp_avg, author_id, lsoa, lsoa_name
+FROM daily_sentiment
+WHERE day >= date('now','start of day','-7 days')
+GROUP BY author_id,lsoa
+HAVING SUM(tweet_count) > 0
+) as lastweek_tweets
+GROUP BY lsoa;
+"""
+
+# The same average, queried from the tweets, for databases without the aggregates.
+VADER_TWEETS_QUERY = """SELECT AVG(vader_comp_avg),lsoa,lsoa_name from
+(
 SELECT AVG(tweets.vader_comp) as vader_comp_avg, tweets.author_id, matchedplaces.lsoa, matchedplaces.lsoa_name
 FROM tweets
 JOIN places ON tweets.place_id = places.id
@@ -76,9 +129,23 @@ GROUP BY tweets.author_id,matchedplaces.lsoa
 GROUP BY lsoa;
 """
 
-SOURCE_TWEET_SENTIMENT_LA = pd.read_sql(
-    VADER_QUERY,
-    con=sqlite3.connect(os.path.join(LIVE_RAW_DATA_FOLDER, "phw_tweets.db")),
+
+def vader_query(path):
+    """Returns VADER_TWEETS_QUERY if the aggregates of `VADER_QUERY` are not installed
+    in the database at path, otherwise None to run VADER_QUERY."""
+    if aggregates_installed(path):
+        return None
+    logger.warning(
+        "The sentiment aggregates are not installed in {}, querying the tweets. "
+        "Install them with `python -m datasets.sentiment`.".format(path)
+    )
+    return VADER_TWEETS_QUERY
+
+
+SOURCE_TWEET_SENTIMENT_LA = SourceSpec(
+    os.path.join(LIVE_RAW_DATA_FOLDER, "phw_tweets.db"),
+    query=VADER_QUERY,
+    prepare=vader_query,
 )
 
 # Labelling this as a pct, it's not really but ensures it doesn't get changed.
@@ -175,4 +242,5 @@ LA_LIVE = MasterDataset(
     res=DataResolution.LA,
     freq=DataFrequency.LIVE,
     from_csv=False,
+    incremental=True,
 )
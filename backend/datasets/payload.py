@@ -0,0 +1,268 @@
+"""Encodes the dashboard data as a compact, columnar payload for the frontend.
+
+The functions defined in this module are:
+    fixed_point
+    columnar_payload
+    encode_payload
+    write_payload
+    columnar_path
+    hashed_name
+    write_split_payloads
+
+Notes
+-----
+In `data.json` the LA and LSOA data are lists of records, so every record repeats
+every variable name. In the columnar payload each section is instead an object
+holding one array of the area codes, and one array per variable of its values as
+fixed-point integers, i.e. the values (rounded to `DECIMALS` places in the json)
+multiplied by `scale`. Missing values are `null`. For example:
+
+    {"schema": 1, "scale": 1000, "updated": "2021-01-01", "variables": [...],
+     "LAs": {"area_code": ["W06000001", ...], "groups": [1234, ...], ...},
+     "LSOAs": {...}}
+
+The layout is versioned by `SCHEMA_VERSION`, and described by the
+`ColumnarDashboardData` schema of `docs/data_schema.yaml`, which must be updated
+with it.
+
+`write_payload` also writes gzip and brotli versions of the payload next to it, to
+be served as they are. Brotli requires the `brotli` package.
+
+`write_split_payloads` writes payloads that change at different rates, e.g. the
+static and the live data, to files named by a hash of their content, and a small
+manifest naming the current files. A file with a given name never changes, so it
+can be cached indefinitely, and only the manifest has to be fetched again to find
+out whether anything has changed:
+
+    {"schema": 1, "static": "data.static.0123456789ab.json",
+     "live": "data.live.ba9876543210.json"}
+"""
+
+import os
+import re
+import gzip
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from warnings import warn
+
+from datasets.cache import _write_atomic
+from datasets.dtypes import DECIMALS
+
+SCHEMA_VERSION = 1  # Version of the layout, see `ColumnarDashboardData`
+COLUMNAR_SUFFIX = ".columnar.json"  # Replaces the .json of the records payload
+CODE_COL = "area_code"
+DROP_COLS = ["area_name"]  # Columns of the frames not written to the payload
+
+MANIFEST_SUFFIX = ".manifest.json"  # Replaces the .json of the records payload
+HASH_LENGTH = 12  # Number of hex digits of the content hash kept in file names
+KEEP_VERSIONS = 2  # Number of versions of each split payload kept, see `_prune`
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def fixed_point(series, decimals=DECIMALS):
+    """Returns the values of series as a list of fixed-point integers.
+
+    Parameters
+    ----------
+    series : pd.Series
+        Numeric values, rounded to at most `decimals` decimal places.
+    decimals : int, optional
+        Number of decimal places kept, the values are multiplied by 10**decimals.
+
+    Returns
+    -------
+    list
+        The integer values, with None for missing values.
+    """
+    values = series.to_numpy(dtype="float64")
+    integers = np.rint(values * 10**decimals)
+    missing = ~np.isfinite(integers)
+    integers[missing] = 0
+    encoded = integers.astype("int64").tolist()
+    for i in np.flatnonzero(missing).tolist():
+        encoded[i] = None
+    return encoded
+
+
+def columnar_payload(frames, decimals=DECIMALS):
+    """Returns the columnar payload of an object in the format of
+    `DataDashboard.to_frames`.
+
+    Parameters
+    ----------
+    frames : dict
+        The object to encode. Values that are a pd.DataFrame are encoded as columnar
+        sections, other values are kept as they are.
+    decimals : int, optional
+        Number of decimal places kept by the fixed-point values.
+
+    Returns
+    -------
+    dict
+        The payload, with its `schema` version and fixed-point `scale` first.
+    """
+    payload = {"schema": SCHEMA_VERSION, "scale": 10**decimals}
+    for key, value in frames.items():
+        if not isinstance(value, pd.DataFrame):
+            payload[key] = value
+            continue
+        section = {CODE_COL: value[CODE_COL].tolist()}
+        for col, series in value.drop(columns=[CODE_COL] + DROP_COLS).items():
+            section[col] = fixed_point(series, decimals)
+        payload[key] = section
+    return payload
+
+
+def encode_payload(payload):
+    """Returns the payload encoded as compact UTF-8 json bytes."""
+    return json.dumps(payload, separators=(",", ":"), allow_nan=False).encode()
+
+
+def write_payload(path, payload):
+    """Writes the encoded payload to path, with gzip and brotli versions next to it.
+
+    Notes
+    -------
+    The gzip header holds no modification time, so the same payload is always
+    compressed to the same bytes. If brotli is not installed a warning is raised and
+    only the gzip version is written.
+
+    Parameters
+    ----------
+    path : str
+        Path of the json file. The compressed versions are written to path + `.gz`
+        and path + `.br`.
+    payload : dict
+        The payload, e.g. from `columnar_payload`.
+
+    Returns
+    -------
+    list
+        The paths of the files written.
+    """
+    return _write_files(path, encode_payload(payload))
+
+
+def _compressors():
+    """Returns the compression of each file written with a payload, in format
+    {'suffix' : function }, the brotli version only if brotli is installed."""
+    compressors = {".gz": lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0)}
+    try:
+        import brotli
+
+        compressors[".br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    except ImportError:
+        pass
+    return compressors
+
+
+def _write_files(path, data):
+    """Writes the encoded data to path, with its gzip and brotli versions. Each file
+    is written atomically, and the json last."""
+    compressors = _compressors()
+    if ".br" not in compressors:
+        warn("brotli is required to write {}.br, it will not be written.".format(path))
+
+    for suffix, compress in compressors.items():
+        content = compress(data)
+        _write_atomic(path + suffix, lambda p: _write_bytes(p, content))
+    _write_atomic(path, lambda p: _write_bytes(p, data))
+    return [path] + [path + suffix for suffix in compressors]
+
+
+def _write_bytes(path, data):
+    """Writes the bytes data to path."""
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def columnar_path(path):
+    """Returns the path of the columnar payload written next to the json at path."""
+    return os.path.splitext(path)[0] + COLUMNAR_SUFFIX
+
+
+def hashed_name(stem, kind, data):
+    """Returns the file name of the encoded data of a split payload, e.g.
+    `data.static.0123456789ab.json` for the stem `data` and kind `static`."""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return "{}.{}.{}.json".format(stem, kind, digest)
+
+
+def write_split_payloads(path, payloads, keep=KEEP_VERSIONS):
+    """Writes each payload to a file named by its content hash, then the manifest.
+
+    Notes
+    -------
+    A payload whose json and compressed versions all already exist is not written
+    again, and each file is written atomically, so an interrupted write is redone
+    by the next one. The manifest is replaced atomically once all the payloads have
+    been written, so it never names a file that does not exist yet. The oldest
+    versions of each payload are then removed, keeping `keep` versions, so that
+    clients holding the previous manifest can still fetch the files it names.
+
+    Parameters
+    ----------
+    path : str
+        Path of the records json, e.g. `data.json`. The payloads are written to its
+        folder, named after its stem, and the manifest to `data.manifest.json`.
+    payloads : dict
+        Dictionary in format {'kind' : payload } of the payloads to write, e.g.
+        {'static' : ..., 'live' : ...}. Kinds must be words.
+    keep : int, optional
+        Number of versions of each kind of payload kept. By default `KEEP_VERSIONS`.
+
+    Returns
+    -------
+    dict
+        The manifest, in format {'schema' : version, 'kind' : 'file name', ... }.
+    """
+    folder, filename = os.path.split(os.path.abspath(path))
+    stem = os.path.splitext(filename)[0]
+    manifest = {"schema": SCHEMA_VERSION}
+    for kind, payload in payloads.items():
+        data = encode_payload(payload)
+        name = hashed_name(stem, kind, data)
+        file_path = os.path.join(folder, name)
+        suffixes = [""] + list(_compressors())
+        if not all(os.path.isfile(file_path + suffix) for suffix in suffixes):
+            _write_files(file_path, data)
+        manifest[kind] = name
+
+    manifest_path = os.path.join(folder, stem + MANIFEST_SUFFIX)
+    _write_atomic(manifest_path, lambda p: _write_bytes(p, encode_payload(manifest)))
+
+    _prune(folder, stem, manifest, keep)
+    return manifest
+
+
+def _prune(folder, stem, manifest, keep):
+    """Removes all but the `keep` most recent versions of each kind of split payload,
+    always keeping the versions named in the manifest."""
+    pattern = re.compile(
+        r"^{}\.(\w+)\.[0-9a-f]{{{}}}\.json".format(re.escape(stem), HASH_LENGTH)
+    )
+    versions = {}  # {'kind' : {'file name' : mtime } }
+    for filename in os.listdir(folder):
+        match = pattern.match(filename)
+        if match is None or match.group(1) not in manifest:
+            continue
+        name = match.group(0)
+        mtime = os.path.getmtime(os.path.join(folder, filename))
+        kind_versions = versions.setdefault(match.group(1), {})
+        kind_versions[name] = max(mtime, kind_versions.get(name, mtime))
+
+    for kind, kind_versions in versions.items():
+        current = manifest[kind]
+        older = sorted(
+            (name for name in kind_versions if name != current),
+            key=kind_versions.get,
+            reverse=True,
+        )
+        for name in older[keep - 1 :]:
+            for suffix in ("", ".gz", ".br"):
+                if os.path.isfile(os.path.join(folder, name + suffix)):
+                    os.remove(os.path.join(folder, name + suffix))
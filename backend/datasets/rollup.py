@@ -0,0 +1,346 @@
+"""Aggregates LSOA resolution data to the MSOA and LA resolutions.
+
+The classes defined in this module are:
+    Aggregation
+
+The functions defined in this module are:
+    read_msoa_codes
+    lsoa_lookup
+
+The dataclasses defined in this module are:
+    RollupMatrix
+
+Notes
+-----
+LSOAs nest within MSOAs, which nest within LAs. The ONS names LSOAs after the MSOA
+they are in, with a letter appended, and MSOAs after their LA with a number
+appended, e.g. the LSOA "Cardiff 001A" is in the MSOA "Cardiff 001", in "Cardiff".
+`lsoa_lookup` uses this to map every reference LSOA to its MSOA and LA.
+
+The mapping is held as one sparse matrix, with a row per MSOA and LA and a column per
+LSOA, so LSOA data is aggregated to all the resolutions with one matrix multiply.
+
+There is no MSOA reference file in this repo, so by default the ONS codes of the
+MSOAs are those of the MSOA reference keys, see `Dataset.read_msoa_keys`. These only
+cover the MSOAs with a GP practice, so LSOAs in other MSOAs are only aggregated to
+their LA. `RollupMatrix.from_reference` sets the MSOAs of the matrix as the MSOA
+reference keys (see `Dataset.set_msoa_keys`), so MSOA datasets are standardised to
+the same areas.
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from enum import Enum
+from warnings import warn
+from scipy import sparse
+from dataclasses import dataclass
+from typing import ClassVar
+
+from datasets.dataset import DataResolution, Dataset, GeoKeyIndex
+
+KEY_COLS = {
+    DataResolution.LSOA: ["LSOA11CD", "LSOA11NM"],
+    DataResolution.MSOA: ["msoa11cd", "msoa11nm"],
+    DataResolution.LA: ["lad19cd", "lad19nm"],
+}
+
+
+class Aggregation(Enum):
+    """Defines how LSOA values are aggregated to a lower resolution.
+
+    Example
+    ---------
+    `Aggregation.WEIGHTED_MEAN`
+
+    Parameters
+    ----------
+    Enum : str
+        Define the Aggregation as "sum", "mean" or "weighted_mean".
+    """
+
+    SUM = "sum", """Sum of the values, for counts"""
+    MEAN = "mean", """Mean of the values"""
+    WEIGHTED_MEAN = "weighted_mean", """Mean weighted by e.g. population, for rates"""
+
+
+def read_msoa_codes():
+    """Returns the ONS codes of the MSOA reference keys, in format
+    {'msoa name' : 'msoa code' }, see `Dataset.read_msoa_keys`."""
+    keys = Dataset.read_msoa_keys()
+    return dict(zip(keys["msoa11nm"], keys["msoa11cd"]))
+
+
+def lsoa_lookup(lsoa_keys, la_keys, msoa_codes=None):
+    """Maps each LSOA to its MSOA and LA, based on the LSOA names.
+
+    Parameters
+    ----------
+    lsoa_keys : pd.DataFrame
+        The LSOA reference keys, with the code and name columns (in that order).
+    la_keys : pd.DataFrame
+        The LA reference keys, with the code and name columns (in that order).
+    msoa_codes : dict, optional
+        Dictionary in format {'msoa name' : 'msoa code' }, with the ONS codes of the
+        MSOAs. By default those of the MSOA reference keys, see `read_msoa_codes`.
+        LSOAs in MSOAs without a code are not mapped to an MSOA, with a warning.
+
+    Returns
+    -------
+    pd.DataFrame
+        A row per LSOA, in the order of lsoa_keys, with the code and name columns of
+        each resolution, as given in `KEY_COLS`. The MSOA code and name are missing
+        for LSOAs not mapped to an MSOA.
+
+    Raises
+    ------
+    Exception
+        When the LA of an LSOA is not found in la_keys.
+    """
+    lsoa_codes = lsoa_keys.iloc[:, 0].astype(str).str.strip()
+    lsoa_names = lsoa_keys.iloc[:, 1].astype(str).str.strip()
+
+    # "Cardiff 001A" is in the MSOA "Cardiff 001", in the LA "Cardiff"
+    msoa_names = lsoa_names.str[:-1]
+    la_names = msoa_names.str.rsplit(" ", n=1).str[0]
+    la_index = GeoKeyIndex.from_reference(la_keys, DataResolution.LA)
+    la_ids = la_index.positions(la_names, key_is_code=False)
+    # Some LA names are prefixed with "The" in the LSOA names only
+    unmatched = la_ids == -1
+    la_ids[unmatched] = la_index.positions(
+        la_names[unmatched].str.replace(r"^The ", "", regex=True), key_is_code=False
+    )
+    if (la_ids == -1).any():
+        raise Exception(
+            "LAs not found for LSOAs: {}".format(list(lsoa_names[la_ids == -1]))
+        )
+
+    if msoa_codes is None:
+        msoa_codes = read_msoa_codes()
+    msoa_codes = msoa_names.map(msoa_codes)
+    if msoa_codes.isna().any():
+        warn(
+            "MSOA codes not found for MSOAs: {}. Their LSOAs are only aggregated to "
+            "their LA.".format(sorted(set(msoa_names[msoa_codes.isna()])))
+        )
+        msoa_names = msoa_names.where(msoa_codes.notna())
+    la = la_keys.iloc[la_ids, :2].reset_index(drop=True)
+    return pd.DataFrame(
+        {
+            "LSOA11CD": lsoa_codes.to_numpy(),
+            "LSOA11NM": lsoa_names.to_numpy(),
+            "msoa11cd": msoa_codes.to_numpy(),
+            "msoa11nm": msoa_names.to_numpy(),
+            "lad19cd": la.iloc[:, 0].to_numpy(),
+            "lad19nm": la.iloc[:, 1].to_numpy(),
+        }
+    )
+
+
+@dataclass(frozen=True)
+class RollupMatrix:
+    """Sparse aggregation matrix from LSOAs to lower resolutions.
+
+    Attributes
+    ----------
+    lsoa_codes: pd.Index
+        The LSOA codes, whose positions are the columns of the matrix.
+    keys: dict
+        Dictionary in format {DataResolution : pd.DataFrame } of the code and name of
+        the area in each row of the block of rows of that resolution, sorted by code.
+    blocks: dict
+        Dictionary in format {DataResolution : slice } of the rows of each resolution.
+    matrix: sparse.csr_matrix
+        The matrix, with a 1 where the LSOA column is in the area row.
+    """
+
+    lsoa_codes: pd.Index
+    keys: dict
+    blocks: dict
+    matrix: sparse.csr_matrix
+
+    MATRICES: ClassVar[dict] = {}  # matrices of the reference LSOAs
+    LOCK: ClassVar[threading.RLock] = threading.RLock()
+
+    @classmethod
+    def from_lookup(cls, lookup, resolutions=(DataResolution.MSOA, DataResolution.LA)):
+        """Builds the matrix from a lookup with the key columns of each resolution.
+
+        Parameters
+        ----------
+        lookup : pd.DataFrame
+            A row per LSOA, with the code and name columns given in `KEY_COLS` for
+            the LSOA and each of the resolutions, see `lsoa_lookup`. LSOAs with a
+            missing code of a resolution are not aggregated to it.
+        resolutions : tuple, optional
+            The resolutions to aggregate to. By default MSOA and LA.
+
+        Returns
+        -------
+        RollupMatrix
+            The aggregation matrix.
+        """
+        lsoa_codes = pd.Index(lookup[KEY_COLS[DataResolution.LSOA][0]])
+        if not lsoa_codes.is_unique:
+            raise ValueError("The LSOA codes of the lookup are not unique.")
+
+        keys, blocks, rows, cols = {}, {}, [], []
+        offset = 0
+        for res in resolutions:
+            code_col = KEY_COLS[res][0]
+            area_keys = lookup[KEY_COLS[res]].dropna().drop_duplicates(code_col)
+            area_keys = area_keys.sort_values(code_col).reset_index(drop=True)
+            positions = pd.Index(area_keys[code_col]).get_indexer(lookup[code_col])
+            mapped = np.flatnonzero(positions >= 0)
+            rows.append(offset + positions[mapped])
+            cols.append(mapped)
+            keys[res] = area_keys
+            blocks[res] = slice(offset, offset + len(area_keys))
+            offset += len(area_keys)
+
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(offset, len(lsoa_codes))
+        )
+        return cls(lsoa_codes=lsoa_codes, keys=keys, blocks=blocks, matrix=matrix)
+
+    @classmethod
+    def from_reference(cls, msoa_codes=None):
+        """Returns the matrix of the reference LSOAs, building it the first time.
+
+        Notes
+        -------
+        The MSOAs of the matrix are set as the MSOA reference keys, see
+        `Dataset.set_msoa_keys`.
+
+        Parameters
+        ----------
+        msoa_codes : dict, optional
+            Dictionary in format {'msoa name' : 'msoa code' }, see `lsoa_lookup`. By
+            default those of the MSOA reference keys, see `read_msoa_codes`.
+        """
+        if msoa_codes is None:
+            msoa_codes = read_msoa_codes()
+        key = tuple(sorted(msoa_codes.items()))
+        with cls.LOCK:
+            if key not in cls.MATRICES:
+                lookup = lsoa_lookup(
+                    Dataset.key_index(DataResolution.LSOA).keys,
+                    Dataset.key_index(DataResolution.LA).keys,
+                    msoa_codes=msoa_codes,
+                )
+                cls.MATRICES[key] = cls.from_lookup(lookup)
+            matrix = cls.MATRICES[key]
+            if DataResolution.MSOA in matrix.keys:
+                Dataset.set_msoa_keys(matrix.keys[DataResolution.MSOA])
+            return matrix
+
+    @property
+    def resolutions(self):
+        """Returns the resolutions the matrix aggregates to, as a list."""
+        return list(self.blocks)
+
+    def aggregate(self, data, how=Aggregation.SUM, weights=None):
+        """Aggregates LSOA data to each of the resolutions of the matrix.
+
+        Notes
+        -------
+        Missing values are ignored. An area where all the values are missing is given
+        a missing value.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            Numeric LSOA data indexed on the LSOA code, or on a pd.MultiIndex whose
+            first level is the LSOA code, such as a master dataset.
+        how : Aggregation, optional
+            How the values are aggregated. By default Aggregation.SUM.
+        weights : pd.Series, optional
+            The weight of each LSOA, indexed like data. Required for
+            Aggregation.WEIGHTED_MEAN, e.g. the population column of a master dataset.
+
+        Returns
+        -------
+        dict
+            Dictionary in format {DataResolution : pd.DataFrame } with the aggregated
+            data, indexed on `area_code` and `area_name` in the order of `keys`.
+
+        Raises
+        ------
+        Exception
+            When data does not have a row for every LSOA of the matrix.
+        ValueError
+            When weights are missing for Aggregation.WEIGHTED_MEAN, or none of them
+            match the LSOAs of the matrix.
+        """
+        codes = data.index.get_level_values(0).astype(str)
+        positions = pd.Index(codes).get_indexer(self.lsoa_codes)
+        if (positions == -1).any():
+            raise Exception(
+                "Data is missing LSOAs: {}".format(
+                    list(self.lsoa_codes[positions == -1])
+                )
+            )
+        values = data.to_numpy(dtype="float64", na_value=np.nan)[positions]
+        present = ~np.isnan(values)
+
+        if how == Aggregation.WEIGHTED_MEAN:
+            if weights is None:
+                raise ValueError("Weights are needed for a weighted mean.")
+            # Weights are indexed like data, on the code or a (code, name) index
+            weight_codes = pd.Index(weights.index.get_level_values(0).astype(str))
+            matched = weight_codes.get_indexer(self.lsoa_codes)
+            if (matched == -1).all():
+                raise ValueError("None of the weights match the LSOAs of the matrix.")
+            weights = weights.to_numpy(dtype="float64", na_value=np.nan)[matched]
+            weights = np.where((matched == -1) | np.isnan(weights), 0, weights)
+            weights = weights[:, np.newaxis]
+        else:
+            weights = np.ones((len(self.lsoa_codes), 1))
+
+        # Stack the numerators and denominators so all resolutions are aggregated by
+        # one matrix multiply
+        n_cols = values.shape[1]
+        stacked = np.hstack([np.where(present, values, 0) * weights, present * weights])
+        totals = self.matrix @ stacked
+        sums, counts = totals[:, :n_cols], totals[:, n_cols:]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if how == Aggregation.SUM:
+                result = np.where(counts > 0, sums, np.nan)
+            else:
+                result = sums / counts
+
+        aggregated = {}
+        for res, rows in self.blocks.items():
+            index = pd.MultiIndex.from_frame(
+                self.keys[res], names=["area_code", "area_name"]
+            )
+            aggregated[res] = pd.DataFrame(
+                result[rows], index=index, columns=data.columns
+            )
+        return aggregated
+
+    def aggregate_dataset(self, dataset, how=Aggregation.SUM, weights=None):
+        """Aggregates the standardised data of an LSOA Dataset, see `aggregate`.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            An LSOA Dataset. It is standardised first if needed.
+        how : Aggregation, optional
+            How the values are aggregated. By default Aggregation.SUM.
+        weights : pd.Series, optional
+            The weight of each LSOA, indexed on the LSOA code or like a master dataset.
+
+        Returns
+        -------
+        dict
+            Dictionary in format {DataResolution : pd.DataFrame } with the aggregated
+            data of the columns of the dataset.
+        """
+        if dataset.res != DataResolution.LSOA:
+            raise ValueError("Only LSOA datasets can be aggregated.")
+        if not dataset.is_standardised:
+            dataset.standardise()
+        data = dataset.standardised_data.set_index(KEY_COLS[DataResolution.LSOA])
+        return self.aggregate(data.astype("float64"), how=how, weights=weights)
@@ -0,0 +1,255 @@
+"""Maintains daily aggregates of the tweet sentiment in the tweets database.
+
+The functions defined in this module are:
+    is_installed
+    aggregates_installed
+    install_sentiment_aggregates
+
+Notes
+-----
+The `daily_sentiment` table holds, for each day, area and author, the sum and count of
+the VADER compound scores of the tweets matched to the area. It is keyed on
+(`day`, `lsoa`, `author_id`), so a range of days is read from the primary key.
+
+The table is maintained by triggers, so it is updated as each tweet, or match of a
+place to an area, is inserted, updated or deleted, by whichever process writes to
+the database. Averages over any range of days are then read from the table, without
+joining the tweets, e.g. `datasets.live.VADER_QUERY`.
+
+Rows are aggregated as the previous query joined them: a tweet is counted once in
+each area its place is matched to in `matchedplaces`, and tweets without a day, area
+or author are not aggregated. The places matched are assumed to be in `places`, so
+the tweets are not joined to `places`. Deleting tweets leaves rows with a `tweet_count` of 0,
+which queries should exclude.
+
+The table and triggers are a migration of the collector's database, so they are only
+installed by the writer, never by the dashboard build, which reads the database
+read-only. Run once, e.g. when the collector starts, from the backend folder with:
+
+    python -m datasets.sentiment [DATABASE]
+
+Until they are installed, `aggregates_installed` is False, and the build queries the
+tweets directly, see `datasets.live.vader_query`.
+"""
+
+import logging
+from argparse import ArgumentParser
+
+from datasets.database import POOL, connect_writer
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_TABLE = "daily_sentiment"
+
+SENTIMENT_SCHEMA = [
+    """
+CREATE TABLE IF NOT EXISTS daily_sentiment (
+    day TEXT NOT NULL,
+    lsoa NOT NULL,
+    author_id NOT NULL,
+    lsoa_name,
+    vader_sum REAL NOT NULL,
+    vader_count INTEGER NOT NULL,
+    tweet_count INTEGER NOT NULL,
+    PRIMARY KEY (day, lsoa, author_id)
+) WITHOUT ROWID
+""",
+    "CREATE INDEX IF NOT EXISTS tweets_place_id ON tweets (place_id)",
+    "CREATE INDEX IF NOT EXISTS matchedplaces_place_id ON matchedplaces (place_id)",
+]
+
+# Adds the sentiment of the tweets matched to areas in {matches} to the table,
+# multiplied by {sign}, so the same statement adds and removes tweets.
+UPSERT = """
+INSERT INTO daily_sentiment
+    (day, lsoa, author_id, lsoa_name, vader_sum, vader_count, tweet_count)
+SELECT
+    strftime('%Y-%m-%d', t.created_at),
+    m.lsoa,
+    t.author_id,
+    m.lsoa_name,
+    {sign} * TOTAL(t.vader_comp),
+    {sign} * COUNT(t.vader_comp),
+    {sign} * COUNT(*)
+FROM tweets AS t
+JOIN {matches} AS m ON m.place_id = t.place_id
+WHERE strftime('%Y-%m-%d', t.created_at) IS NOT NULL
+    AND m.lsoa IS NOT NULL
+    AND t.author_id IS NOT NULL
+    {where}
+GROUP BY 1, 2, 3
+ON CONFLICT (day, lsoa, author_id) DO UPDATE SET
+    vader_sum = vader_sum + excluded.vader_sum,
+    vader_count = vader_count + excluded.vader_count,
+    tweet_count = tweet_count + excluded.tweet_count;
+"""
+
+
+# Adds the sentiment of the tweet in the trigger row {row} (NEW or OLD), multiplied
+# by {sign}, to each area its place is matched to
+ROW_UPSERT = """
+INSERT INTO daily_sentiment
+    (day, lsoa, author_id, lsoa_name, vader_sum, vader_count, tweet_count)
+SELECT
+    strftime('%Y-%m-%d', {row}.created_at),
+    m.lsoa,
+    {row}.author_id,
+    m.lsoa_name,
+    {sign} * COALESCE({row}.vader_comp, 0.0),
+    {sign} * ({row}.vader_comp IS NOT NULL),
+    {sign}
+FROM matchedplaces AS m
+WHERE m.place_id = {row}.place_id
+    AND strftime('%Y-%m-%d', {row}.created_at) IS NOT NULL
+    AND m.lsoa IS NOT NULL
+    AND {row}.author_id IS NOT NULL
+ON CONFLICT (day, lsoa, author_id) DO UPDATE SET
+    vader_sum = vader_sum + excluded.vader_sum,
+    vader_count = vader_count + excluded.vader_count,
+    tweet_count = tweet_count + excluded.tweet_count;
+"""
+
+
+def _upsert(sign, matches="matchedplaces", where=""):
+    """Returns the `UPSERT` statement for the given matches."""
+    return UPSERT.format(sign=sign, matches=matches, where=where)
+
+
+def _match(row):
+    """Returns a FROM item holding the match values of the trigger row (NEW or OLD)."""
+    return (
+        "(SELECT {row}.place_id AS place_id, {row}.lsoa AS lsoa, "
+        "{row}.lsoa_name AS lsoa_name)"
+    ).format(row=row)
+
+
+TWEET_COLUMNS = "created_at, author_id, place_id, vader_comp"
+MATCH_COLUMNS = "place_id, lsoa, lsoa_name"
+
+# Dictionary in format {'trigger name' : 'trigger definition' }
+SENTIMENT_TRIGGERS = {
+    "daily_sentiment_tweet_insert": "AFTER INSERT ON tweets BEGIN {} END".format(
+        ROW_UPSERT.format(sign=1, row="NEW")
+    ),
+    "daily_sentiment_tweet_delete": "AFTER DELETE ON tweets BEGIN {} END".format(
+        ROW_UPSERT.format(sign=-1, row="OLD")
+    ),
+    "daily_sentiment_tweet_update": "AFTER UPDATE OF {} ON tweets BEGIN {} {} END".format(
+        TWEET_COLUMNS,
+        ROW_UPSERT.format(sign=-1, row="OLD"),
+        ROW_UPSERT.format(sign=1, row="NEW"),
+    ),
+    "daily_sentiment_match_insert": "AFTER INSERT ON matchedplaces BEGIN {} END".format(
+        _upsert(1, matches=_match("NEW"), where="AND t.place_id = NEW.place_id")
+    ),
+    "daily_sentiment_match_delete": "AFTER DELETE ON matchedplaces BEGIN {} END".format(
+        _upsert(-1, matches=_match("OLD"), where="AND t.place_id = OLD.place_id")
+    ),
+    "daily_sentiment_match_update": (
+        "AFTER UPDATE OF {} ON matchedplaces BEGIN {} {} END".format(
+            MATCH_COLUMNS,
+            _upsert(-1, matches=_match("OLD"), where="AND t.place_id = OLD.place_id"),
+            _upsert(1, matches=_match("NEW"), where="AND t.place_id = NEW.place_id"),
+        )
+    ),
+}
+
+
+# Lists the tables and triggers of a database
+SCHEMA_QUERY = "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+
+
+def is_installed(con):
+    """Returns True if the table and all the triggers exist in the database."""
+    names = {row[0] for row in con.execute(SCHEMA_QUERY)}
+    return SENTIMENT_TABLE in names and set(SENTIMENT_TRIGGERS) <= names
+
+
+def aggregates_installed(path):
+    """Returns True if the table and all the triggers exist in the database at path.
+
+    Notes
+    -------
+    The database is read through the read-only `POOL`, so nothing is written to it.
+
+    Raises
+    ------
+    FileNotFoundError
+        When there is no database at path.
+    """
+    names = set(POOL.read_sql(path, SCHEMA_QUERY)["name"])
+    return SENTIMENT_TABLE in names and set(SENTIMENT_TRIGGERS) <= names
+
+
+def install_sentiment_aggregates(con, rebuild=False):
+    """Creates the daily sentiment table and its triggers, and fills the table.
+
+    Notes
+    -------
+    Runs in one write transaction, so tweets inserted meanwhile by another process
+    are either aggregated by the initial fill, or by the triggers, but not both.
+
+    Parameters
+    ----------
+    con : sqlite3.Connection
+        Connection to the tweets database.
+    rebuild : bool, optional
+        Refill the table from the tweets even if it is already installed, e.g. after
+        the tweets have been changed with the triggers dropped. By default False.
+
+    Returns
+    -------
+    bool
+        True if the table was filled, False if it was already installed.
+    """
+    if is_installed(con) and not rebuild:
+        return False
+
+    isolation_level = con.isolation_level
+    con.isolation_level = None  # Manage the transaction explicitly
+    try:
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in SENTIMENT_SCHEMA:
+                con.execute(statement)
+            for name in SENTIMENT_TRIGGERS:
+                con.execute("DROP TRIGGER IF EXISTS {}".format(name))
+            con.execute("DELETE FROM {}".format(SENTIMENT_TABLE))
+            con.execute(_upsert(1))
+            for name, definition in SENTIMENT_TRIGGERS.items():
+                con.execute("CREATE TRIGGER {} {}".format(name, definition))
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+    finally:
+        con.isolation_level = isolation_level
+
+    logger.info("Installed the {} table".format(SENTIMENT_TABLE))
+    return True
+
+
+if __name__ == "__main__":
+    from datasets.live import SOURCE_TWEET_SENTIMENT_LA
+
+    parser = ArgumentParser(
+        description="Install the daily sentiment aggregates in the tweets database."
+    )
+    parser.add_argument(
+        "database",
+        nargs="?",
+        default=SOURCE_TWEET_SENTIMENT_LA.path,
+        help="sqlite database path, by default the database of the live datasets",
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="refill the table if it is installed"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    con = connect_writer(args.database)
+    try:
+        installed = install_sentiment_aggregates(con, rebuild=args.rebuild)
+    finally:
+        con.close()
+    print("Installed" if installed else "Already installed", args.database)
@@ -0,0 +1,606 @@
+"""Declarative definitions of the source files read into datasets.
+
+The functions defined in this module are:
+    excel_columns
+    read_latest
+    load_sources
+    module_specs
+The dataclasses defined in this module are:
+    SourceSpec
+    GridCache
+
+Notes
+-----
+A `SourceSpec` describes where and how a source is read, without reading it. A
+`Dataset` given a `SourceSpec` only reads the source when it is standardised, so
+defining datasets costs no I/O.
+
+Several specs often read different columns of the same file or sheet. The csv and
+Excel specs are read through `GRID_CACHE`, which parses each file or sheet once per
+process (and again if the file changes), and serves the columns of each spec from the
+parsed grid. Excel sheets are
+also cached on disk between processes, see `datasets.cache.read_excel`.
+
+The sources are independent, so `load_sources` reads a set of specs concurrently:
+Excel parsing is CPU bound and is done in a process pool, csv and sqlite reads are
+done in a thread pool.
+"""
+
+import os
+import re
+import hashlib
+import logging
+import time
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date, datetime
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable
+
+from datasets import cache
+from datasets.database import POOL
+
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+SQL_EXTENSIONS = (".db", ".sqlite")
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    """Defines how to read a source csv, Excel sheet or sqlite query into a df.
+
+    Attributes
+    ----------
+    path: str
+        Path to the source file. The type of source is given by its extension.
+    sheet_name: str or int, optional
+        Excel only. The name or position of the sheet to read. By default the first.
+    usecols: optional
+        Columns to read, as accepted by `pd.read_csv` or `pd.read_excel`. Use tuples
+        rather than lists, so that the spec is hashable.
+    skiprows: int, optional
+        Number of rows to skip at the start of the file or sheet.
+    nrows: int, optional
+        Number of rows to read.
+    na_values: optional
+        Additional strings to recognise as NA.
+    na_filter: bool, optional
+        Whether to detect missing values. By default True.
+    query: str, optional
+        sqlite only. The SQL query to run against the database.
+    prepare: Callable, optional
+        sqlite only. Function called with the path of the database before the query
+        is run, which returns the query to run instead of `query`, or None, e.g. to
+        fall back to another query when a table is missing. It must not write to the
+        database. Use a module level function.
+    latest: str, optional
+        Excel only. Only keep the rows with the latest (maximum) value of this column.
+        The sheet is streamed, so only the latest rows are ever held in memory, see
+        `read_latest`.
+    transform: Callable, optional
+        Function applied to the df after it is read, which returns the source df.
+        Use a module level function, so that the spec can be pickled.
+    """
+
+    path: str
+    sheet_name: Any = 0
+    usecols: Any = None
+    skiprows: int = None
+    nrows: int = None
+    na_values: Any = None
+    na_filter: bool = True
+    query: str = None
+    prepare: Callable = None
+    latest: str = None
+    transform: Callable = None
+
+    @property
+    def kind(self):
+        """Returns the type of source, 'excel', 'sql' or 'csv', based on the path."""
+        extension = os.path.splitext(self.path)[1].lower()
+        if extension in EXCEL_EXTENSIONS:
+            return "excel"
+        if extension in SQL_EXTENSIONS:
+            return "sql"
+        return "csv"
+
+    def read_kwargs(self):
+        """Returns the keyword arguments passed to the pandas reader."""
+        kwargs = {
+            "usecols": self.usecols,
+            "skiprows": self.skiprows,
+            "nrows": self.nrows,
+            "na_values": self.na_values,
+        }
+        kwargs = {key: value for key, value in kwargs.items() if value is not None}
+        kwargs["na_filter"] = self.na_filter
+        return kwargs
+
+    @property
+    def reads_grid(self):
+        """Returns True if the spec is read from a grid of `GRID_CACHE`."""
+        return (
+            self.kind != "sql"
+            and self.latest is None
+            and GridCache._positions(self) is not None
+        )
+
+    def grid_key(self):
+        """Returns the key of the grid the spec is read from, see `GridCache`.
+
+        The key is made of every option that changes how the values in a column are
+        parsed, so specs that only differ in `usecols` are read from the same grid.
+        """
+        sheet_name = self.sheet_name if self.kind == "excel" else None
+        return (
+            self.path,
+            sheet_name,
+            self.skiprows,
+            self.nrows,
+            self.na_values,
+            self.na_filter,
+        )
+
+    def load(self):
+        """Reads the source and applies `transform`, returning the source df."""
+        if self.kind == "sql":
+            query = self.query
+            if self.prepare is not None:
+                query = self.prepare(self.path) or query
+            df = POOL.read_sql(self.path, query)
+        elif self.latest is not None:
+            df = read_latest(self)
+        else:
+            df = GRID_CACHE.read(self)
+
+        if self.transform is not None:
+            df = self.transform(df)
+        return df
+
+    def fingerprint(self):
+        """Returns a sha256 hex digest of the spec and the contents of the source file.
+
+        Notes
+        -------
+        Databases can be large and are written to continuously, so for sql sources
+        the size and modification time of the file (and of its write-ahead log, if
+        any) are used instead of its contents, together with today's date as queries
+        may be relative to it.
+        """
+        spec = [
+            (f.name, getattr(self, f.name))
+            for f in fields(self)
+            if f.name not in ("prepare", "transform")
+        ]
+        for name in ("prepare", "transform"):
+            func = getattr(self, name)
+            if func is not None:
+                spec.append((name, func.__module__, func.__qualname__))
+        sha = hashlib.sha256(repr(spec).encode())
+
+        if self.kind == "sql":
+            # In WAL mode new rows are written to the -wal file until a checkpoint
+            paths = [self.path, self.path + "-wal"]
+            stats = [
+                (stat.st_size, stat.st_mtime_ns)
+                for stat in map(os.stat, filter(os.path.exists, paths))
+            ]
+            sha.update(repr((stats, str(date.today()))).encode())
+        else:
+            sha.update(cache.file_hash(self.path).encode())
+        return sha.hexdigest()
+
+
+def excel_columns(usecols):
+    """Returns the positions of the columns in an Excel range str such as "A, BR:CQ".
+
+    Parameters
+    ----------
+    usecols : str
+        Comma separated column letters and ranges of column letters.
+
+    Returns
+    -------
+    list
+        The positions of the columns, where column A is 0.
+    """
+
+    def position(letters):
+        number = 0
+        for letter in letters.strip().upper():
+            number = number * 26 + ord(letter) - ord("A") + 1
+        return number - 1
+
+    positions = []
+    for part in usecols.split(","):
+        if ":" in part:
+            start, stop = part.split(":")
+            positions.extend(range(position(start), position(stop) + 1))
+        else:
+            positions.append(position(part))
+    return positions
+
+
+def _excel_value(value):
+    """Converts a cell value as `pd.read_excel` does: empty cells are missing values,
+    and whole floats are ints."""
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def read_latest(spec):
+    """Streams an Excel sheet, keeping only the rows with the latest value of a column.
+
+    Notes
+    -------
+    The sheet is read row by row with openpyxl in read only mode, tracking the
+    running maximum of the `latest` column of spec. Rows with an earlier value are
+    dropped as they are read, so memory does not grow with the history of the
+    sheet. Blank rows are skipped, and the kept rows are indexed on their position
+    in the sheet's data, as `pd.read_excel` would index them.
+
+    The `latest` column is parsed as dates, and rows whose value cannot be parsed,
+    e.g. a text note, are skipped. The types of the values of the other columns are
+    tracked over all the rows, so each column is given the dtype `pd.read_excel`
+    infers from the whole sheet, e.g. float64 for a column of floats whose latest
+    values are all whole numbers. `na_values`, `na_filter` and `nrows` are not
+    supported.
+
+    Parameters
+    ----------
+    spec : SourceSpec
+        Spec of an Excel sheet, with `latest` set to the name of a date (or other
+        orderable) column. The first row after `skiprows` is the header.
+
+    Returns
+    -------
+    pd.DataFrame
+        The rows with the latest value of the column, with the columns in `usecols`.
+
+    Raises
+    ------
+    ValueError
+        When spec is not an Excel spec, or the `latest` column is not found.
+    """
+    import openpyxl
+
+    if spec.kind != "excel":
+        raise ValueError("Only Excel sheets can be streamed, not {}".format(spec.path))
+
+    workbook = openpyxl.load_workbook(spec.path, read_only=True, data_only=True)
+    try:
+        if isinstance(spec.sheet_name, int):
+            sheet = workbook.worksheets[spec.sheet_name]
+        else:
+            sheet = workbook[spec.sheet_name]
+        rows = sheet.iter_rows(min_row=(spec.skiprows or 0) + 1, values_only=True)
+
+        header = [_excel_value(value) for value in next(rows)]
+        if spec.usecols is None:
+            positions = list(range(len(header)))
+        elif isinstance(spec.usecols, str):
+            positions = excel_columns(spec.usecols)
+        else:
+            positions = sorted(set(spec.usecols))
+        columns = [
+            header[i] if i < len(header) and header[i] == header[i] else None
+            for i in positions
+        ]
+        columns = [
+            "Unnamed: {}".format(i) if col is None else col
+            for i, col in zip(positions, columns)
+        ]
+        if spec.latest not in columns:
+            raise ValueError("Column {} not found in {}".format(spec.latest, spec.path))
+        latest_position = positions[columns.index(spec.latest)]
+
+        latest, kept, index = None, [], []
+        kinds = [set() for _ in positions]  # types of the values of each column
+        row_number = 0
+        for row in rows:
+            if all(value is None or value == "" for value in row):
+                continue
+            values = [
+                _excel_value(row[i]) if i < len(row) else np.nan for i in positions
+            ]
+            for column_kinds, value in zip(kinds, values):
+                column_kinds.add(type(value))
+            value = _latest_value(
+                row[latest_position] if latest_position < len(row) else None
+            )
+            if value is not None:
+                if latest is None or value > latest:
+                    latest, kept, index = value, [], []
+                if value == latest:
+                    kept.append(values)
+                    index.append(row_number)
+            row_number += 1
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame(kept, columns=columns, index=index).infer_objects()
+    for col, column_kinds in zip(columns, kinds):
+        dtype = _sheet_dtype(column_kinds)
+        if col != spec.latest and dtype is not None:
+            df[col] = df[col].astype(dtype)
+    df[spec.latest] = pd.to_datetime(df[spec.latest])
+    return df
+
+
+def _latest_value(value):
+    """Returns a cell of the `latest` column as a datetime, or None if it is empty or
+    cannot be parsed as a date."""
+    if isinstance(value, datetime):
+        return value
+    if value is None or value == "":
+        return None
+    value = pd.to_datetime(value, errors="coerce")
+    return None if pd.isna(value) else value
+
+
+def _sheet_dtype(kinds):
+    """Returns the dtype `pd.read_excel` infers for a column whose values have the
+    given types, if it may differ from the dtype inferred from some of them."""
+    if kinds <= {int, float}:
+        return "float64" if float in kinds else None
+    if len(kinds) > 1:
+        return object
+    return None
+
+
+@dataclass
+class GridCache:
+    """Parses each source file or Excel sheet once, and serves slices of its columns.
+
+    Notes
+    -------
+    A grid is the whole file or sheet, read with the options given by
+    `SourceSpec.grid_key`. pandas infers the dtype of each column on its own, so
+    selecting the `usecols` of a spec from the grid gives the same df as reading the
+    spec directly. Specs with `usecols` that cannot be served from a grid, such as a
+    callable, or that select a column whose name pandas had to deduplicate in the
+    grid, are read directly and counted as misses.
+
+    Each grid is stored with the modification time and size of its file when it was
+    parsed, and is parsed again when they have changed, e.g. when a live source is
+    downloaded again while the scheduler runs.
+
+    Attributes
+    ----------
+    grids: dict
+        Dictionary in format {grid key : (file stat, grid) } of the parsed grids,
+        keyed by `SourceSpec.grid_key`, see `_stat`.
+    hits: int
+        The number of reads served from a parsed grid.
+    misses: int
+        The number of reads that had to parse a file.
+    parse_seconds: dict
+        Dictionary in format {grid key : float } of the seconds taken to parse each
+        stored grid.
+    """
+
+    grids: dict = field(default_factory=dict)
+    hits: int = 0
+    misses: int = 0
+    parse_seconds: dict = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def read(self, spec):
+        """Returns the df of a csv or Excel SourceSpec, parsing its grid if needed."""
+        positions = self._positions(spec)
+        if positions is None:
+            with self.lock:
+                self.misses += 1
+            return self._parse(spec, usecols=spec.usecols)
+
+        key = spec.grid_key()
+        stat = self._stat(spec.path)
+        with self.lock:
+            grid = self._fresh(key, stat)
+            if grid is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if grid is None:
+            start = time.perf_counter()
+            grid = self._parse(spec, usecols=None)
+            grid = self.store(key, stat, grid, time.perf_counter() - start)
+
+        if positions is slice(None):
+            return grid.copy()
+        columns = grid.columns[positions] if positions else grid.columns
+        if self._mangled(grid.columns, columns):
+            logging.info("Reading {} directly, as its columns repeat".format(spec.path))
+            return self._parse(spec, usecols=spec.usecols)
+        return grid.iloc[:, positions].copy()
+
+    def _fresh(self, key, stat):
+        """Returns the grid stored under key if it was parsed from a file with stat,
+        otherwise None. Must be called holding `lock`."""
+        stored_stat, grid = self.grids.get(key, (None, None))
+        return grid if stored_stat == stat else None
+
+    def is_fresh(self, spec):
+        """Returns True if the grid of spec is stored and its file has not changed."""
+        stat = self._stat(spec.path)
+        with self.lock:
+            return self._fresh(spec.grid_key(), stat) is not None
+
+    def store(self, key, stat, grid, seconds):
+        """Stores a grid parsed in seconds from a file with stat under key, unless a
+        grid of the same file was stored meanwhile, and returns the grid stored."""
+        with self.lock:
+            stored = self._fresh(key, stat)
+            if stored is not None:
+                return stored
+            self.grids[key] = (stat, grid)
+            self.parse_seconds[key] = seconds
+            return grid
+
+    @staticmethod
+    def _positions(spec):
+        """Returns the positions of the usecols of spec in its grid, or None if unknown."""
+        usecols = spec.usecols
+        if usecols is None:
+            return slice(None)
+        if isinstance(usecols, str):
+            if spec.kind != "excel":
+                return None
+            return excel_columns(usecols)
+        if isinstance(usecols, (tuple, list)) and all(
+            isinstance(col, int) for col in usecols
+        ):
+            # pandas reads usecols in the order of the file
+            return sorted(set(usecols))
+        return None
+
+    @staticmethod
+    def _stat(path):
+        """Returns the modification time (ns) and size of the file at path, taken
+        before it is parsed so that a change during parsing is not missed."""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _mangled(grid_columns, columns):
+        """Returns True if a column was renamed by pandas for repeating another name."""
+        names = set(map(str, grid_columns))
+        for col in map(str, columns):
+            match = re.fullmatch(r"(.*)\.\d+", col)
+            if match and match.group(1) in names:
+                return True
+        return False
+
+    @staticmethod
+    def _parse(spec, usecols):
+        """Reads the file of spec with pandas, selecting usecols."""
+        kwargs = spec.read_kwargs()
+        kwargs["usecols"] = usecols
+        if spec.kind == "excel":
+            return cache.read_excel(spec.path, sheet_name=spec.sheet_name, **kwargs)
+        return pd.read_csv(spec.path, **kwargs)
+
+    def stats(self):
+        """Returns a dict of the number of hits, misses and parsed grids."""
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "grids": len(self.grids)}
+
+    def discard(self, spec):
+        """Drops the grid spec is read from, e.g. once its file has changed."""
+        with self.lock:
+            self.grids.pop(spec.grid_key(), None)
+            self.parse_seconds.pop(spec.grid_key(), None)
+
+    def clear(self):
+        """Drops the parsed grids, so the files are parsed again on the next read."""
+        with self.lock:
+            self.grids.clear()
+            self.parse_seconds.clear()
+
+
+# The cache shared by all the specs of a process
+GRID_CACHE = GridCache()
+
+
+def _parse_grid(spec):
+    """Parses the grid of spec, returning it with the seconds it took."""
+    start = time.perf_counter()
+    grid = GridCache._parse(spec, usecols=None)
+    return grid, time.perf_counter() - start
+
+
+def _load_spec(spec):
+    """Loads spec without the grid cache, returning the df with the seconds it took."""
+    start = time.perf_counter()
+    if spec.kind == "sql" or spec.latest is not None:
+        df = spec.load()
+    else:
+        df = GridCache._parse(spec, usecols=spec.usecols)
+        if spec.transform is not None:
+            df = spec.transform(df)
+    return df, time.perf_counter() - start
+
+
+def load_sources(specs, max_workers=None):
+    """Reads the given sources concurrently.
+
+    Notes
+    -------
+    Each grid (see `GridCache`) needed by the specs is parsed once, the Excel grids in
+    a process pool and the csv grids in a thread pool, and added to `GRID_CACHE` with
+    the seconds its parse took, see `GridCache.parse_seconds`.
+    Specs that cannot be served from a grid, and sqlite specs, are read whole in the
+    same pools. The columns of each spec are then taken from its grid and transformed
+    in this process.
+
+    Parameters
+    ----------
+    specs : dict
+        Dictionary in format {'name' : SourceSpec } of the sources to read.
+    max_workers : int, optional
+        The number of workers of each pool. By default None, which lets
+        `concurrent.futures` choose based on the number of CPUs.
+
+    Returns
+    -------
+    tuple
+        A dict in format {'name' : pd.DataFrame } of the sources, and a dict in format
+        {'name' : float } of the seconds taken to read each source. The time taken to
+        parse a grid is counted for every source read from it.
+    """
+    grids, direct = {}, {}
+    for spec in specs.values():
+        if not spec.reads_grid:
+            direct.setdefault(spec, None)
+        elif spec.grid_key() not in grids and not GRID_CACHE.is_fresh(spec):
+            grids[spec.grid_key()] = spec
+
+    def executor(spec):
+        return process_pool if spec.kind == "excel" else thread_pool
+
+    with ProcessPoolExecutor(max_workers=max_workers) as process_pool:
+        with ThreadPoolExecutor(max_workers=max_workers) as thread_pool:
+            # The stat is taken before parsing, so that a change during the parse
+            # is not missed, see `GridCache._stat`
+            grid_futures = {
+                key: (
+                    GridCache._stat(spec.path),
+                    executor(spec).submit(_parse_grid, spec),
+                )
+                for key, spec in grids.items()
+            }
+            direct_futures = {
+                spec: executor(spec).submit(_load_spec, spec) for spec in direct
+            }
+            parse_seconds = {}
+            for key, (stat, future) in grid_futures.items():
+                grid, parse_seconds[key] = future.result()
+                with GRID_CACHE.lock:
+                    GRID_CACHE.misses += 1
+                GRID_CACHE.store(key, stat, grid, parse_seconds[key])
+            loaded = {spec: future.result() for spec, future in direct_futures.items()}
+
+    frames, seconds = {}, {}
+    for name, spec in specs.items():
+        if spec in loaded:
+            frames[name], seconds[name] = loaded[spec]
+            continue
+        start = time.perf_counter()
+        frames[name] = spec.load()
+        seconds[name] = (
+            time.perf_counter() - start + parse_seconds.get(spec.grid_key(), 0)
+        )
+    return frames, seconds
+
+
+def module_specs(module):
+    """Returns a dict in format {'name' : SourceSpec } of the `SOURCE_` specs of module."""
+    return {
+        name: value
+        for name, value in vars(module).items()
+        if name.startswith("SOURCE_") and isinstance(value, SourceSpec)
+    }
@@ -1,73 +1,101 @@
-"""Handles reading of datasets from static source data folder."""
+"""Defines the source files read into the static datasets.
+
+Notes
+-----
+Each `SOURCE_` constant is a `SourceSpec`, which describes how the file is read but
+does not read it. The file is only read when the `Dataset` using it is standardised,
+so importing this module, or reading an existing master dataset, does no source I/O.
+"""
 
-import pandas as pd
 import os
 from functools import partial
 
-# ++++++++++++++++++++++++++++++++++
-# Read data into acceptable format
-# ++++++++++++++++++++++++++++++++++
 from datasets import SOURCE_DATA_FOLDER
+from datasets.sources import SourceSpec
 
 # Base folders for all Source Files
 p = partial(os.path.join, SOURCE_DATA_FOLDER)
 
-SOURCE_SHEILDING_LA = pd.read_csv(p("shielded_pop_LA.csv"))
+SOURCE_SHEILDING_LA = SourceSpec(p("shielded_pop_LA.csv"))
 
-SOURCE_WELSH_LSOA = pd.read_csv(p("lsoa_welsh_language_2011.csv"), usecols=[2, 3])
+SOURCE_WELSH_LSOA = SourceSpec(p("lsoa_welsh_language_2011.csv"), usecols=(2, 3))
 
-SOURCE_WELSH_LA = pd.read_csv(
-    p("la_welsh_frequency_2018-19.csv"), usecols=[1, 2, 3, 4], na_values="*"
+SOURCE_WELSH_LA = SourceSpec(
+    p("la_welsh_frequency_2018-19.csv"), usecols=(1, 2, 3, 4), na_values="*"
 )
 
 
 # Read Population data (includes age based data)
-SOURCE_POPULATION_LSOA = pd.read_excel(
+SOURCE_POPULATION_LSOA = SourceSpec(
     p("lsoa_population_2018-19_mid_2018_persons.xlsx"),
     usecols="A, D",  # Reads columns - Area Codes, All Ages
     skiprows=4,  # Data starts on row 5
     na_filter=False,  # Speed up read in of data, we know there are no NA values here
 )
 
-SOURCE_OVER_65_LSOA = pd.read_excel(
+SOURCE_OVER_65_LSOA = SourceSpec(
     p("lsoa_population_2018-19_mid_2018_persons.xlsx"),
     usecols="A, BR:CQ",  # Reads columns - Area Codes, 65:90+
     skiprows=4,  # Data starts on row 5
     na_filter=False,  # Speed up read in of data, we know there are no NA values here
 )
 
-SOURCE_POPULATION_LA = pd.read_csv(p("la_population_age_2019.csv"), usecols=[3, 15])
-SOURCE_OVER_65_LA = pd.read_csv(p("la_population_age_2019.csv"), usecols=[3, 14])
+SOURCE_POPULATION_LA = SourceSpec(p("la_population_age_2019.csv"), usecols=(3, 15))
+SOURCE_OVER_65_LA = SourceSpec(p("la_population_age_2019.csv"), usecols=(3, 14))
 
 
 # Read in IMD data
-SOURCE_IMD_LSOA = pd.read_csv(p("lsoa_IMD_2019.csv"))
+SOURCE_IMD_LSOA = SourceSpec(p("lsoa_IMD_2019.csv"))
 
-SOURCE_IMD_LA = pd.read_csv(p("la_WIMD_2019.csv"))
+SOURCE_IMD_LA = SourceSpec(p("la_WIMD_2019.csv"))
 
 # Read in population density data
-SOURCE_POPDENSITY_LSOA = pd.read_excel(
+SOURCE_POPDENSITY_LSOA = SourceSpec(
     p("lsoa_pop_density_2018-19.xlsx"), sheet_name=3, usecols="A,B,E", skiprows=4
 )
 
-SOURCE_POPDENSITY_LA = pd.read_csv(p("la_pop_density_2018.csv"), usecols=[1, 11])
+SOURCE_POPDENSITY_LA = SourceSpec(p("la_pop_density_2018.csv"), usecols=(1, 11))
+
 
 # Read in Vulnerable and Community Cohesion Data
-vulnerable_and_cohesion = pd.read_excel(
+def vulnerable_and_cohesion(df):
+    """Selects the rows of interest from the vulnerable and cohesion sheet.
+
+    The sheet has a column per local authority, so the rows of interest are
+    transposed to give a row per local authority, with its name in the first column.
+    """
+    # Select only the columns of interest and transpose
+    df = df.iloc[[1, 20, 21, 38]].T
+    # Reset index so the LA name isn't the index
+    return df.reset_index()
+
+
+def vulnerable(df):
+    """Returns only the vulnerable proxy variable from the vulnerable and cohesion sheet."""
+    return vulnerable_and_cohesion(df).iloc[:, [0, 4]].copy()
+
+
+def community_cohesion(df):
+    """Returns only the community cohesion variables from the vulnerable and cohesion sheet."""
+    return vulnerable_and_cohesion(df).iloc[:, [0, 2, 3]].copy()
+
+
+# Seperate this data out so each source only contains one variable
+SOURCE_VULNERABLE_LA = SourceSpec(
+    p("la_vulnerableProxy_and_cohesion.xlsx"),
+    sheet_name="By local authority",
+    usecols="B:X",
+    transform=vulnerable,
+)
+SOURCE_COMM_COHESION_LA = SourceSpec(
     p("la_vulnerableProxy_and_cohesion.xlsx"),
     sheet_name="By local authority",
     usecols="B:X",
+    transform=community_cohesion,
 )
-# Select only the columns of interest and transpose
-vulnerable_and_cohesion = vulnerable_and_cohesion.iloc[[1, 20, 21, 38]].T
-# Reset index so the LA name isn't the index
-vulnerable_and_cohesion.reset_index(inplace=True)
-# Seperate this dataframe out so it only contains one variable per dataframe
-SOURCE_VULNERABLE_LA = vulnerable_and_cohesion.iloc[:, [0, 4]].copy()
-SOURCE_COMM_COHESION_LA = vulnerable_and_cohesion.iloc[:, [0, 2, 3]].copy()
 
 
-SOURCE_INTERNET_ACCESS_LA = pd.read_excel(
+SOURCE_INTERNET_ACCESS_LA = SourceSpec(
     p(
         "National Survey results - internet use and freqency of access by local authority.xlsx"
     ),
@@ -76,7 +104,7 @@ SOURCE_INTERNET_ACCESS_LA = pd.read_excel(
     nrows=22,  # Only parse 22 rows as there is more data underneath
 )
 
-SOURCE_GP_ONLINE_LA = pd.read_csv(p("la_gp_online.csv"))
+SOURCE_GP_ONLINE_LA = SourceSpec(p("la_gp_online.csv"))
 
 # -------------------------
 # Currently unused datasets
@@ -0,0 +1,115 @@
+"""Storage backends used to read and write master datasets.
+
+The classes defined in this module are:
+    MasterStorage
+    ParquetStorage
+    FeatherStorage
+    CsvStorage
+
+Notes
+-----
+Master datasets are indexed on `area_code` and `area_name`. The columnar backends
+(`FeatherStorage`, the default, and `ParquetStorage`) keep this index and the column
+dtypes, are read through memory maps, and can read only a subset of the columns.
+Feather files are uncompressed, so they are the quickest to read.
+`CsvStorage` is kept to export the masters in a human readable format. Compact
+columns (see `datasets.dtypes`) are widened to float64 before they are exported, so
+the csv of a master does not depend on the dtypes it is held in.
+
+The columnar backends require `pyarrow`.
+"""
+
+import pandas as pd
+from abc import ABC, abstractmethod
+
+from datasets.dtypes import widen
+
+INDEX_COLS = ["area_code", "area_name"]
+
+
+class MasterStorage(ABC):
+    """ABC for a file format that master datasets can be written to and read from.
+
+    Attributes
+    ----------
+    suffix: str
+        File extension of the format, including the dot.
+    """
+
+    suffix = None
+
+    @abstractmethod
+    def read(self, path, columns=None):
+        """Reads the master dataset at path, indexed on `INDEX_COLS`.
+
+        Parameters
+        ----------
+        path : str
+            Path to the stored master dataset.
+        columns : list, optional
+            Only read these columns (and the index). By default all columns are read.
+
+        Returns
+        -------
+        pd.DataFrame
+            The stored master dataset.
+
+        Raises
+        ------
+        FileNotFoundError
+            When there is no file at path.
+        """
+
+    @abstractmethod
+    def write(self, data, path):
+        """Writes the master dataset data to path."""
+
+
+class ParquetStorage(MasterStorage):
+    """Stores master datasets as parquet files. The index is kept in the file."""
+
+    suffix = ".parquet"
+
+    def read(self, path, columns=None):
+        return pd.read_parquet(path, columns=columns, memory_map=True)
+
+    def write(self, data, path):
+        data.to_parquet(path)
+
+
+class FeatherStorage(MasterStorage):
+    """Stores master datasets as feather (Arrow IPC) files.
+
+    Notes
+    -------
+    Feather files cannot hold an index, so it is written as columns and set again
+    when the file is read.
+    """
+
+    suffix = ".feather"
+
+    def read(self, path, columns=None):
+        from pyarrow import feather
+
+        if columns is not None:
+            columns = INDEX_COLS + list(columns)
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        return table.to_pandas().set_index(INDEX_COLS)
+
+    def write(self, data, path):
+        data.reset_index().to_feather(path)
+
+
+class CsvStorage(MasterStorage):
+    """Stores master datasets as csv files. Dtypes are inferred again when read."""
+
+    suffix = ".csv"
+
+    def read(self, path, columns=None):
+        if columns is not None:
+            columns = INDEX_COLS + list(columns)
+        return pd.read_csv(path, usecols=columns).set_index(INDEX_COLS)
+
+    def write(self, data, path):
+        # int32 columns would otherwise be written without their ".0"
+        widen(data).to_csv(path)
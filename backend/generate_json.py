@@ -15,32 +15,66 @@ Notes
     modules in the `datasets` package, so that they appear in the corresponding
     `MasterDataset` object.
 
-    The pd.Series provided to the Variable class instances are columns from the
+    The data provided to the Variable class instances are columns from the
     instances of `MasterDataset` that are imported from the `datasets` package.
     These are:
-        `LA_STATIC_MASTER` (from `datasets.static`)
-        `LSOA_STATIC_MASTER` (from `datasets.static`)
-        `LA_LIVE_MASTER` (from `datasets.live`)
+        `LA_STATIC` (from `datasets.static`)
+        `LSOA_STATIC` (from `datasets.static`)
+        `LA_LIVE` (from `datasets.live`)
+    Indexing a `MasterDataset`, e.g. `LA_STATIC["population_count"]`, returns a
+    reference to the column, so the master datasets are only read (or generated)
+    when the data is first used, e.g. by `DATA.write()`, and not on import.
+    The master datasets themselves are available as `LA_STATIC_MASTER`,
+    `LSOA_STATIC_MASTER` and `LA_LIVE_MASTER`, which are also read on first use.
+
+    Once read, the master datasets and variables are kept in memory, so `DATA` does
+    not change when the source files do. Long-running processes, such as the
+    scheduler, should call `build_dashboard()` instead, which reads again only the
+    master datasets whose inputs have changed since its last call.
 """
 
-
 import pandas as pd
-from dataclasses import dataclass
-from typing import Sequence
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Sequence, Union
 from warnings import warn
 from datetime import datetime
 import os
-import json
+import logging
 
 # Local imports
 from datasets.live import LA_LIVE
 from datasets.static import LA_STATIC, LSOA_STATIC
 from datasets import BASE_FOLDER
 from datasets import LSOA_COUNT, LA_COUNT
+from datasets.dataset import MasterColumn, DataFrequency
+from datasets.dtypes import widen
+from datasets.json_writer import JsonBackend, BUFFER_SIZE, write_json
+from datasets.payload import (
+    columnar_payload,
+    columnar_path,
+    write_payload,
+    write_split_payloads,
+)
+
+MASTERS = {
+    "LA_STATIC_MASTER": LA_STATIC,
+    "LSOA_STATIC_MASTER": LSOA_STATIC,
+    "LA_LIVE_MASTER": LA_LIVE,
+}
+
 
-LA_STATIC_MASTER = LA_STATIC.master_dataset
-LSOA_STATIC_MASTER = LSOA_STATIC.master_dataset
-LA_LIVE_MASTER = LA_LIVE.master_dataset
+# Data types that `Variable.transform_per100` returns as they are
+UNSCALED_TYPES = ("percentage", "density", "rank")
+# Data types that `Variable.invert_data` inverts by subtracting them from 100
+COMPLEMENT_TYPES = ("percentage", "count", "per100k")
+
+
+def __getattr__(name):
+    """Returns the master datasets, reading them on first use rather than on import."""
+    if name in MASTERS:
+        return MASTERS[name].master_dataset
+    raise AttributeError("module {} has no attribute {}".format(__name__, name))
 
 
 @dataclass
@@ -57,8 +91,9 @@ class Variable:
 
     Attributes
     -------
-    data: pd.Series
-        The variable data. Index should be set as area name and area code.
+    data: pd.Series or MasterColumn
+        The variable data. Index should be set as area name and area code. A
+        MasterColumn is only read when the data is first used.
     label: str
         Human readable label to be presented on the map.
     data_class: str
@@ -71,29 +106,64 @@ class Variable:
         Is it available at both LA and LSOA resolution? By default, True.
     data_transformed_: pd.Series
         Set by calling the `transform` method. By default, None.
+    data_: pd.Series
+        The variable data, once it has been loaded by `load_data`.
     """
 
-    data: pd.Series
+    data: Union[pd.Series, MasterColumn]
     label: str
     data_class: str
     invert: bool
     data_type: str
     la_and_lsoa: bool = True
     data_transformed_: pd.Series = None
+    data_: pd.Series = field(init=False, default=None, repr=False)
+
+    def load_data(self):
+        """Returns the variable data as a pd.Series, loading it the first time."""
+        if isinstance(self.data, pd.Series):
+            return self.data
+        if self.data_ is None:
+            self.data_ = self.data.load()
+        return self.data_
+
+    @property
+    def masters(self):
+        """Returns a list of the MasterDatasets the transformed variable is computed
+        from, i.e. the master of its data and, for `count` data, of the population."""
+        if isinstance(self.data, MasterColumn):
+            masters = [self.data.master]
+            res = self.data.master.res.name
+        else:
+            masters = []
+            res = self.res
+        if self.data_type == "count":
+            masters.append(POPULATIONS[res].master)
+        return masters
+
+    @property
+    def frequency(self):
+        """Returns the DataFrequency of the variable: LIVE if any of its masters is
+        live, otherwise STATIC (including variables given a pd.Series)."""
+        if any(m.freq == DataFrequency.LIVE for m in self.masters):
+            return DataFrequency.LIVE
+        return DataFrequency.STATIC
+
+    def reset(self):
+        """Drops the loaded and transformed data, so they are computed again."""
+        self.data_ = None
+        self.data_transformed_ = None
 
     @property
     def res(self):
         """Guess and set the resolution of the data depending on no. of rows."""
-        if self.data.shape[0] == LA_COUNT:
+        data = self.load_data()
+        if data.shape[0] == LA_COUNT:
             return "LA"
-        elif self.data.shape[0] == LSOA_COUNT:
+        elif data.shape[0] == LSOA_COUNT:
             return "LSOA"
         else:
-            warn(
-                "Series length of {} does not match LA or LSOA".format(
-                    self.data.shape[0]
-                )
-            )
+            warn("Series length of {} does not match LA or LSOA".format(data.shape[0]))
 
     def transform(self):
         """Applies transformation methods to the variable and sets
@@ -104,13 +174,15 @@ class Variable:
         Variable
             Returns self
         """
-        self.data_transformed_ = self.data
+        # Masters are stored with compact dtypes, restore float64 before transforming
+        self.data_transformed_ = widen(self.load_data())
         self.data_transformed_ = self.transform_per100()
         if self.invert:
             self.data_transformed_ = self.invert_data()
 
-        # Rename without the _ string section defining data type
-        self.data_transformed_.name = self.new_name()
+        # Rename without the _ string section defining data type, on a new pd.Series
+        # as the data is not copied when it is already float64
+        self.data_transformed_ = self.data_transformed_.rename(self.new_name())
 
         return self
 
@@ -146,14 +218,14 @@ class Variable:
         Exception
             When a data type is defined that is not yet supported.
         """
-        if self.data_type in ("percentage", "density", "rank"):
+        if self.data_type in UNSCALED_TYPES:
             return self.data_transformed_
 
         if self.data_type == "count":
             if self.res == "LA":
-                return (self.data_transformed_ / LA_POPULATION) * 100
+                return (self.data_transformed_ / widen(LA_POPULATION.load())) * 100
             elif self.res == "LSOA":
-                return (self.data_transformed_ / LSOA_POPULATION) * 100
+                return (self.data_transformed_ / widen(LSOA_POPULATION.load())) * 100
 
         if self.data_type == "per100k":
             return self.data_transformed_ / 1000
@@ -177,7 +249,7 @@ class Variable:
         Exception
             When a data type is defined that is not yet supported.
         """
-        if self.data_type in ("percentage", "count", "per100k"):
+        if self.data_type in COMPLEMENT_TYPES:
             return 100 - self.data_transformed_
 
         if self.data_type == "rank":
@@ -248,26 +320,147 @@ class Variables:
             print("[Error] Metadata Generation: ", str(failed_labels))
         return metadata
 
-    def data_to_json(self):
-        """Transforms the variables, merges them to one df, rounds them to 3dp,
-        then generates a list of dicts that represent each row (i.e. geographic area).
+    def transform(self):
+        """Transforms all the variables, in one pass for each resolution, and sets the
+        data_transformed_ attribute of each variable.
+
+        Notes
+        -------
+        The variables of each resolution are joined into one area by variable matrix,
+        to which the transformations of `Variable.transform` are applied with a mask
+        of the columns of each data type, rather than one pd.Series at a time. The
+        matrix is then split back into the transformed data of each variable.
+        Variables whose resolution is not LA or LSOA are transformed one at a time.
 
         Returns
         -------
-        list
-            List of dicts, where the keys in each dict are variable names and the
-            values are the values of each varb. This includes the area name
-            and code as keys.
+        Variables
+            Returns self
+
+        Raises
+        -------
+        Exception
+            When a variable has a data type that is not yet supported.
+        """
+        resolutions = {}
+        for variable in self.variables:
+            resolutions.setdefault(variable.res, []).append(variable)
+
+        for res, variables in resolutions.items():
+            if res in POPULATIONS:
+                self._transform_matrix(variables, POPULATIONS[res])
+            else:
+                for variable in variables:
+                    variable.transform()
+        return self
+
+    @staticmethod
+    def _transform_matrix(variables, population):
+        """Transforms variables of the same resolution as one matrix, see `transform`.
+
+        Parameters
+        ----------
+        variables : list
+            The Variable instances to transform.
+        population : MasterColumn
+            The population at the resolution of the variables, used by `count` data.
         """
-        vars = map(lambda v: v.transform(), self.variables)
-        vars = map(lambda v: v.transformed_data, vars)
+        data_types = np.array([v.data_type for v in variables], dtype=object)
+        invert = np.array([v.invert for v in variables], dtype=bool)
+        for variable in variables:
+            if variable.data_type not in UNSCALED_TYPES + ("count", "per100k"):
+                raise Exception(
+                    "Transform per 100 of data type {} is not supported".format(
+                        variable.data_type
+                    )
+                )
+            if variable.invert and variable.data_type not in COMPLEMENT_TYPES + (
+                "rank",
+            ):
+                raise Exception(
+                    "Inversion of data type {} is not supported".format(
+                        variable.data_type
+                    )
+                )
+
+        # Masters are stored with compact dtypes, restore float64 before transforming
+        columns = [widen(v.load_data()) for v in variables]
+        count = data_types == "count"
+        if count.any():
+            per_area = widen(population.load())
+            # Align as dividing each column by the population would, so that the
+            # areas are in the same order as in `Variable.transform`
+            for i in np.flatnonzero(count):
+                if not columns[i].index.equals(per_area.index):
+                    columns[i] = columns[i].align(per_area)[0]
+
+        # Column-major, so that each variable's column is contiguous
+        index = columns[0].index
+        if all(column.index.equals(index) for column in columns):
+            values = np.empty((len(index), len(columns)), dtype="float64", order="F")
+            for i, column in enumerate(columns):
+                values[:, i] = column.to_numpy()
+        else:
+            data = pd.concat(columns, axis=1)
+            index = data.index
+            values = np.asfortranarray(data.to_numpy(dtype="float64"))
+
+        if count.any():
+            per_area = per_area.reindex(index).to_numpy(dtype="float64")
+            values[:, count] = (values[:, count] / per_area[:, np.newaxis]) * 100
+        per100k = data_types == "per100k"
+        values[:, per100k] = values[:, per100k] / 1000
+
+        complement = invert & np.isin(data_types, COMPLEMENT_TYPES)
+        values[:, complement] = 100 - values[:, complement]
+        rank = invert & (data_types == "rank")
+        if rank.any():
+            # pandas skips missing values when taking the max of each column
+            maxes = pd.DataFrame(values[:, rank]).max().to_numpy()
+            values[:, rank] = (maxes + 1) - values[:, rank]
+
+        for i, variable in enumerate(variables):
+            variable.data_transformed_ = pd.Series(
+                values[:, i], index=index, name=variable.new_name(), copy=False
+            )
+
+    def data_to_frame(self):
+        """Merges the transformed variables to one df and rounds them to 3dp.
+
+        Notes
+        -------
+        The data already transformed, e.g. by `DashboardBuilder.build`, is used as it
+        is. Only the variables that have not been transformed yet are transformed,
+        in one pass (see `transform`).
+
+        Returns
+        -------
+        pd.DataFrame
+            A row for each geographic area, with a column for its code and name,
+            and one for each variable.
+        """
+        pending = [v for v in self.variables if v.data_transformed_ is None]
+        if pending:
+            Variables(pending).transform()
+        vars = map(lambda v: v.transformed_data, self.variables)
 
         data = pd.concat(vars, axis=1)
         # Reset index the dataframe first, because we want the index values in json
         data = data.round(3)
-        data = data.reset_index()
+        return data.reset_index()
+
+    def data_to_json(self):
+        """Generates a list of dicts that represent each row (i.e. geographic area) of
+        `data_to_frame`.
 
-        return data.to_dict(orient="records")
+        Returns
+        -------
+        list
+            List of dicts, where the keys in each dict are variable names and the
+            values are the values of each varb. This includes the area name
+            and code as keys.
+        """
+        return self.data_to_frame().to_dict(orient="records")
 
 
 @dataclass
@@ -301,20 +494,104 @@ class DataDashboard:
             Dictionary with three keys: `variables`, `LAs`, `LSOAs`. The values
             are lists of dictionaries containing the data as defined in Variables.
         """
+        json_obj = self.to_frames()
+        for key in ("LAs", "LSOAs"):
+            json_obj[key] = json_obj[key].to_dict(orient="records")
+        return json_obj
+
+    def to_frames(self):
+        """Creates the object of `to_json`, with the `LAs` and `LSOAs` data as dfs
+        (see `Variables.data_to_frame`) rather than lists of dictionaries."""
         # Currently only returning LA level meta data as it encompasses both
         return {
             "variables": self.la_data.metadata_to_json(),
-            "LAs": self.la_data.data_to_json(),
-            "LSOAs": self.lsoa_data.data_to_json(),
+            "LAs": self.la_data.data_to_frame(),
+            "LSOAs": self.lsoa_data.data_to_frame(),
             "updated": datetime.today().strftime("%Y-%m-%d"),
         }
 
-    def write(self, filepath: str = None):
+    def to_split_frames(self, frames: dict = None):
+        """Splits the object of `to_frames` by the DataFrequency of the variables.
+
+        Notes
+        -------
+        The `static` part holds the metadata of all the variables, which only changes
+        when variables are added, and the data of the static variables. The `live`
+        part holds the data of the live variables and the `updated` date. The
+        `LAs` and `LSOAs` dfs of each part keep the area code and name columns, and
+        are left out of a part with no variables at their resolution.
+
+        Parameters
+        ----------
+        frames : dict, optional
+            The object of `to_frames`, if it has already been created.
+
+        Returns
+        -------
+        dict
+            Dictionary in format {'static' : {...}, 'live' : {...} }.
+        """
+        frames = frames or self.to_frames()
+        variables = list(self.la_data.variables) + list(self.lsoa_data.variables)
+        live = {v.new_name() for v in variables if v.frequency == DataFrequency.LIVE}
+
+        split = {
+            DataFrequency.STATIC.value: {"variables": frames["variables"]},
+            DataFrequency.LIVE.value: {},
+        }
+        for key in ("LAs", "LSOAs"):
+            data = frames[key]
+            index_cols = ["area_code", "area_name"]
+            value_cols = [col for col in data.columns if col not in index_cols]
+            for freq, cols in (
+                (DataFrequency.STATIC, [c for c in value_cols if c not in live]),
+                (DataFrequency.LIVE, [c for c in value_cols if c in live]),
+            ):
+                if cols:
+                    split[freq.value][key] = data[index_cols + cols]
+        split[DataFrequency.LIVE.value]["updated"] = frames["updated"]
+        return split
+
+    def to_columnar(self):
+        """Creates the columnar payload of the data, see `datasets.payload`."""
+        return columnar_payload(self.to_frames())
+
+    def write(
+        self,
+        filepath: str = None,
+        backend: JsonBackend = None,
+        columnar: bool = True,
+        split: bool = True,
+    ):
         """Writes out the variables in the required json format to the frontend.
 
         Notes
         -------
         The frontend data folder is assumed to be: `frontend/map/data/data.json`
+
+        The records of the LA and LSOA data are streamed to the file from the dfs of
+        `to_frames`, see `datasets.json_writer`. With the default backend the file
+        is the same as `json.dump` of `to_json`.
+
+        The columnar payload of the same data, and its gzip and brotli versions, are
+        written next to it, e.g. to `data.columnar.json`, `data.columnar.json.gz` and
+        `data.columnar.json.br`. See `datasets.payload`.
+
+        The static and live parts of the data (see `to_split_frames`) are also
+        written as columnar payloads named by their content hash, e.g.
+        `data.static.<hash>.json` and `data.live.<hash>.json`, with a manifest of the
+        current pair, `data.manifest.json`. See `datasets.payload.write_split_payloads`.
+
+        Parameters
+        ----------
+        filepath : str, optional
+            Path of the json file. By default the frontend data folder.
+        backend : JsonBackend, optional
+            The json encoder, e.g. `OrjsonBackend`. By default StdlibJsonBackend.
+        columnar : bool, optional
+            Whether to write the columnar payload. By default True.
+        split : bool, optional
+            Whether to write the split static and live payloads. By default True.
         """
         if not filepath:
             filepath = os.path.join(
@@ -327,15 +604,120 @@ class DataDashboard:
                 "data.json",
             )
 
-        with open(filepath, "w") as outfile:
-            json.dump(self.to_json(), outfile)
+        frames = self.to_frames()
+        with open(filepath, "w", encoding="utf-8", buffering=BUFFER_SIZE) as outfile:
+            write_json(frames, outfile, backend=backend)
+        if columnar:
+            write_payload(columnar_path(filepath), columnar_payload(frames))
+        if split:
+            payloads = {
+                kind: columnar_payload(part)
+                for kind, part in self.to_split_frames(frames).items()
+            }
+            write_split_payloads(filepath, payloads)
 
 
-LA_POPULATION = LA_STATIC_MASTER["population_count"]
-LSOA_POPULATION = LSOA_STATIC_MASTER["population_count"]
+@dataclass
+class DashboardBuilder:
+    """Builds the DataDashboard of the variables, keeping it in memory between builds.
+
+    Notes
+    -------
+    Each build fingerprints the master datasets the variables are computed from (see
+    `MasterDataset.fingerprint`). If none has changed since the last build, the last
+    DataDashboard is returned as it is. Otherwise only the masters that have changed
+    are read or generated again, and only the variables computed from them are
+    transformed again.
+
+    The variables are shared by the dashboards of all builds, so a dashboard
+    returned by an earlier build also holds the data of the latest one.
+
+    Attributes
+    -------
+    la_data: Variables
+        A Variables object of all the LA Variables to be included.
+    lsoa_data: Variables
+        A Variables object of all the LSOA Variables to be included.
+    fingerprints_: dict
+        Dictionary in format {'master file path' : 'fingerprint' } of the master
+        datasets at the last build.
+    dashboard_: DataDashboard
+        The DataDashboard of the last build. By default, None.
+    """
+
+    la_data: Variables
+    lsoa_data: Variables
+    fingerprints_: dict = field(init=False, default_factory=dict, repr=False)
+    dashboard_: DataDashboard = field(init=False, default=None, repr=False)
+
+    @property
+    def variables(self):
+        """Returns a list of all the LA and LSOA variables."""
+        return list(self.la_data.variables) + list(self.lsoa_data.variables)
+
+    @property
+    def masters(self):
+        """Returns a dict of the master datasets of the variables, keyed on file path."""
+        return {
+            master.file_path: master
+            for variable in self.variables
+            for master in variable.masters
+        }
+
+    def build(self, force: bool = False):
+        """Returns the DataDashboard, building again what depends on changed inputs.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Read or generate all the master datasets again, even if their inputs have
+            not changed. By default False.
+
+        Returns
+        -------
+        DataDashboard
+            The dashboard of the variables, with their data loaded and transformed.
+        """
+        masters = self.masters
+        fingerprints = {path: master.fingerprint() for path, master in masters.items()}
+        changed = {
+            path
+            for path, fingerprint in fingerprints.items()
+            if force or self.fingerprints_.get(path) != fingerprint
+        }
+        if self.dashboard_ is not None and not changed:
+            logging.info("The dashboard inputs have not changed since the last build.")
+            return self.dashboard_
+
+        logging.info(
+            "Building the dashboard with {} of {} master datasets changed.".format(
+                len(changed), len(masters)
+            )
+        )
+        for path in changed:
+            masters[path].reset()
+        stale = [
+            variable
+            for variable in self.variables
+            if changed.intersection(m.file_path for m in variable.masters)
+        ]
+        for variable in stale:
+            variable.reset()
+        Variables(stale).transform()
+
+        # Reading or generating a master can store it, which changes its fingerprint
+        fingerprints.update({path: masters[path].fingerprint() for path in changed})
+        self.fingerprints_ = fingerprints
+        self.dashboard_ = DataDashboard(la_data=self.la_data, lsoa_data=self.lsoa_data)
+        return self.dashboard_
+
+
+LA_POPULATION = LA_STATIC["population_count"]
+LSOA_POPULATION = LSOA_STATIC["population_count"]
+POPULATIONS = {"LA": LA_POPULATION, "LSOA": LSOA_POPULATION}
 
 LA_POPDENSITY = Variable(
-    data=LA_STATIC_MASTER["pop_density_persqkm"],
+    data=LA_STATIC["pop_density_persqkm"],
     label="Population Density (per sq. km)",
     data_class="challenge",
     la_and_lsoa=True,
@@ -344,7 +726,7 @@ LA_POPDENSITY = Variable(
 )
 
 LSOA_POPDENSITY = Variable(
-    data=LSOA_STATIC_MASTER["pop_density_persqkm"],
+    data=LSOA_STATIC["pop_density_persqkm"],
     label="Population Density (per sq. km)",
     data_class="challenge",
     invert=False,
@@ -352,7 +734,7 @@ LSOA_POPDENSITY = Variable(
 )
 
 LA_OVER_65 = Variable(
-    data=LA_STATIC_MASTER["over_65_count"],
+    data=LA_STATIC["over_65_count"],
     label="Over Age 65 (per 100 ppl)",
     data_class="challenge",
     la_and_lsoa=True,
@@ -361,7 +743,7 @@ LA_OVER_65 = Variable(
 )
 
 LSOA_OVER_65 = Variable(
-    data=LSOA_STATIC_MASTER["over_65_count"],
+    data=LSOA_STATIC["over_65_count"],
     label="Over Age 65 (per 100 pop)",
     data_class="challenge",
     invert=False,
@@ -369,7 +751,7 @@ LSOA_OVER_65 = Variable(
 )
 
 LA_WIMD = Variable(
-    data=LA_STATIC_MASTER["wimd_2019"],
+    data=LA_STATIC["wimd_2019"],
     label="Most Deprived (% areas in lowest quintile of deprivation)",
     data_class="challenge",
     la_and_lsoa=True,
@@ -378,7 +760,7 @@ LA_WIMD = Variable(
 )
 
 LSOA_WIMD = Variable(
-    data=LSOA_STATIC_MASTER["wimd_2019"],
+    data=LSOA_STATIC["wimd_2019"],
     label="Index of Multiple Deprivation (rank)",
     data_class="challenge",
     invert=True,
@@ -386,7 +768,7 @@ LSOA_WIMD = Variable(
 )
 
 HAS_INTERNET = Variable(
-    data=LA_STATIC_MASTER["has_internet_percent"],
+    data=LA_STATIC["has_internet_percent"],
     label="Digital Exclusion: No Internet Access (per 100 pop)",
     data_class="challenge",
     la_and_lsoa=False,
@@ -395,7 +777,7 @@ HAS_INTERNET = Variable(
 )
 
 VULNERABLE = Variable(
-    data=LA_STATIC_MASTER["vulnerable_pct"],
+    data=LA_STATIC["vulnerable_pct"],
     label="Moderate Risk of COVID-19 (estimated per 100 pop)",
     data_class="challenge",
     la_and_lsoa=False,
@@ -404,7 +786,7 @@ VULNERABLE = Variable(
 )
 
 BELONGING = Variable(
-    data=LA_STATIC_MASTER["belong_percent"],
+    data=LA_STATIC["belong_percent"],
     label="Sense of Community Belonging (per 100 pop)",
     data_class="support",
     la_and_lsoa=False,
@@ -413,7 +795,7 @@ BELONGING = Variable(
 )
 
 COVID_CASES = Variable(
-    data=LA_LIVE_MASTER["covidIncidence_100k"],
+    data=LA_LIVE["covidIncidence_100k"],
     label="Cumulative COVID-19 Cases (per 100 pop)",
     data_class="challenge",
     la_and_lsoa=False,
@@ -422,7 +804,7 @@ COVID_CASES = Variable(
 )
 
 VAX_DOSE1 = Variable(
-    data=LA_LIVE_MASTER["vax1_pct"],
+    data=LA_LIVE["vax1_pct"],
     label="Vaccine Uptake Dose 1 (per 100 pop)",
     data_class="support",
     la_and_lsoa=False,
@@ -431,7 +813,7 @@ VAX_DOSE1 = Variable(
 )
 
 VAX_DOSE2 = Variable(
-    data=LA_LIVE_MASTER["vax2_pct"],
+    data=LA_LIVE["vax2_pct"],
     label="Vaccine Update Dose 2 (per 100 pop)",
     data_class="support",
     la_and_lsoa=False,
@@ -440,7 +822,7 @@ VAX_DOSE2 = Variable(
 )
 
 GROUPS = Variable(
-    data=LA_LIVE_MASTER["groups_count"],
+    data=LA_LIVE["groups_count"],
     label="Community Support Groups (per 100 pop)",
     data_class="support",
     la_and_lsoa=False,
@@ -449,7 +831,7 @@ GROUPS = Variable(
 )
 
 SHIELDING = Variable(
-    data=LA_STATIC_MASTER["shielded_count"],
+    data=LA_STATIC["shielded_count"],
     label="High Risk of COVID-19 (per 100 pop)",
     data_class="challenge",
     la_and_lsoa=False,
@@ -458,7 +840,7 @@ SHIELDING = Variable(
 )
 
 VOLS_TOTAL = Variable(
-    data=LA_LIVE_MASTER["total_vol_count"],
+    data=LA_LIVE["total_vol_count"],
     label="WCVA Registered Volunteers (per 100 pop)",
     data_class="support",
     la_and_lsoa=False,
@@ -467,7 +849,7 @@ VOLS_TOTAL = Variable(
 )
 
 VOLS_INCREASE = Variable(
-    data=LA_LIVE_MASTER["vol_increase_pct"],
+    data=LA_LIVE["vol_increase_pct"],
     label="WCVA Increase in Volunteers (since March 2020, %)",
     data_class="support",
     la_and_lsoa=False,
@@ -477,7 +859,7 @@ VOLS_INCREASE = Variable(
 
 
 GP_DIGITAL = Variable(
-    data=LA_STATIC_MASTER["MHOL_pct"],
+    data=LA_STATIC["MHOL_pct"],
     label="Digital Exclusion: Not Registered with Online GP Services "
     + "(per 100 patients)",
     data_class="challenge",
@@ -487,7 +869,7 @@ GP_DIGITAL = Variable(
 )
 
 TWEETS = Variable(
-    data=LA_LIVE_MASTER["tweets_percent"],
+    data=LA_LIVE["tweets_percent"],
     label="Twitter Community Support (estimated per 100 users)",
     data_class="support",
     la_and_lsoa=False,
@@ -496,7 +878,7 @@ TWEETS = Variable(
 )
 
 ZOE_SUPPORT = Variable(
-    data=LA_LIVE_MASTER["has_someone_close_pct"],
+    data=LA_LIVE["has_someone_close_pct"],
     label="Symptom Tracker: Can Count On Someone Close (per 100 pop)",
     data_class="support",
     la_and_lsoa=False,
@@ -505,7 +887,7 @@ ZOE_SUPPORT = Variable(
 )
 
 VADER_SENTIMENT = Variable(
-    data=LA_LIVE_MASTER["vader_comp"],
+    data=LA_LIVE["vader_comp"],
     label="Avg Twitter Sentiment Past 7 Days",
     data_class="support",
     la_and_lsoa=False,
@@ -547,7 +929,14 @@ LSOA_VARBS = Variables(
 # Finally, create the data with the json function!
 DATA = DataDashboard(la_data=LA_VARBS, lsoa_data=LSOA_VARBS)
 
+BUILDER = DashboardBuilder(la_data=LA_VARBS, lsoa_data=LSOA_VARBS)
+
+
+def build_dashboard(force: bool = False):
+    """Returns the DataDashboard of the latest data, see `DashboardBuilder.build`."""
+    return BUILDER.build(force=force)
+
 
 if __name__ == "__main__":
-    DATA.write()
+    build_dashboard().write()
     print("Successfully executed!")
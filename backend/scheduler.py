@@ -18,6 +18,9 @@ from slack_tokens import SLACK_TOKEN, SLACK_CHANNEL
 from datasets import LIVE_DATA_FOLDER, LIVE_RAW_DATA_FOLDER, GEO_DATA_FOLDER
 from data_collection.police_coders_groups.run_scraper import run_police_coders_scraper
 from data_collection.phw_data import PHWDownload, COVID_CASES, VAX_RATES
+from datasets.history import ingest_histories
+from datasets.live import LIVE_HISTORIES
+from generate_json import build_dashboard
 
 # NB Necessary to set up the logging config before running the local imports
 logging.basicConfig(
@@ -108,6 +111,8 @@ def run_data_collection(update_groups=False):
     PHWDownload(COVID_CASES, LIVE_RAW_DATA_FOLDER).save_data()
     # Get the latest vaccination data from PHW
     PHWDownload(VAX_RATES, LIVE_RAW_DATA_FOLDER).save_data()
+    # Keep the new days of the PHW data, as the workbooks are replaced each day
+    ingest_histories(LIVE_HISTORIES)
     # Run the Police Coders community group scraper
     if update_groups:
         run_police_coders_scraper(
@@ -117,14 +122,9 @@ def run_data_collection(update_groups=False):
 
 @with_logging
 def update_json(output_path: str):
-    # Re-run the import each time to ensure the imported DATA object is not saved
-    # in memory
-    try:
-        from generate_json import DATA
-
-        DATA.write(filepath=output_path)
-    except Exception as ex:
-        raise ex
+    # The dashboard is kept in memory between runs, and only the master datasets
+    # whose inputs have changed since the last run are read again
+    build_dashboard().write(filepath=output_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+"""Tests of the read-only sqlite access of `datasets.database`.
+
+Run from the backend folder with `python -m pytest test_database.py`.
+"""
+
+import sqlite3
+import pytest
+import pandas as pd
+
+from datasets.database import ConnectionPool, connect_writer
+
+
+def write_database(path, journal_mode="delete"):
+    """Writes a database with a table of two values to path."""
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode={}".format(journal_mode))
+    con.execute("CREATE TABLE t (value INTEGER)")
+    con.executemany("INSERT INTO t VALUES (?)", [(1,), (2,)])
+    con.commit()
+    con.close()
+
+
+def journal_mode(path):
+    """Returns the journal mode of the database at path."""
+    con = sqlite3.connect(path)
+    try:
+        return con.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        con.close()
+
+
+def test_pool_reads_read_only(tmp_path):
+    path = str(tmp_path / "tweets.db")
+    write_database(path)
+    pool = ConnectionPool()
+    assert pool.read_sql(path, "SELECT value FROM t")["value"].tolist() == [1, 2]
+    assert pool.read_sql(path, "SELECT COUNT(*) AS n FROM t")["n"].tolist() == [2]
+    assert [timing.reused for timing in pool.timings] == [False, True]
+
+    with pytest.raises(pd.errors.DatabaseError, match="readonly"):
+        pool.read_sql(path, "INSERT INTO t VALUES (3)")
+    assert journal_mode(path) == "delete"
+    pool.close()
+
+
+def test_missing_database_is_not_created(tmp_path):
+    path = str(tmp_path / "missing.db")
+    with pytest.raises(FileNotFoundError):
+        ConnectionPool().read_sql(path, "SELECT 1")
+    with pytest.raises(FileNotFoundError):
+        connect_writer(path)
+    assert not (tmp_path / "missing.db").exists()
+
+
+def test_writer_keeps_the_journal_mode(tmp_path):
+    path = str(tmp_path / "tweets.db")
+    write_database(path)
+    connect_writer(path).close()
+    assert journal_mode(path) == "delete"
+
+    write_database(str(tmp_path / "wal.db"), journal_mode="wal")
+    connect_writer(str(tmp_path / "wal.db")).close()
+    assert journal_mode(str(tmp_path / "wal.db")) == "wal"
@@ -0,0 +1,420 @@
+"""Tests of the master datasets and joins of `datasets.dataset`.
+
+Run from the backend folder with `python -m pytest test_dataset.py`.
+"""
+
+import os
+import numpy as np
+from functools import reduce
+import pandas as pd
+import pytest
+
+import datasets
+import datasets.dataset as dataset_module
+from datasets.dataset import (
+    LA_COUNT,
+    MANIFEST_VERSION,
+    aligned_join,
+    Dataset,
+    DatasetJoin,
+    GeoKeyIndex,
+    MasterDataset,
+    DataResolution,
+    DataFrequency,
+    ExecutionMode,
+)
+from datasets.sources import SourceSpec, GRID_CACHE
+from benchmarks.bench_bracketed_data import (
+    COLS,
+    legacy_clean_bracketed_data,
+    synthetic_bracketed_data,
+)
+
+LA_KEYS = pd.DataFrame(
+    {
+        "lad19cd": ["W060000{:02d}".format(i) for i in range(1, LA_COUNT + 1)],
+        "lad19nm": ["Area {}".format(i) for i in range(1, LA_COUNT + 1)],
+    }
+)
+
+
+@pytest.fixture
+def la_keys(monkeypatch):
+    """Sets the LA reference keys to `LA_KEYS`, without reading the boundary file."""
+    index = GeoKeyIndex.from_reference(LA_KEYS, DataResolution.LA)
+    monkeypatch.setattr(Dataset, "KEY_INDEXES", {DataResolution.LA: index})
+    return LA_KEYS
+
+
+def write_master_csv(folder, values):
+    """Writes a LA static master csv with one column of values to folder."""
+    path = os.path.join(folder, "data", "static", "LA_static_master.csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame(
+        {
+            "area_code": ["W0600000{}".format(i) for i in range(len(values))],
+            "area_name": ["Area {}".format(i) for i in range(len(values))],
+            "value": values,
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+def read_master():
+    """Returns the LA static master dataset, read from its stored copy."""
+    master = MasterDataset(
+        datasets=[], res=DataResolution.LA, freq=DataFrequency.STATIC
+    )
+    return master, master.master_dataset
+
+
+def test_master_is_stored_again_when_csv_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "BASE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    csv_path = write_master_csv(str(tmp_path), [1.5, 2.5])
+
+    master, data = read_master()
+    assert os.path.isfile(master.file_path)
+    assert data["value"].tolist() == [1.5, 2.5]
+    fingerprint = master.fingerprint()
+
+    # The committed csv is updated, e.g. by git pull, while the stored copy is kept
+    write_master_csv(str(tmp_path), [7.5, 8.5, 9.5])
+    os.utime(csv_path, ns=(0, 0))
+
+    master, data = read_master()
+    assert data["value"].tolist() == [7.5, 8.5, 9.5]
+    assert master.fingerprint() != fingerprint
+    assert master.read_columns(["value"])["value"].tolist() == [7.5, 8.5, 9.5]
+
+
+def test_master_read_columns_uses_fresh_stored_copy(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "BASE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    write_master_csv(str(tmp_path), [1.5, 2.5])
+
+    master, _ = read_master()
+    fresh = MasterDataset(datasets=[], res=DataResolution.LA, freq=DataFrequency.STATIC)
+    assert fresh.read_columns(["value"])["value"].tolist() == [1.5, 2.5]
+    assert fresh.master_dataset_ is None
+    assert fresh.fingerprint() == master.fingerprint()
+
+
+def test_dataset_join_is_not_hashable():
+    dataset = Dataset(
+        data=pd.DataFrame({"code": ["W06000001"], "value": [1.0]}),
+        res=DataResolution.LA,
+        key_col="code",
+        key_is_code=True,
+        csv_name="test",
+    )
+    dataset.std_data_ = pd.DataFrame(
+        {"lad19cd": ["W06000001"], "lad19nm": ["Isle of Anglesey"], "value": [1.0]}
+    )
+    join = DatasetJoin.of(dataset)
+    assert join == join and join != DatasetJoin.of(dataset)
+    with pytest.raises(TypeError):
+        hash(join)
+
+
+def write_live_sources(folder):
+    """Writes a csv keyed on LA codes and a workbook keyed on LA names to folder."""
+    import openpyxl
+
+    codes, names = LA_KEYS["lad19cd"].tolist(), LA_KEYS["lad19nm"].tolist()
+    pd.DataFrame(
+        {
+            "code": codes[::-1] + ["W92000004"],
+            "total_vol_count": [100.0 + i for i in range(LA_COUNT)] + [9999.0],
+            "new_vol_count": [float(i) for i in range(LA_COUNT)] + [999.0],
+        }
+    ).to_csv(os.path.join(folder, "volunteers.csv"), index=False)
+
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["LA", "cases"])
+    for i, name in enumerate(names):
+        workbook.active.append(["  {} ".format(name), "1,{:03d} ( {}.5)".format(i, i)])
+    workbook.save(os.path.join(folder, "cases.xlsx"))
+
+
+def live_master(folder, mode=ExecutionMode.SERIAL, **kwargs):
+    """Returns a LA live master of the sources written by `write_live_sources`, with
+    other MasterDataset attributes given by kwargs."""
+    volunteers = Dataset(
+        data=SourceSpec(path=os.path.join(folder, "volunteers.csv")),
+        res=DataResolution.LA,
+        key_col="code",
+        key_is_code=True,
+        csv_name="volunteers",
+    )
+    cases = Dataset(
+        data=SourceSpec(path=os.path.join(folder, "cases.xlsx"), usecols="A:B"),
+        res=DataResolution.LA,
+        key_col="LA",
+        key_is_code=False,
+        csv_name="cases",
+        bracketed_data_cols=["cases"],
+    )
+    groups = Dataset(
+        data=LA_KEYS[["lad19cd"]].assign(groups=range(LA_COUNT)),
+        res=DataResolution.LA,
+        key_col="lad19cd",
+        key_is_code=True,
+        csv_name="groups",
+    )
+    return MasterDataset(
+        datasets=[volunteers, cases, groups],
+        res=DataResolution.LA,
+        freq=DataFrequency.LIVE,
+        from_csv=False,
+        mode=mode,
+        max_workers=2,
+        **kwargs,
+    )
+
+
+def test_execution_modes_build_the_same_master(tmp_path, monkeypatch, la_keys):
+    monkeypatch.setattr(datasets, "BASE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    os.makedirs(tmp_path / "data" / "live")
+    write_live_sources(str(tmp_path))
+
+    masters = {}
+    for mode in ExecutionMode:
+        master = live_master(str(tmp_path), mode)
+        masters[mode] = master.master_dataset
+        # Each mode parses the sources again, rather than reading the grids of the
+        # previous mode
+        for dataset in master.datasets:
+            dataset.reset()
+
+    serial = masters[ExecutionMode.SERIAL]
+    assert serial.shape[0] == LA_COUNT
+    assert serial.index.get_level_values(0).tolist() == la_keys["lad19cd"].tolist()
+    assert serial["cases_count"].iloc[1] == 1001 and serial["cases_pct"].iloc[1] == 1.5
+    assert serial["vol_increase_pct"].notna().all()
+    for mode in (ExecutionMode.THREAD, ExecutionMode.PROCESS):
+        pd.testing.assert_frame_equal(masters[mode], serial)
+
+
+def clean_bracketed(df, cols):
+    """Returns the result of `Dataset.clean_bracketed_data` on the cols of df."""
+    dataset = Dataset(
+        data=df,
+        res=DataResolution.LA,
+        key_col="lad19cd",
+        key_is_code=True,
+        csv_name="bracketed",
+        bracketed_data_cols=cols,
+    )
+    dataset.std_data_ = df.copy()
+    return dataset.clean_bracketed_data()
+
+
+def test_bracketed_data_matches_the_per_cell_parser():
+    df = synthetic_bracketed_data(n_rows=200)
+    df.loc[0, COLS[0]] = "10 (0.5)"
+    df.loc[1, COLS[0]] = "17 ( 100)"
+    df.loc[2, COLS[1]] = "12.5 (3.25)"
+    pd.testing.assert_frame_equal(
+        clean_bracketed(df, COLS), legacy_clean_bracketed_data(df.copy(), COLS)
+    )
+
+
+def test_bracketed_data_sets_other_values_to_na():
+    df = pd.DataFrame(
+        {
+            "LSOA11CD": ["W01000001", "W01000002", "W01000003", "W01000004"],
+            "cases": ["1,161 ( 43.3)", "1161 (43.3 %)", "12", "n/a"],
+            "tests": ["20 (5.5)", np.nan, "", "( 43.3)"],
+        }
+    )
+    # The per-cell parser kept the thousands separator, which then failed the cast
+    # of the master to float64, and raised on values it could not split in two
+    with pytest.raises(ValueError):
+        legacy_clean_bracketed_data(df.iloc[:1].copy(), ["cases"])
+    for row, col in [(2, "cases"), (3, "cases"), (1, "tests"), (2, "tests")]:
+        with pytest.raises((IndexError, TypeError)):
+            legacy_clean_bracketed_data(df.iloc[row : row + 1].copy(), [col])
+
+    # Single digit values, which the per-cell parser could not split in two either
+    digits = clean_bracketed(pd.DataFrame({"cases": ["0 (0.0)", "7 ( 5)"]}), ["cases"])
+    assert digits.to_numpy().tolist() == [[0.0, 0.0], [7.0, 5.0]]
+    with pytest.raises(IndexError):
+        legacy_clean_bracketed_data(pd.DataFrame({"cases": ["7 ( 5)"]}), ["cases"])
+
+    with pytest.warns(UserWarning, match="4 values"):
+        result = clean_bracketed(df, ["cases", "tests"])
+    assert result.columns.tolist() == [
+        "LSOA11CD",
+        "cases_count",
+        "cases_pct",
+        "tests_count",
+        "tests_pct",
+    ]
+    assert result["cases_count"].tolist()[:2] == [1161.0, 1161.0]
+    assert result["cases_pct"].tolist()[:2] == [43.3, 43.3]
+    assert result["tests_count"].tolist()[0] == 20.0
+    assert result.iloc[2:, 1:3].isna().all().all()
+    assert result.iloc[1:, 3:].isna().all().all()
+
+
+def la_dataset(df, key_col, key_is_code=True):
+    """Returns a LA Dataset of df keyed on key_col."""
+    return Dataset(
+        data=df,
+        res=DataResolution.LA,
+        key_col=key_col,
+        key_is_code=key_is_code,
+        csv_name="keys",
+    )
+
+
+def test_keys_are_matched_on_codes(la_keys):
+    codes = la_keys["lad19cd"].tolist()
+    df = pd.DataFrame(
+        {
+            "code": [" {} ".format(code) for code in codes[::-1]] + ["W92000004"],
+            "name": ["Other name"] * LA_COUNT + ["Wales"],
+            "value": list(range(LA_COUNT)) + [999],
+        }
+    )
+    data = la_dataset(df, "code").standardise().standardised_data
+    # The rows follow the reference keys, whose names replace those of the source
+    pd.testing.assert_frame_equal(data[["lad19cd", "lad19nm"]], la_keys)
+    assert data["value"].tolist() == list(range(LA_COUNT))[::-1]
+    assert "name" in data.columns and "W92000004" not in data["lad19cd"].tolist()
+
+
+def test_keys_are_matched_on_normalised_names(la_keys):
+    names = la_keys["lad19nm"].tolist()
+    df = pd.DataFrame(
+        {
+            "name": ["  {} ".format(name.upper().replace(" ", "  ")) for name in names],
+            "value": range(LA_COUNT),
+        }
+    )
+    data = la_dataset(df, "name", key_is_code=False).standardise().standardised_data
+    pd.testing.assert_frame_equal(data[["lad19cd", "lad19nm"]], la_keys)
+    assert data["value"].tolist() == list(range(LA_COUNT))
+
+    # A name is not matched to the codes, nor a code to the names
+    key_index = Dataset.key_index(DataResolution.LA)
+    assert key_index.positions(pd.Series(names[:1])).tolist() == [-1]
+    assert key_index.positions(la_keys["lad19cd"][:1], key_is_code=False)[0] == -1
+
+
+def test_missing_and_repeated_keys_raise(la_keys):
+    codes = la_keys["lad19cd"].tolist()
+    missing = pd.DataFrame({"code": codes[1:] + ["W92000004"], "value": 1.0})
+    with pytest.raises(Exception, match=r"Missing areas: \['Area 1'\]"):
+        la_dataset(missing, "code").standardise()
+
+    repeated = pd.DataFrame({"code": codes + codes[2:3], "value": 1.0})
+    with pytest.raises(Exception, match=r"Repeated areas: \['Area 3'\]"):
+        la_dataset(repeated, "code").standardise()
+
+    with pytest.raises(ValueError, match="not unique"):
+        GeoKeyIndex.from_reference(
+            pd.concat([la_keys, la_keys.iloc[:1]]), DataResolution.LA
+        )
+
+
+def previous_join(frames):
+    """Returns frames joined pairwise with inner merges on their index, as the
+    master datasets were joined before `aligned_join`."""
+    return reduce(
+        lambda left, right: pd.merge(left, right, left_index=True, right_index=True),
+        frames,
+    )
+
+
+def indexed_frames(n_rows=6):
+    """Returns three frames indexed on the same areas, in different orders."""
+    index = pd.MultiIndex.from_arrays(
+        [
+            ["W0600000{}".format(i) for i in range(n_rows)],
+            ["Area {}".format(i) for i in range(n_rows)],
+        ],
+        names=["area_code", "area_name"],
+    )
+    rng = np.random.default_rng(0)
+    first = pd.DataFrame({"a": rng.random(n_rows)}, index=index)
+    second = pd.DataFrame({"b": rng.random(n_rows), "c": range(n_rows)}, index=index)
+    third = pd.DataFrame({"d": rng.random(n_rows)}, index=index)
+    return first, second.iloc[::-1], third.iloc[rng.permutation(n_rows)]
+
+
+def test_aligned_join_matches_the_previous_join():
+    frames = indexed_frames()
+    joined = aligned_join(frames)
+    pd.testing.assert_frame_equal(joined, previous_join(frames))
+    assert joined.index.equals(frames[0].index)
+
+    # Frames that are already aligned are joined as they are
+    aligned = [frame.reindex(frames[0].index) for frame in frames]
+    pd.testing.assert_frame_equal(aligned_join(aligned), joined)
+
+
+def test_aligned_join_rejects_partly_overlapping_areas():
+    first, second, third = indexed_frames()
+    # The previous inner merge silently dropped the areas missing from a frame,
+    # which the row count check of the master then rejected
+    other_area = second.rename(index={"W06000005": "W06000099"}, level=0)
+    for partial in (second.iloc[1:], other_area):
+        assert len(previous_join([first, partial])) < len(first)
+        with pytest.raises(ValueError, match="same areas"):
+            aligned_join([first, partial])
+
+    with pytest.raises(ValueError, match="more than one dataset"):
+        aligned_join([first, second, first])
+
+
+def test_incremental_build_standardises_only_changed_datasets(
+    tmp_path, monkeypatch, la_keys
+):
+    monkeypatch.setattr(datasets, "BASE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    os.makedirs(tmp_path / "data" / "live")
+    write_live_sources(str(tmp_path))
+
+    standardised = []
+    standardise = Dataset.standardise
+
+    def counted_standardise(dataset):
+        standardised.append(dataset.csv_name)
+        return standardise(dataset)
+
+    monkeypatch.setattr(Dataset, "standardise", counted_standardise)
+
+    def build():
+        standardised.clear()
+        master = live_master(str(tmp_path), incremental=True)
+        data = master.master_dataset
+        master.reset()
+        return data, sorted(standardised)
+
+    full, names = build()
+    assert names == ["cases", "groups", "volunteers"]
+    pd.testing.assert_frame_equal(
+        full, live_master(str(tmp_path), incremental=False).master_dataset
+    )
+
+    # Unchanged sources are taken from the stored merge
+    unchanged, names = build()
+    assert names == []
+    pd.testing.assert_frame_equal(unchanged, full)
+
+    # A changed source is standardised again
+    volunteers = pd.read_csv(tmp_path / "volunteers.csv")
+    volunteers["new_vol_count"] += 1
+    volunteers.to_csv(tmp_path / "volunteers.csv", index=False)
+    changed, names = build()
+    assert names == ["volunteers"]
+    assert (changed["new_vol_count"] == full["new_vol_count"] + 1).all()
+    pd.testing.assert_series_equal(changed["cases_pct"], full["cases_pct"])
+
+    # A new manifest version standardises every dataset again
+    monkeypatch.setattr(dataset_module, "MANIFEST_VERSION", MANIFEST_VERSION + 1)
+    _, names = build()
+    assert names == ["cases", "groups", "volunteers"]
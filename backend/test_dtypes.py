@@ -0,0 +1,61 @@
+"""Tests of the compact master dtypes of `datasets.dtypes`.
+
+Run from the backend folder with `python -m pytest test_dtypes.py`.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+import datasets
+from datasets.dataset import MasterDataset
+from datasets.dtypes import DtypePlan, widen, compact
+
+
+def test_column_dtype_is_lossless():
+    column_dtype = DtypePlan.column_dtype
+    assert column_dtype(pd.Series([1.0, 2.0, -3.0])) == np.dtype("int32")
+    assert column_dtype(pd.Series([1.0, 2.0, np.nan])) == np.dtype("float32")
+    # Whole numbers outside the int32 range
+    assert column_dtype(pd.Series([2.0**31, 1.0])) == np.dtype("float32")
+    assert column_dtype(pd.Series([0.125, 12.345, 98.355])) == np.dtype("float32")
+    # A fourth decimal place, or more digits than float32 holds
+    assert column_dtype(pd.Series([0.1234])) == np.dtype("float64")
+    assert column_dtype(pd.Series([48.986848])) == np.dtype("float64")
+    assert column_dtype(pd.Series([0.1234]), decimals=4) == np.dtype("float32")
+    for other in (pd.Series([True, False]), pd.Series(["a", "b"])):
+        assert column_dtype(other) == other.dtype
+
+
+def test_widen_restores_the_planned_values():
+    df = pd.DataFrame(
+        {
+            "count": [2034.0, 3154.0],
+            "pct": [85.991, np.nan],
+            "density": [98.355065, 48.986848],
+        }
+    )
+    plan = DtypePlan.from_frame(df)
+    assert [str(dtype) for dtype in plan.dtypes.values()] == [
+        "int32",
+        "float32",
+        "float64",
+    ]
+    assert plan.bytes_saved == 2 * 4 + 2 * 4 and plan.bytes_after < plan.bytes_before
+
+    compacted = plan.apply(df)
+    pd.testing.assert_frame_equal(widen(compacted), df)
+    pd.testing.assert_series_equal(widen(compacted["pct"]), df["pct"])
+
+
+def test_csv_export_does_not_change_with_compact_dtypes(tmp_path):
+    # The committed masters are read back exactly with round_trip parsing
+    path = os.path.join(datasets.BASE_FOLDER, "data", "live", "LA_live_master.csv")
+    master = pd.read_csv(path, float_precision="round_trip")
+    master = master.set_index(["area_code", "area_name"])
+    compacted = compact(master)
+    assert "int32" in set(map(str, compacted.dtypes))
+
+    MasterDataset.write(compacted, str(tmp_path / "master.csv"))
+    with open(path) as committed, open(tmp_path / "master.csv") as written:
+        assert written.read() == committed.read()
@@ -0,0 +1,178 @@
+"""Tests of the variables and dashboard builds of `generate_json`.
+
+Run from the backend folder with `python -m pytest test_generate_json.py`.
+"""
+
+import os
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+
+import datasets
+import generate_json
+from generate_json import DashboardBuilder, Variable, Variables
+from datasets import LA_COUNT
+from datasets.dataset import MasterDataset, DataResolution, DataFrequency
+from benchmarks.bench_variable_transform import (
+    DATA_TYPES,
+    per_variable_transform,
+    reset,
+)
+
+LA_INDEX = pd.MultiIndex.from_arrays(
+    [
+        ["W060000{:02d}".format(i) for i in range(1, LA_COUNT + 1)],
+        ["Area {}".format(i) for i in range(1, LA_COUNT + 1)],
+    ],
+    names=["area_code", "area_name"],
+)
+
+
+def la_variables(seed=0):
+    """Returns a LA Variable of random data for each data type, with and without
+    inversion where the data type supports it."""
+    rng = np.random.default_rng(seed)
+    variables = []
+    for data_type in DATA_TYPES:
+        for invert in (False, True) if data_type != "density" else (False,):
+            if data_type == "rank":
+                values = rng.permutation(LA_COUNT) + 1.0
+            else:
+                values = rng.uniform(0, 10000, LA_COUNT).round(3)
+            values[rng.integers(LA_COUNT)] = np.nan
+            name = "{}{}_{}".format(data_type, int(invert), data_type)
+            variables.append(
+                Variable(
+                    data=pd.Series(values, index=LA_INDEX, name=name),
+                    label=name,
+                    data_class="support",
+                    invert=invert,
+                    data_type=data_type,
+                )
+            )
+    return variables
+
+
+def set_la_population(monkeypatch, population):
+    """Sets the LA population of count data to the pd.Series population."""
+    column = SimpleNamespace(load=lambda: population)
+    monkeypatch.setattr(generate_json, "LA_POPULATION", column)
+    monkeypatch.setattr(generate_json, "POPULATIONS", {"LA": column})
+
+
+def expected_transforms(variables, population):
+    """Returns the expected transformed data of each variable, keyed on new name."""
+    expected = {}
+    for variable in variables:
+        data = variable.data
+        if variable.data_type == "count":
+            data = data / population.astype("float64") * 100
+        elif variable.data_type == "per100k":
+            data = data / 1000
+        if variable.invert:
+            if variable.data_type == "rank":
+                data = data.max() + 1 - data
+            else:
+                data = 100 - data
+        expected[variable.new_name()] = data.rename(variable.new_name())
+    return expected
+
+
+def la_population(seed=1):
+    """Returns a random int32 LA population, as the compact masters store it."""
+    rng = np.random.default_rng(seed)
+    return pd.Series(
+        rng.integers(50000, 400000, LA_COUNT).astype("int32"), index=LA_INDEX
+    )
+
+
+def test_batched_transform_matches_per_variable_transform(monkeypatch):
+    population = la_population()
+    set_la_population(monkeypatch, population)
+    variables = la_variables()
+    per_variable = per_variable_transform(variables)
+
+    reset(variables)
+    Variables(variables).transform()
+    batched = pd.concat([v.transformed_data for v in variables], axis=1)
+    pd.testing.assert_frame_equal(batched, per_variable, check_exact=True)
+
+    # Inverted data is complemented, or has its rank reversed, after the per-100
+    # scaling of count and per100k data
+    for name, expected in expected_transforms(variables, population).items():
+        pd.testing.assert_series_equal(batched[name], expected)
+
+
+def test_batched_transform_aligns_count_data_to_the_population(monkeypatch):
+    population = la_population()
+    # The population in another order than the areas of the variables
+    set_la_population(monkeypatch, population.iloc[::-1])
+    variables = [v for v in la_variables() if v.data_type == "count"]
+    per_variable = per_variable_transform(variables)
+
+    reset(variables)
+    Variables(variables).transform()
+    batched = pd.concat([v.transformed_data for v in variables], axis=1)
+    pd.testing.assert_frame_equal(batched, per_variable, check_exact=True)
+
+
+def write_la_master(folder, freq, values):
+    """Writes a LA master csv of freq with a `value_percentage` column to folder, and
+    returns a MasterDataset read from it."""
+    master = MasterDataset(datasets=[], res=DataResolution.LA, freq=freq)
+    path = os.path.join(
+        folder, "data", freq.name.lower(), os.path.basename(master.csv_path)
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame({"value_percentage": values}, index=LA_INDEX).to_csv(path)
+    return master
+
+
+def la_builder(folder):
+    """Returns a DashboardBuilder of one variable of a static and of a live master."""
+    static = write_la_master(folder, DataFrequency.STATIC, np.arange(LA_COUNT) * 1.0)
+    live = write_la_master(folder, DataFrequency.LIVE, np.arange(LA_COUNT) * 2.0)
+    variables = [
+        Variable(
+            data=master["value_percentage"],
+            label="Value",
+            data_class="support",
+            invert=False,
+            data_type="percentage",
+        )
+        for master in (static, live)
+    ]
+    return DashboardBuilder(la_data=Variables(variables), lsoa_data=Variables([]))
+
+
+def test_builder_returns_the_last_dashboard_if_nothing_changed(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "BASE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    builder = la_builder(str(tmp_path))
+    dashboard = builder.build()
+    transformed = [v.data_transformed_ for v in builder.variables]
+    assert all(data is not None for data in transformed)
+
+    assert builder.build() is dashboard
+    assert all(
+        v.data_transformed_ is data for v, data in zip(builder.variables, transformed)
+    )
+    # Unless forced to build again
+    assert builder.build(force=True) is not dashboard
+
+
+def test_builder_transforms_only_the_variables_of_changed_masters(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(datasets, "BASE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    builder = la_builder(str(tmp_path))
+    dashboard = builder.build()
+    static, live = builder.la_data.variables
+    static_data, live_data = static.data_transformed_, live.data_transformed_
+
+    write_la_master(str(tmp_path), DataFrequency.LIVE, np.arange(LA_COUNT) * 3.0)
+    assert builder.build() is not dashboard
+    assert static.data_transformed_ is static_data
+    assert live.data_transformed_ is not live_data
+    assert live.data_transformed_.tolist() == (np.arange(LA_COUNT) * 3.0).tolist()
@@ -0,0 +1,81 @@
+"""Tests of the history of the live snapshots of `datasets.history`.
+
+Run from the backend folder with `python -m pytest test_history.py`.
+"""
+
+import os
+import pandas as pd
+
+from datasets.history import HistorySpec, HistoryStore, DATE_COL
+from datasets.sources import SourceSpec, GRID_CACHE
+
+
+def write_uptake(path, values, day):
+    """Writes a csv with an uptake value per area to path, saved on day."""
+    pd.DataFrame({"area": ["Cardiff", "Newport"], "uptake": values}).to_csv(
+        path, index=False
+    )
+    timestamp = pd.Timestamp(day).timestamp()
+    os.utime(path, (timestamp, timestamp))
+
+
+def uptake_store(tmp_path):
+    """Returns the store of a history of a csv without a date column."""
+    spec = HistorySpec(
+        name="uptake",
+        source=SourceSpec(str(tmp_path / "uptake.csv")),
+        key_col="area",
+        value_cols=("uptake",),
+    )
+    return HistoryStore(spec, folder=str(tmp_path / "history"))
+
+
+def test_ingest_round_trips(tmp_path):
+    path = str(tmp_path / "cases.csv")
+    pd.DataFrame(
+        {
+            "area": ["Newport", "Cardiff", "Cardiff", "Newport"],
+            "day": ["2021-03-31", "2021-03-31", "2021-04-01", "2021-04-01"],
+            "cases": [4, 3, 5.5, 6],
+        }
+    ).to_csv(path, index=False)
+    spec = HistorySpec(
+        name="cases",
+        source=SourceSpec(path),
+        key_col="area",
+        value_cols=("cases",),
+        date_col="day",
+    )
+    store = HistoryStore(spec, folder=str(tmp_path / "history"))
+
+    assert store.ingest() == {"added": 2, "revised": 0, "unchanged": 0}
+    assert store.ingest() == {"added": 0, "revised": 0, "unchanged": 2}
+    assert sorted(os.listdir(store.path)) == [
+        "manifest.json",
+        "month=2021-03.parquet",
+        "month=2021-04.parquet",
+    ]
+    pd.testing.assert_frame_equal(store.read(), spec.snapshot())
+
+    april = store.read(start="2021-04-01", areas=["Cardiff"])
+    assert april["cases"].tolist() == [5.5]
+    assert april[DATE_COL].tolist() == [pd.Timestamp("2021-04-01")]
+    GRID_CACHE.discard(spec.source)
+
+
+def test_ingest_reads_the_changed_file(tmp_path):
+    store = uptake_store(tmp_path)
+    source = store.spec.source
+    write_uptake(source.path, [1.5, 2.5], "2021-03-01 15:00")
+    store.ingest()
+    # The file is also read by a build, which caches its grid
+    assert source.load()["uptake"].tolist() == [1.5, 2.5]
+
+    # The next download has the same size, and is dated the next day
+    write_uptake(source.path, [7.5, 8.5], "2021-03-02 15:00")
+    assert store.ingest() == {"added": 1, "revised": 0, "unchanged": 0}
+
+    history = store.read()
+    assert history[DATE_COL].dt.day.tolist() == [1, 2, 1, 2]
+    assert history["uptake"].tolist() == [1.5, 7.5, 2.5, 8.5]
+    GRID_CACHE.discard(source)
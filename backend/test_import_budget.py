@@ -0,0 +1,109 @@
+"""Checks that importing the backend modules reads no data and stays within a time budget.
+
+Each module is imported in a fresh interpreter, with an audit hook that records every
+file opened and every sqlite database connected to. Importing a module must not open
+any file in the repository other than Python source, and must not connect to a
+database. Source data is only read when a master dataset is first used.
+
+Run from the backend folder with `python test_import_budget.py`, or with pytest.
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+BACKEND_FOLDER = os.path.dirname(os.path.abspath(__file__))
+REPO_FOLDER = os.path.dirname(BACKEND_FOLDER)
+
+# Modules whose import should do no I/O
+MODULES = ["generate_json", "datasets.static", "datasets.live"]
+
+# Third party packages imported before timing, so only the repo's code is timed
+DEPENDENCIES = ["numpy", "pandas", "geopandas", "scipy.sparse"]
+
+# Seconds allowed to import a module once its dependencies have been imported
+IMPORT_BUDGET = 1.0
+
+PROBE = """
+import sys, json, time
+for dependency in {dependencies}:
+    __import__(dependency)
+opened = []
+def audit(event, args):
+    if event == "open" and isinstance(args[0], str):
+        opened.append(args[0])
+    elif event == "sqlite3.connect":
+        opened.append("sqlite3:" + str(args[0]))
+sys.addaudithook(audit)
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "opened": opened}}))
+"""
+
+
+def import_report(module):
+    """Imports module in a new interpreter, returns the import time and files opened."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            PROBE.format(module=module, dependencies=DEPENDENCIES),
+        ],
+        cwd=BACKEND_FOLDER,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise ImportError(
+            "import {} failed: {}".format(
+                module, result.stderr.strip().splitlines()[-1]
+            )
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def data_reads(opened):
+    """Returns the files opened that are not Python source in the repo, or databases."""
+    reads = []
+    for path in opened:
+        if path.startswith("sqlite3:"):
+            reads.append(path)
+            continue
+        path = os.path.abspath(path)
+        if not path.startswith(REPO_FOLDER) or os.path.isdir(path):
+            continue
+        if os.path.splitext(path)[1] not in (".py", ".pyc"):
+            reads.append(path)
+    return reads
+
+
+def test_imports_do_no_io():
+    for module in MODULES:
+        report = import_report(module)
+        reads = data_reads(report["opened"])
+        assert not reads, "import {} read {}".format(module, reads)
+
+
+def test_imports_within_budget():
+    for module in MODULES:
+        report = import_report(module)
+        assert report["seconds"] < IMPORT_BUDGET, "import {} took {:.2f}s".format(
+            module, report["seconds"]
+        )
+
+
+if __name__ == "__main__":
+    failed = False
+    for module in MODULES:
+        report = import_report(module)
+        reads = data_reads(report["opened"])
+        ok = not reads and report["seconds"] < IMPORT_BUDGET
+        failed = failed or not ok
+        print(
+            "{:<16} {:>6.3f}s  {}".format(
+                module, report["seconds"], "ok" if ok else "FAILED {}".format(reads)
+            )
+        )
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,62 @@
+"""Tests of the streamed dashboard json of `datasets.json_writer`.
+
+Run from the backend folder with `python -m pytest test_json_writer.py`.
+"""
+
+import io
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from datasets.json_writer import write_json, dumps, OrjsonBackend
+
+
+def dashboard_frames():
+    """Returns an object in the format of `DataDashboard.to_frames`."""
+    areas = pd.DataFrame(
+        {
+            "area_code": ["W06000001", "W06000002", "W06000003"],
+            "area_name": ["Isle of Anglesey", "Gwynedd", 'Ynys Môn "A" 100%'],
+            "rate": [0.1, np.nan, 12.345],
+            "rank": [3.0, 1.0, np.inf],
+            "count": np.array([1, 2, 3], dtype="int64"),
+        }
+    )
+    return {
+        "variables": [{"name": "rate", "label": "Rate (%)"}],
+        "LAs": areas,
+        "LSOAs": areas.iloc[:0],
+        "mixed": areas[["area_code"]].assign(flag=[True, False, None]),
+        "updated": "2021-01-01",
+    }
+
+
+def records_json(frames):
+    """Returns frames encoded by `json.dumps` with its dfs converted to records."""
+    obj = {
+        key: (
+            value.to_dict(orient="records")
+            if isinstance(value, pd.DataFrame)
+            else value
+        )
+        for key, value in frames.items()
+    }
+    return json.dumps(obj)
+
+
+def test_write_json_is_byte_identical_to_json_dump():
+    frames = dashboard_frames()
+    for chunk_rows in (1, 2, 10000):
+        stream = io.StringIO()
+        write_json(frames, stream, chunk_rows=chunk_rows)
+        assert stream.getvalue() == records_json(frames)
+
+
+def test_orjson_backend_decodes_to_the_same_values():
+    pytest.importorskip("orjson")
+    frames = dashboard_frames()
+    frames["LAs"] = frames["LAs"].replace(np.inf, 1.0)
+    expected = json.loads(records_json(frames))
+    expected["LAs"][1]["rate"] = None
+    assert json.loads(dumps(frames, backend=OrjsonBackend())) == expected
@@ -0,0 +1,127 @@
+"""Tests of the columnar and split payloads of `datasets.payload`.
+
+Run from the backend folder with `python -m pytest test_payload.py`.
+"""
+
+import os
+import gzip
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from datasets.payload import (
+    columnar_payload,
+    encode_payload,
+    write_payload,
+    write_split_payloads,
+    _prune,
+)
+
+
+def dashboard_frames():
+    """Returns an object in the format of `DataDashboard.to_frames`."""
+    areas = pd.DataFrame(
+        {
+            "area_code": ["W06000001", "W06000002", "W06000003"],
+            "area_name": ["Isle of Anglesey", "Gwynedd", "Conwy"],
+            "rate": [0.125, np.nan, -12.345],
+            "rank": [3.0, 1.0, 2.0],
+        }
+    )
+    return {"variables": [{"name": "rate"}], "LAs": areas, "updated": "2021-01-01"}
+
+
+def decode(payload):
+    """Returns the frames of a decoded columnar payload, as the frontend reads them."""
+    frames = {}
+    for key, value in payload.items():
+        if isinstance(value, dict) and "area_code" in value:
+            df = pd.DataFrame(value)
+            columns = df.columns.drop("area_code")
+            df[columns] = df[columns].astype("float64") / payload["scale"]
+            frames[key] = df
+        else:
+            frames[key] = value
+    return frames
+
+
+def test_columnar_payload_decodes_to_the_values():
+    frames = dashboard_frames()
+    payload = json.loads(encode_payload(columnar_payload(frames)))
+    assert payload["schema"] == 1 and payload["scale"] == 1000
+    assert payload["LAs"]["rate"] == [125, None, -12345]
+
+    decoded = decode(payload)
+    assert decoded["variables"] == frames["variables"]
+    assert decoded["updated"] == frames["updated"]
+    pd.testing.assert_frame_equal(
+        decoded["LAs"], frames["LAs"].drop(columns=["area_name"])
+    )
+
+
+@pytest.mark.filterwarnings("ignore:brotli is required")
+def test_write_payload_compresses_reproducibly(tmp_path):
+    path = str(tmp_path / "data.columnar.json")
+    payload = columnar_payload(dashboard_frames())
+    written = write_payload(path, payload)
+    assert written[:2] == [path, path + ".gz"]
+    with open(path + ".gz", "rb") as f:
+        compressed = f.read()
+    assert json.loads(gzip.decompress(compressed)) == json.loads(
+        encode_payload(payload)
+    )
+
+    write_payload(path, payload)
+    with open(path + ".gz", "rb") as f:
+        assert f.read() == compressed
+
+
+def touch(path, day):
+    """Writes an empty file to path, modified on day."""
+    open(path, "wb").close()
+    timestamp = pd.Timestamp(day).timestamp()
+    os.utime(path, (timestamp, timestamp))
+
+
+def test_prune_keeps_the_current_and_newest_versions(tmp_path):
+    folder = str(tmp_path)
+    days = {"aaaaaaaaaaaa": 1, "bbbbbbbbbbbb": 4, "cccccccccccc": 3, "dddddddddddd": 2}
+    for digest, day in days.items():
+        for suffix in ("", ".gz", ".br"):
+            name = "data.static.{}.json{}".format(digest, suffix)
+            touch(os.path.join(folder, name), "2021-03-0{}".format(day))
+    other = ["data.live.eeeeeeeeeeee.json", "data.json", "other.static.json"]
+    for name in other:
+        touch(os.path.join(folder, name), "2021-01-01")
+
+    # The oldest version is current, so only the newest of the others is kept
+    manifest = {"schema": 1, "static": "data.static.aaaaaaaaaaaa.json"}
+    _prune(folder, "data", manifest, keep=2)
+    kept = sorted(name for name in os.listdir(folder) if name not in other)
+    assert kept == [
+        "data.static.{}.json{}".format(digest, suffix)
+        for digest in ("aaaaaaaaaaaa", "bbbbbbbbbbbb")
+        for suffix in ("", ".br", ".gz")
+    ]
+    assert all(os.path.isfile(os.path.join(folder, name)) for name in other)
+
+
+@pytest.mark.filterwarnings("ignore:brotli is required")
+def test_split_write_redoes_an_interrupted_write(tmp_path):
+    path = str(tmp_path / "data.json")
+    payloads = {"static": {"groups": [1, 2]}, "live": {"cases": [3]}}
+    manifest = write_split_payloads(path, payloads)
+    assert sorted(manifest) == ["live", "schema", "static"]
+    with open(tmp_path / "data.manifest.json") as f:
+        assert json.load(f) == manifest
+
+    # A write interrupted after the json left its gzip version missing
+    gz_path = tmp_path / (manifest["live"] + ".gz")
+    with open(gz_path, "rb") as f:
+        compressed = f.read()
+    os.remove(gz_path)
+    assert write_split_payloads(path, payloads) == manifest
+    with open(gz_path, "rb") as f:
+        assert f.read() == compressed
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
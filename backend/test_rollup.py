@@ -0,0 +1,134 @@
+"""Tests of the LSOA rollup of `datasets.rollup`.
+
+Run from the backend folder with `python -m pytest test_rollup.py`.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+import datasets
+from datasets.dataset import Dataset, MasterDataset, DataResolution, DataFrequency
+from datasets.rollup import Aggregation, RollupMatrix, lsoa_lookup
+
+LSOA_KEYS = pd.DataFrame(
+    {
+        "LSOA11CD": ["W01000001", "W01000002", "W01000003", "W01000004"],
+        "LSOA11NM": ["Cardiff 001A", "Cardiff 001B", "Cardiff 002A", "Newport 001A"],
+    }
+)
+LA_KEYS = pd.DataFrame(
+    {"lad19cd": ["W06000015", "W06000022"], "lad19nm": ["Cardiff", "Newport"]}
+)
+MSOA_CODES = {
+    "Cardiff 001": "W02000001",
+    "Cardiff 002": "W02000002",
+    "Newport 001": "W02000003",
+}
+
+
+def master_frame(values):
+    """Returns values indexed like a LSOA master dataset, on code and name."""
+    index = pd.MultiIndex.from_frame(LSOA_KEYS, names=["area_code", "area_name"])
+    return pd.DataFrame({"value": values}, index=index)
+
+
+@pytest.fixture
+def matrix():
+    return RollupMatrix.from_lookup(lsoa_lookup(LSOA_KEYS, LA_KEYS, MSOA_CODES))
+
+
+def test_lsoas_without_msoa_codes_only_roll_up_to_their_la():
+    with pytest.warns(UserWarning, match="Newport 001"):
+        lookup = lsoa_lookup(LSOA_KEYS, LA_KEYS, {"Cardiff 001": "W02000001"})
+    assert lookup["msoa11cd"].isna().tolist() == [False, False, True, True]
+
+    aggregated = RollupMatrix.from_lookup(lookup).aggregate(
+        master_frame([1.0, 2.0, 3.0, 4.0])
+    )
+    assert aggregated[DataResolution.MSOA]["value"].tolist() == [3.0]
+    assert aggregated[DataResolution.LA]["value"].tolist() == [6.0, 4.0]
+
+
+def test_aggregate_sum(matrix):
+    aggregated = matrix.aggregate(master_frame([1.0, 2.0, np.nan, 4.0]))
+    msoa = aggregated[DataResolution.MSOA]["value"]
+    assert msoa.index.get_level_values(0).tolist() == list(MSOA_CODES.values())
+    assert msoa.tolist()[0] == 3.0 and np.isnan(msoa.tolist()[1])
+    assert aggregated[DataResolution.LA]["value"].tolist() == [3.0, 4.0]
+
+
+def test_weighted_mean_with_master_weights(matrix):
+    data = master_frame([10.0, 20.0, 30.0, 40.0])
+    weights = master_frame([1.0, 3.0, 0.0, 2.0])["value"]
+    aggregated = matrix.aggregate(data, Aggregation.WEIGHTED_MEAN, weights=weights)
+    assert aggregated[DataResolution.MSOA]["value"].iloc[0] == 17.5
+    assert aggregated[DataResolution.LA]["value"].tolist() == [17.5, 40.0]
+
+    coded_weights = weights.droplevel(1)
+    by_code = matrix.aggregate(data, Aggregation.WEIGHTED_MEAN, coded_weights)
+    pd.testing.assert_frame_equal(
+        by_code[DataResolution.LA], aggregated[DataResolution.LA]
+    )
+
+
+def test_weighted_mean_rejects_unmatched_weights(matrix):
+    weights = pd.Series([1.0], index=["E01000001"])
+    with pytest.raises(ValueError):
+        matrix.aggregate(master_frame([1.0] * 4), Aggregation.WEIGHTED_MEAN, weights)
+
+
+def test_msoa_keys_standardise(matrix, monkeypatch):
+    monkeypatch.setattr(Dataset, "MSOA_REF", None)
+    monkeypatch.setattr(Dataset, "KEY_INDEXES", {})
+    Dataset.set_msoa_keys(matrix.keys[DataResolution.MSOA])
+    key_index = Dataset.key_index(DataResolution.MSOA)
+    assert key_index.key_cols == ["msoa11cd", "msoa11nm"]
+    positions = key_index.positions(pd.Series(["W02000003", "E02000001"]))
+    assert positions.tolist() == [2, -1]
+
+
+def test_msoa_codes_are_read_from_the_msoa_source(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    monkeypatch.setattr(Dataset, "MSOA_REF", None)
+    monkeypatch.setattr(Dataset, "KEY_INDEXES", {})
+    keys = Dataset.key_index(DataResolution.MSOA).keys
+    assert keys["msoa11cd"].str.startswith("W02").all() and len(keys) > 0
+
+    lsoa_keys = pd.DataFrame(
+        {
+            "LSOA11CD": ["W01000001", "W01000002"],
+            "LSOA11NM": ["Isle of Anglesey 001A", "Isle of Anglesey 001B"],
+        }
+    )
+    la_keys = pd.DataFrame({"lad19cd": ["W06000001"], "lad19nm": ["Isle of Anglesey"]})
+    lookup = lsoa_lookup(lsoa_keys, la_keys)
+    assert lookup["msoa11cd"].tolist() == ["W02000001", "W02000001"]
+
+
+def test_msoa_master_is_indexed_on_the_msoa_keys(matrix, tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "BASE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    monkeypatch.setattr(Dataset, "MSOA_REF", None)
+    monkeypatch.setattr(Dataset, "KEY_INDEXES", {})
+    os.makedirs(tmp_path / "data" / "static")
+    Dataset.set_msoa_keys(matrix.keys[DataResolution.MSOA])
+
+    counts = Dataset(
+        data=matrix.keys[DataResolution.MSOA].assign(count=[1, 2, 3]),
+        res=DataResolution.MSOA,
+        key_col="msoa11cd",
+        key_is_code=True,
+        csv_name="count",
+        keep_cols=["msoa11cd", "count"],
+    )
+    master = MasterDataset(
+        datasets=[counts],
+        res=DataResolution.MSOA,
+        freq=DataFrequency.STATIC,
+        from_csv=False,
+    ).master_dataset
+    assert master.index.names == ["area_code", "area_name"]
+    assert master.index.get_level_values(0).tolist() == list(MSOA_CODES.values())
+    assert master["count"].tolist() == [1, 2, 3]
@@ -0,0 +1,51 @@
+"""Tests of the daily sentiment aggregates of `datasets.sentiment`.
+
+Run from the backend folder with `python -m pytest test_sentiment.py`.
+"""
+
+import sqlite3
+import dataclasses
+import pandas as pd
+from datetime import date
+
+from datasets.database import POOL, connect_writer
+from datasets.live import SOURCE_TWEET_SENTIMENT_LA
+from datasets.sentiment import aggregates_installed, install_sentiment_aggregates
+from tweets.synthetic import SyntheticTweets
+
+
+def sorted_sentiment(df):
+    """Returns the sentiment query result sorted by area."""
+    return df.sort_values("lsoa", ignore_index=True)
+
+
+def test_build_reads_the_database_read_only(tmp_path):
+    path = str(tmp_path / "phw_tweets.db")
+    SyntheticTweets(
+        n_tweets=2000, n_places=50, days=14, end=date.today().isoformat()
+    ).write_database(path)
+    source = dataclasses.replace(SOURCE_TWEET_SENTIMENT_LA, path=path)
+
+    # Without the aggregates the build queries the tweets, and writes nothing
+    with open(path, "rb") as f:
+        contents = f.read()
+    from_tweets = source.load()
+    assert not aggregates_installed(path)
+    with open(path, "rb") as f:
+        assert f.read() == contents
+    con = sqlite3.connect(path)
+    assert con.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    con.close()
+
+    con = connect_writer(path)
+    assert install_sentiment_aggregates(con)
+    assert not install_sentiment_aggregates(con)
+    con.close()
+    assert aggregates_installed(path)
+
+    from_aggregates = source.load()
+    assert len(from_tweets) > 0
+    pd.testing.assert_frame_equal(
+        sorted_sentiment(from_aggregates), sorted_sentiment(from_tweets)
+    )
+    POOL.close()
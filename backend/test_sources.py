@@ -0,0 +1,157 @@
+"""Tests of the source specs of `datasets.sources`.
+
+Run from the backend folder with `python -m pytest test_sources.py`.
+"""
+
+import os
+import sqlite3
+import pandas as pd
+from datetime import datetime
+
+import datasets
+from datasets.database import POOL
+from datasets.sources import (
+    SourceSpec,
+    GridCache,
+    GRID_CACHE,
+    read_latest,
+    load_sources,
+)
+
+
+def write_csv(path, values):
+    """Writes a csv with a `value` column of values to path."""
+    with open(path, "w") as f:
+        f.write("value\n" + "".join("{}\n".format(value) for value in values))
+
+
+def test_grid_is_shared_by_specs(tmp_path):
+    path = str(tmp_path / "source.csv")
+    with open(path, "w") as f:
+        f.write("a,b\n1,2\n3,4\n")
+    grids = GridCache()
+    assert grids.read(SourceSpec(path=path, usecols=(0,)))["a"].tolist() == [1, 3]
+    assert grids.read(SourceSpec(path=path, usecols=(1,)))["b"].tolist() == [2, 4]
+    assert grids.stats() == {"hits": 1, "misses": 1, "grids": 1}
+
+
+def test_load_reads_file_rewritten_in_place(tmp_path):
+    path = str(tmp_path / "source.csv")
+    spec = SourceSpec(path=path, usecols=(0,))
+    write_csv(path, [1, 2])
+    assert spec.load()["value"].tolist() == [1, 2]
+    assert spec.load()["value"].tolist() == [1, 2]
+
+    write_csv(path, [7, 8, 9])
+    # A rewrite within the same clock tick only changes the size
+    os.utime(path, ns=(0, 0))
+    assert spec.load()["value"].tolist() == [7, 8, 9]
+    GRID_CACHE.discard(spec)
+
+
+def test_load_sources_grids_are_read_from_the_cache(tmp_path):
+    path = str(tmp_path / "source.csv")
+    with open(path, "w") as f:
+        f.write("a,b,c\n1,2,3\n4,5,6\n")
+    specs = {"a": SourceSpec(path=path, usecols=(0,)), "c": SourceSpec(path=path)}
+    misses = GRID_CACHE.misses
+    load_sources(specs, max_workers=2)
+    assert GRID_CACHE.misses == misses + 1
+
+    hits = GRID_CACHE.hits
+    assert GRID_CACHE.read(specs["a"])["a"].tolist() == [1, 4]
+    assert GRID_CACHE.read(specs["c"])["c"].tolist() == [3, 6]
+    assert GRID_CACHE.hits == hits + 2
+    GRID_CACHE.discard(specs["a"])
+
+
+def write_sheet(path, rows):
+    """Writes rows, the first of which is the header, to the first sheet of path."""
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    workbook.save(path)
+
+
+def test_read_latest_matches_full_read(tmp_path):
+    path = str(tmp_path / "surveillance.xlsx")
+    write_sheet(
+        path,
+        [
+            ["Area", "Date", "Rate"],
+            ["Cardiff", datetime(2021, 1, 1), 1.5],
+            ["Newport", datetime(2021, 1, 1), 2.25],
+            ["Cardiff", datetime(2021, 1, 2), 3.0],
+            ["Newport", datetime(2021, 1, 2), 4.0],
+            ["Note", "Data to 2 January, provisional", None],
+        ],
+    )
+    spec = SourceSpec(path=path, latest="Date")
+    df = read_latest(spec)
+
+    full = pd.read_excel(path)
+    full = full[full["Area"] != "Note"]
+    full["Date"] = pd.to_datetime(full["Date"])
+    full = full[full["Date"] == full["Date"].max()]
+    pd.testing.assert_frame_equal(df, full)
+    assert df["Rate"].dtype == "float64"
+
+
+def double(df):
+    """Returns df with its values doubled."""
+    return df * 2
+
+
+def concurrent_specs(folder):
+    """Writes a csv, a workbook and a database to folder, and returns specs of them."""
+    csv_path = os.path.join(folder, "source.csv")
+    with open(csv_path, "w") as f:
+        f.write("a,b,c\n1,2,3\n4,5,6\n")
+    xlsx_path = os.path.join(folder, "source.xlsx")
+    write_sheet(xlsx_path, [["Area", "Rate", "Count"], ["Cardiff", 1.5, 3]])
+    db_path = os.path.join(folder, "source.db")
+    con = sqlite3.connect(db_path)
+    con.execute("CREATE TABLE t (value INTEGER)")
+    con.execute("INSERT INTO t VALUES (7)")
+    con.commit()
+    con.close()
+    return {
+        "csv_a": SourceSpec(path=csv_path, usecols=(0,)),
+        "csv_bc": SourceSpec(path=csv_path, usecols=(1, 2), transform=double),
+        "csv_callable": SourceSpec(path=csv_path, usecols=lambda col: col != "b"),
+        "excel_rate": SourceSpec(path=xlsx_path, usecols="A:B"),
+        "excel_count": SourceSpec(path=xlsx_path, usecols="C"),
+        "sql": SourceSpec(path=db_path, query="SELECT value FROM t"),
+    }
+
+
+def test_load_sources_matches_serial_loads(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "CACHE_FOLDER", str(tmp_path / ".cache"))
+    specs = concurrent_specs(str(tmp_path))
+    expected = {name: spec.load() for name, spec in specs.items()}
+    for spec in specs.values():
+        GRID_CACHE.discard(spec)
+
+    frames, seconds = load_sources(specs, max_workers=2)
+    assert list(frames) == list(specs) and list(seconds) == list(specs)
+    for name, df in frames.items():
+        pd.testing.assert_frame_equal(df, expected[name])
+
+    # The csv and the sheet are each parsed once
+    grid_keys = {spec.grid_key() for spec in specs.values() if spec.reads_grid}
+    parsed = {
+        key: value
+        for key, value in GRID_CACHE.parse_seconds.items()
+        if key[0].startswith(str(tmp_path))
+    }
+    assert len(grid_keys) == 2 and set(parsed) == grid_keys
+    assert all(value > 0 for value in parsed.values())
+
+    hits = GRID_CACHE.hits
+    pd.testing.assert_frame_equal(specs["excel_rate"].load(), expected["excel_rate"])
+    assert GRID_CACHE.hits == hits + 1
+    for spec in specs.values():
+        GRID_CACHE.discard(spec)
+    POOL.close()
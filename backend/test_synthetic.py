@@ -0,0 +1,20 @@
+"""Tests of the synthetic tweets of `tweets.synthetic`.
+
+Run from the backend folder with `python -m pytest test_synthetic.py`.
+"""
+
+import pandas as pd
+
+from tweets.synthetic import SyntheticTweets, END
+
+
+def test_same_fields_write_identical_files(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        synthetic = SyntheticTweets(n_tweets=500, n_places=20, days=30)
+        paths.append(synthetic.write_csv(str(tmp_path / "{}.csv".format(name))))
+        paths.append(synthetic.write_database(str(tmp_path / "{}.db".format(name))))
+    for first, second in (paths[0::2], paths[1::2]):
+        with open(first, "rb") as f, open(second, "rb") as g:
+            assert f.read() == g.read()
+    assert SyntheticTweets(n_tweets=1).end_date == pd.Timestamp(END)
@@ -0,0 +1,436 @@
+"""Module generating a synthetic tweets database and Twitter export, to benchmark the
+tweet processing at scale without the real `phw_tweets.db` or `tweets_dataset.csv`.
+
+The generated data has the schemas read by the dashboard and the pipelines:
+    - the `tweets`, `places` and `matchedplaces` tables of the collection database,
+      read by `VADER_QUERY` (see `datasets.live` and `datasets.sentiment`).
+    - a csv export with the `place.*` and `geo.*` columns of the Twitter API, read by
+      the `TwitterPipeline` and `generate_map_counts`.
+
+Places are bounding boxes drawn inside the Local Authority boundaries, so they match
+the LA they were drawn from, plus some places outside Wales that the pipelines
+filter out. The output only depends on the `SyntheticTweets` fields, and tweets are
+generated in chunks, so 1e7 tweets can be written without holding them in memory.
+
+Run from the `backend/tweets` folder with, e.g.:
+
+    python synthetic.py 1000000 --db phw_tweets.db --csv tweets_dataset.csv
+
+The tweets end on `END` by default, so the same arguments always write the same
+files. Add `--end today` for tweets up to today, as the dashboard queries read the
+last seven days.
+"""
+
+# %%
+import os
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterator, List, Tuple
+
+BOUNDARIES_PATH = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    "..",
+    "datasets",
+    "data",
+    "static",
+    "geoboundaries",
+    "boundaries_LA.geojson",
+)
+
+CHUNK_SIZE = 250_000  # Tweets generated at a time
+
+END = "2021-06-30"  # Default last day of tweets, fixed so the output never changes
+
+FIRST_TWEET_ID = 1242070780839636998
+FIRST_PLACE_ID = 0x1C6F2E3400000000
+PLACE_ID_STEP = 0x1F3
+
+# Places outside Wales, as (name, (west, south, east, north))
+OTHER_PLACES = [
+    ("Bristol, England", (-2.72, 51.40, -2.51, 51.54)),
+    ("Chester, England", (-2.95, 53.16, -2.83, 53.23)),
+    ("Hereford, England", (-2.78, 52.03, -2.67, 52.08)),
+    ("Liverpool, England", (-3.01, 53.33, -2.82, 53.47)),
+    ("Wales, United Kingdom", (-5.35, 51.34, -2.65, 53.44)),
+]
+
+WORDS = np.array(
+    [
+        "community",
+        "support",
+        "help",
+        "neighbours",
+        "shopping",
+        "lockdown",
+        "covid",
+        "volunteers",
+        "thank",
+        "you",
+        "stay",
+        "home",
+        "safe",
+        "local",
+        "food",
+        "bank",
+        "nhs",
+        "key",
+        "workers",
+        "today",
+        "great",
+        "worried",
+        "isolating",
+        "family",
+    ]
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id INTEGER PRIMARY KEY,
+    author_id TEXT,
+    created_at TEXT,
+    place_id TEXT,
+    text TEXT,
+    lang TEXT,
+    vader_comp REAL
+);
+CREATE TABLE IF NOT EXISTS places (
+    id TEXT PRIMARY KEY,
+    full_name TEXT,
+    place_type TEXT,
+    country_code TEXT,
+    bounding_box TEXT
+);
+CREATE TABLE IF NOT EXISTS matchedplaces (
+    place_id TEXT,
+    lsoa TEXT,
+    lsoa_name TEXT
+);
+"""
+
+TWEET_COLUMNS = [
+    "id",
+    "author_id",
+    "created_at",
+    "place_id",
+    "text",
+    "lang",
+    "vader_comp",
+]
+
+
+def sample_points(
+    geometry, n: int, rng: np.random.Generator
+) -> List[Tuple[float, float]]:
+    """Returns n (long, lat) points drawn uniformly inside geometry."""
+    west, south, east, north = geometry.bounds
+    points = []
+    while len(points) < n:
+        xs = rng.uniform(west, east, 4 * n)
+        ys = rng.uniform(south, north, 4 * n)
+        inside = gpd.GeoSeries(gpd.points_from_xy(xs, ys)).within(geometry).to_numpy()
+        points.extend(zip(xs[inside].tolist(), ys[inside].tolist()))
+    return points[:n]
+
+
+def bbox_coordinates(bbox: Tuple[float, float, float, float]) -> list:
+    """Returns the Twitter API coordinates of a (west, south, east, north) bbox."""
+    west, south, east, north = (round(value, 6) for value in bbox)
+    return [[[west, south], [east, south], [east, north], [west, north]]]
+
+
+@dataclass(frozen=True)
+class SyntheticTweets:
+    """Defines a synthetic set of tweets, which is the same every time it is generated.
+
+    Attributes
+    ----------
+    n_tweets: int
+        Number of tweets.
+    n_authors: int, optional
+        Number of authors. By default one per 20 tweets.
+    n_places: int, optional
+        Number of towns and neighbourhoods in Wales. By default 2000. There is also a
+        place for each LA as a whole.
+    days: int, optional
+        Number of days the tweets are spread over, up to `end`. By default 365.
+    end: str, optional
+        The last day of tweets, as "YYYY-MM-DD". By default `END`. Set it to today's
+        date for queries of the last few days, such as `VADER_QUERY`, to find tweets.
+    wales_share: float, optional
+        Share of the tweets from places in Wales. By default 0.9.
+    geo_share: float, optional
+        Share of the tweets with `geo.coordinates`. By default 0.05.
+    seed: int, optional
+        Seed of the random generators. By default 0.
+    first_id: int, optional
+        The id of the first tweet, the others follow in order.
+    boundaries_path: str, optional
+        Path to the LA boundaries the places are drawn in. By default `BOUNDARIES_PATH`.
+    """
+
+    n_tweets: int
+    n_authors: int = None
+    n_places: int = 2000
+    days: int = 365
+    end: str = END
+    wales_share: float = 0.9
+    geo_share: float = 0.05
+    seed: int = 0
+    first_id: int = FIRST_TWEET_ID
+    boundaries_path: str = BOUNDARIES_PATH
+
+    @property
+    def authors(self) -> int:
+        """Returns the number of authors."""
+        return self.n_authors or max(1, self.n_tweets // 20)
+
+    @property
+    def end_date(self) -> pd.Timestamp:
+        """Returns the last day of tweets."""
+        return pd.Timestamp(self.end)
+
+    def places(self) -> pd.DataFrame:
+        """Returns the places, with their bounding boxes and matched LA.
+
+        Notes
+        -------
+        There is a place for each LA as a whole, then `n_places` towns and
+        neighbourhoods drawn around points inside a random LA, weighted by area. They
+        are matched to the LA they were drawn from. The places in `OTHER_PLACES` are
+        the last rows, and have no LA.
+
+        Returns
+        -------
+        pd.DataFrame
+            A row per place, with the `id`, `full_name`, `place_type`, `bbox` as
+            (west, south, east, north), and the `lad18cd` and `lad18nm` of its LA.
+        """
+        rng = np.random.default_rng([self.seed, 0])
+        las = gpd.read_file(self.boundaries_path).sort_values("lad18cd")
+        las = las.reset_index(drop=True)
+        weights = las.to_crs(epsg=27700).area.to_numpy()  # British National Grid
+        la_ids = rng.choice(len(las), self.n_places, p=weights / weights.sum())
+
+        # One place for each LA as a whole, then the towns and neighbourhoods
+        rows = [
+            (
+                "{}, Wales".format(la.lad18nm),
+                "admin",
+                la.geometry.bounds,
+                la.lad18cd,
+                la.lad18nm,
+            )
+            for la in las.itertuples()
+        ]
+        for la in las.itertuples():
+            n = int((la_ids == la.Index).sum())
+            points = sample_points(la.geometry, n, rng)
+            sizes = rng.lognormal(np.log(0.02), 0.7, (n, 2))
+            for i, ((x, y), (w, h)) in enumerate(zip(points, sizes)):
+                rows.append(
+                    (
+                        "{} {}, Wales".format(la.lad18nm, i + 1),
+                        "neighborhood" if w * h < 4e-4 else "city",
+                        (x - w / 2, y - h / 2, x + w / 2, y + h / 2),
+                        la.lad18cd,
+                        la.lad18nm,
+                    )
+                )
+        rows.extend((name, "city", bbox, None, None) for name, bbox in OTHER_PLACES)
+
+        places = pd.DataFrame(
+            rows, columns=["full_name", "place_type", "bbox", "lad18cd", "lad18nm"]
+        )
+        ids = FIRST_PLACE_ID + PLACE_ID_STEP * np.arange(len(places))
+        places.insert(0, "id", ["{:016x}".format(i) for i in ids.tolist()])
+        return places
+
+    def chunks(self, places: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        """Yields the tweets in chunks of `CHUNK_SIZE`, in order of their id.
+
+        Parameters
+        ----------
+        places : pd.DataFrame
+            The places, as given by `places`.
+
+        Yields
+        -------
+        pd.DataFrame
+            The tweets, with their `id`, `author_id`, `created_at`, `place` (row of
+            places), `text`, `lang`, `vader_comp` and `geo` (long, lat) or None.
+        """
+        n_wales = int(places["lad18cd"].notna().sum())
+        # Popularity of places, so that a few places have most of the tweets
+        popularity = 1 / np.arange(1, n_wales + 1) ** 0.8
+        popularity = np.random.default_rng([self.seed, 2]).permutation(popularity)
+        popularity = popularity / popularity.sum()
+        end = self.end_date + pd.Timedelta(days=1)
+        bboxes = np.array(places["bbox"].tolist())
+
+        for chunk, start in enumerate(range(0, self.n_tweets, CHUNK_SIZE)):
+            n = min(CHUNK_SIZE, self.n_tweets - start)
+            rng = np.random.default_rng([self.seed, 1, chunk])
+
+            in_wales = rng.random(n) < self.wales_share
+            place = np.where(
+                in_wales,
+                rng.choice(n_wales, n, p=popularity),
+                n_wales + rng.integers(0, len(OTHER_PLACES), n),
+            )
+            seconds = rng.integers(1, self.days * 24 * 3600, n)
+            created = end - pd.to_timedelta(seconds, unit="s")
+            words = WORDS[rng.integers(0, len(WORDS), (n, 6))]
+            text = pd.Series([" ".join(w) for w in words.tolist()])
+            # About a third of tweets have a neutral compound score of 0
+            vader = np.where(rng.random(n) < 0.3, 0.0, rng.uniform(-1, 1, n).round(4))
+
+            geo = [None] * n
+            has_geo = np.flatnonzero(rng.random(n) < self.geo_share)
+            box = bboxes[place[has_geo]]
+            lon = rng.uniform(box[:, 0], box[:, 2]).round(6)
+            lat = rng.uniform(box[:, 1], box[:, 3]).round(6)
+            for i, x, y in zip(has_geo.tolist(), lon.tolist(), lat.tolist()):
+                geo[i] = (x, y)
+
+            yield pd.DataFrame(
+                {
+                    "id": self.first_id + start + np.arange(n, dtype="int64"),
+                    "author_id": pd.Series(
+                        rng.integers(0, self.authors, n) + 10**9
+                    ).astype(str),
+                    "created_at": created,
+                    "place": place,
+                    "text": text,
+                    "lang": "en",
+                    "vader_comp": vader,
+                    "geo": geo,
+                }
+            )
+
+    def database_rows(self, places: pd.DataFrame) -> Iterator[list]:
+        """Yields the tweets in chunks, as rows of the `tweets` table of the database.
+
+        Notes
+        -------
+        `created_at` is in the ISO 8601 format of the Twitter API v2.
+        """
+        place_ids = places["id"].to_numpy()
+        for tweets in self.chunks(places):
+            tweets["place_id"] = place_ids[tweets["place"]]
+            tweets["created_at"] = tweets["created_at"].dt.strftime(
+                "%Y-%m-%dT%H:%M:%S.000Z"
+            )
+            yield list(tweets[TWEET_COLUMNS].itertuples(index=False, name=None))
+
+    def write_database(self, path: str) -> str:
+        """Writes the tweets to the `tweets`, `places` and `matchedplaces` tables of a
+        sqlite database at path, which must not have tweets already.
+
+        Notes
+        -------
+        `matchedplaces` has the LA of each place in Wales, in the `lsoa` and
+        `lsoa_name` columns, as `VADER_QUERY` reads. See `database_rows` for the
+        tweets.
+        """
+        places = self.places()
+        con = sqlite3.connect(path)
+        try:
+            con.executescript(SCHEMA)
+            con.executemany(
+                "INSERT INTO places VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        p.id,
+                        p.full_name,
+                        p.place_type,
+                        "GB",
+                        json.dumps(bbox_coordinates(p.bbox)),
+                    )
+                    for p in places.itertuples()
+                ],
+            )
+            matched = places.dropna(subset=["lad18cd"])
+            con.executemany(
+                "INSERT INTO matchedplaces VALUES (?, ?, ?)",
+                matched[["id", "lad18cd", "lad18nm"]].itertuples(index=False),
+            )
+            for rows in self.database_rows(places):
+                con.executemany("INSERT INTO tweets VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            con.commit()
+        finally:
+            con.close()
+        return path
+
+    def write_csv(self, path: str) -> str:
+        """Writes the tweets to a csv at path, with the columns of a Twitter export.
+
+        Notes
+        -------
+        Each tweet has the `place.*` columns of its place, with the bounding box
+        coordinates as a json string, and `geo.coordinates` as "[lat, long]" where
+        the tweet has a location. Long tweets are in `extended_tweet.full_text`.
+        """
+        places = self.places()
+        coordinates = places["bbox"].map(lambda b: json.dumps(bbox_coordinates(b)))
+        for chunk, tweets in enumerate(self.chunks(places)):
+            place = places.iloc[tweets["place"]].reset_index(drop=True)
+            extended = tweets["text"].str.len() > 40
+            has_geo = tweets["geo"].notna()
+            export = pd.DataFrame(
+                {
+                    "id_str": tweets["id"].astype(str),
+                    "created_at": tweets["created_at"].dt.strftime(
+                        "%a %b %d %H:%M:%S +0000 %Y"
+                    ),
+                    "text": tweets["text"].where(~extended, tweets["text"].str[:40]),
+                    "extended_tweet.full_text": tweets["text"].where(extended),
+                    "lang": tweets["lang"],
+                    "user.id_str": tweets["author_id"],
+                    "place.id": place["id"],
+                    "place.full_name": place["full_name"],
+                    "place.place_type": place["place_type"],
+                    "place.country_code": "GB",
+                    "place.bounding_box.type": "Polygon",
+                    "place.bounding_box.coordinates": coordinates.iloc[
+                        tweets["place"]
+                    ].to_numpy(),
+                    "geo.type": np.where(has_geo, "Point", None),
+                    "geo.coordinates": tweets["geo"].map(
+                        lambda g: None if g is None else "[{}, {}]".format(g[1], g[0])
+                    ),
+                }
+            )
+            export.to_csv(
+                path, mode="w" if chunk == 0 else "a", header=chunk == 0, index=False
+            )
+        return path
+
+
+# %%
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Generate synthetic tweets.")
+    parser.add_argument("n_tweets", type=float, help="Number of tweets, e.g. 1e6")
+    parser.add_argument("--db", type=str, default=None, help="sqlite database path")
+    parser.add_argument("--csv", type=str, default=None, help="csv export path")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument(
+        "--end", type=str, default=END, help="last day, YYYY-MM-DD, or 'today'"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.end == "today":
+        args.end = date.today().isoformat()
+
+    synthetic = SyntheticTweets(
+        n_tweets=int(args.n_tweets), days=args.days, end=args.end, seed=args.seed
+    )
+    if args.db:
+        print("Written", synthetic.write_database(args.db))
+    if args.csv:
+        print("Written", synthetic.write_csv(args.csv))